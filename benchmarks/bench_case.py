@@ -0,0 +1,70 @@
+"""Benchmark construction of butterfly cases with many geometries.
+
+Builds a case from butterfly geometries with a boundary condition for each
+patch, which creates the 0 folder files with one boundaryField entry per
+patch, and then duplicates and clones foamfiles and boundary conditions.
+
+Usage:
+    python benchmarks/bench_case.py [patches] [repeat]
+"""
+import contextlib
+import io
+import os
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from butterfly.boundarycondition import IndoorWallBoundaryCondition  # noqa: E402
+from butterfly.case import Case  # noqa: E402
+from butterfly.geometry import BFGeometry  # noqa: E402
+from butterfly.U import U  # noqa: E402
+
+
+def make_geometries(count):
+    """Create count tilted unit squares side by side as separate patches."""
+    return [
+        BFGeometry('patch_{}'.format(i),
+                   ((i, 0, 0), (i + 1, 0, 0), (i + 1, 1, 1), (i, 1, 1)),
+                   ((0, 1, 2), (0, 2, 3)),
+                   boundary_condition=IndoorWallBoundaryCondition())
+        for i in range(count)]
+
+
+def bench(function, repeat):
+    """Return best time in milliseconds."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return min(timeit.repeat(function, number=1, repeat=repeat)) * 1e3
+
+
+def main(patches=200, repeat=10):
+    geometries = make_geometries(patches)
+    with contextlib.redirect_stdout(io.StringIO()):
+        case = Case.from_bf_geometries('bench', geometries)
+    values = case.U.duplicate().values
+    changed = case.U.duplicate().values
+    changed['boundaryField']['patch_{}'.format(patches - 1)]['type'] = 'slip'
+
+    results = (
+        ('Case.from_bf_geometries', lambda: Case.from_bf_geometries('bench', geometries)),
+        ('U.from_bf_geometries', lambda: U.from_bf_geometries(geometries)),
+        ('U() x 100', lambda: [U() for _ in range(100)]),
+        ('U.update_values (no change)',
+         lambda: case.U.update_values(values, mute=True)),
+        ('U.update_values (one patch) x 2',
+         lambda: (case.U.update_values(changed, mute=True),
+                  case.U.update_values(values, mute=True))),
+        ('FoamFile.duplicate (U)', case.U.duplicate),
+        ('BoundaryCondition.duplicate x 100',
+         lambda: [g.boundary_condition.duplicate() for g in geometries[:100]]),
+        ('Case.duplicate', case.duplicate),
+    )
+    print('{} patches'.format(patches))
+    print('{:<40}{:>12}'.format('', 'time [ms]'))
+    for name, function in results:
+        print('{:<40}{:>12.3f}'.format(name, bench(function, repeat)))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
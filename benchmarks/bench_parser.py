@@ -0,0 +1,128 @@
+"""Benchmark CppDictParser on the dictionaries of the bundled cases.
+
+Compares the single-pass tokenizer in butterfly.parser with the previous
+regex split/rejoin implementation which is kept here for reference and
+Case.from_folder with and without the parse cache.
+
+Usage:
+    python benchmarks/bench_parser.py [repeat]
+"""
+import glob
+import os
+import re
+import sys
+import timeit
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from butterfly.parser import CppDictParser, parse_cache  # noqa: E402
+
+
+class LegacyCppDictParser(object):
+    """Previous regex based implementation of CppDictParser."""
+
+    def __init__(self, text):
+        _t = CppDictParser.remove_comments(text)
+        _t = ''.join(_t.replace('\r\n', ' ').replace('\n', ' '))
+        self.values = self._convert_to_dict(self._parse_nested(_t))
+
+    def _convert_to_dict(self, parsed):
+        d = dict()
+        itp = iter(parsed)
+        for pp in itp:
+            if not isinstance(pp, list):
+                if pp.find(';') == -1:
+                    d[pp.strip()] = self._convert_to_dict(next(itp))
+                else:
+                    s = pp.split(';')
+                    if not pp.endswith(';'):
+                        d[s[-1].strip()] = self._convert_to_dict(next(itp))
+                        s = s[:-1]
+                    for ppp in s:
+                        ss = ppp.split()
+                        if ss:
+                            d[ss[0].strip()] = ' '.join(ss[1:]).strip()
+        return d
+
+    @staticmethod
+    def _parse_nested(text, left=r'[{]', right=r'[}]', sep='#'):
+        pat = r'({}|{}|{})'.format(left, right, sep)
+        tokens = re.split(pat, text)
+        stack = [[]]
+        for x in tokens:
+            if not x.strip() or re.match(sep, x):
+                continue
+            if re.match(left, x):
+                current = []
+                stack[-1].append(current)
+                stack.append(current)
+            elif re.match(right, x):
+                stack.pop()
+            else:
+                stack[-1].append(x.strip())
+        return stack.pop()
+
+
+def load_texts():
+    """Load text of all the dictionaries under suzanne_*_case/system."""
+    texts = {}
+    for fp in sorted(glob.glob(os.path.join(ROOT, 'suzanne_*_case', 'system', '*'))):
+        if os.path.isfile(fp):
+            with open(fp) as f:
+                texts[os.path.relpath(fp, ROOT)] = f.read()
+    return texts
+
+
+def bench(parser, texts, repeat):
+    """Return best time in seconds for parsing all the texts once."""
+    def run():
+        for t in texts:
+            parser(t)
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def main(repeat=50):
+    texts = load_texts()
+    # make a larger input by stacking every file in a single dictionary
+    large = '\n'.join(
+        '{} {{\n{}\n}}'.format(re.sub(r'\W', '_', k), CppDictParser.remove_comments(t))
+        for k, t in texts.items()) * 20
+
+    print('{:<48}{:>12}{:>12}{:>10}'.format('input', 'legacy [ms]', 'new [ms]', 'speed-up'))
+    cases = [(k, [t]) for k, t in texts.items()]
+    cases.append(('all files', list(texts.values())))
+    cases.append(('all files x 20 ({} kB)'.format(len(large) // 1024), [large]))
+    for name, t in cases:
+        old = bench(LegacyCppDictParser, t, repeat)
+        new = bench(CppDictParser, t, repeat)
+        print('{:<48}{:>12.3f}{:>12.3f}{:>9.1f}x'.format(name, old * 1e3, new * 1e3, old / new))
+
+    bench_from_folder(repeat)
+
+
+def bench_from_folder(repeat):
+    """Compare Case.from_folder with an empty and a warm parse cache."""
+    import contextlib
+    import io
+    from butterfly.case import Case
+
+    folder = os.path.join(ROOT, 'suzanne_simple_case')
+
+    def run(clear):
+        if clear:
+            parse_cache.clear()
+        with contextlib.redirect_stdout(io.StringIO()):
+            Case.from_folder(folder)
+
+    cold = min(timeit.repeat(lambda: run(True), number=1, repeat=repeat))
+    parse_cache.clear()
+    warm = min(timeit.repeat(lambda: run(False), number=1, repeat=repeat))
+    print('\n{:<48}{:>12}{:>12}{:>10}'.format('Case.from_folder', 'cold [ms]', 'cached [ms]', 'speed-up'))
+    print('{:<48}{:>12.3f}{:>12.3f}{:>9.1f}x'.format(
+        os.path.relpath(folder, ROOT), cold * 1e3, warm * 1e3, cold / warm))
+    print(parse_cache)
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:2]))
@@ -0,0 +1,124 @@
+"""Benchmark writing foamfiles with long lists.
+
+Compares the previous json based FoamFile.body, which builds the full text as
+a string, with the streaming writer in butterfly.foamwriter for a probes
+dictionary with many probe locations. Time and peak memory are measured.
+Nonuniform internalField of U is written and read back in ascii and binary
+format.
+
+Usage:
+    python benchmarks/bench_writer.py [points] [repeat]
+"""
+import collections
+import json
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+import tracemalloc
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from butterfly.functions import Probes  # noqa: E402
+from butterfly.U import U  # noqa: E402
+from butterfly.volfield import load_field  # noqa: E402
+
+
+def legacy_body(values):
+    """Previous json based implementation of FoamFile.body."""
+    def remove_none(d):
+        if isinstance(d, (dict, collections.OrderedDict)):
+            return collections.OrderedDict(
+                (k, remove_none(v)) for k, v in d.items()
+                if v == {} or (v and remove_none(v)))
+        elif isinstance(d, (list, tuple)):
+            return [remove_none(v) for v in d if v and remove_none(v)]
+        else:
+            return d
+
+    of = json.dumps(remove_none(values), indent=4, separators=(";", "\t\t")) \
+        .replace('\\"', '@').replace('"\n', ";\n").replace('"', '') \
+        .replace('};', '}').replace('\t\t{', '{').replace('@', '"')
+
+    content = (line[4:] if not line.endswith('{') else
+               line[4:-1] + "\n" + (len(line) - len(line.strip()) - 4) * ' ' + '{'
+               for line in of.split("\n")[1:-1])
+    return "\n\n".join(content)
+
+
+def legacy_save(points, folder):
+    """Set probe locations as a string and write the file as one string."""
+    probes = Probes()
+    ptlist = (str(tuple(pt)).replace(',', ' ') for pt in points)
+    probes.values['functions']['probes']['probeLocations'] = \
+        '({})'.format(' '.join(ptlist))
+    with open(os.path.join(folder, 'probes'), 'w') as f:
+        f.write('\n'.join((probes.header(), legacy_body(probes.values))))
+
+
+def stream_save(points, folder):
+    """Set probe locations as an array and stream the file."""
+    probes = Probes()
+    probes.probeLocations = points
+    with open(os.path.join(folder, 'probes'), 'w') as f:
+        probes.write(f)
+
+
+def measure(function, repeat):
+    """Return best time in milliseconds and peak memory in MB."""
+    best = min(timeit.repeat(function, number=1, repeat=repeat))
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best * 1e3, peak / 1e6
+
+
+def main(points=200000, repeat=5):
+    folder = tempfile.mkdtemp()
+    try:
+        array = np.random.rand(points, 3)
+        pts = [tuple(p) for p in array.tolist()]
+        print('probes with {} locations'.format(points))
+        print('{:<40}{:>12}{:>12}{:>12}'.format('', 'time [ms]', 'peak [MB]',
+                                                 'file [MB]'))
+        for name, function in (
+                ('legacy (string, json)', lambda: legacy_save(pts, folder)),
+                ('stream (array)', lambda: stream_save(array, folder))):
+            time, peak = measure(function, repeat)
+            size = os.path.getsize(os.path.join(folder, 'probes')) / 1e6
+            print('{:<40}{:>12.1f}{:>12.1f}{:>12.1f}'.format(name, time, peak, size))
+        bench_field(array, folder, repeat)
+    finally:
+        shutil.rmtree(folder)
+
+
+def bench_field(array, folder, repeat):
+    """Write and read a nonuniform internalField in ascii and binary."""
+    os.mkdir(os.path.join(folder, '0'))
+    filepath = os.path.join(folder, '0', 'U')
+    print('\nU with {} cells'.format(len(array)))
+    print('{:<40}{:>12}{:>12}{:>12}'.format('', 'write [ms]', 'read [ms]',
+                                             'file [MB]'))
+    for file_format in ('ascii', 'binary'):
+        u = U()
+        u.format = file_format
+        u.internalField = array
+
+        def write():
+            with open(filepath, 'w') as f:
+                u.write(f)
+
+        write_time, _ = measure(write, repeat)
+        read_time, _ = measure(lambda: load_field(filepath), repeat)
+        assert (load_field(filepath).internal_field == array).all()
+        print('{:<40}{:>12.1f}{:>12.1f}{:>12.1f}'.format(
+            file_format, write_time, read_time, os.path.getsize(filepath) / 1e6))
+
+
+if __name__ == '__main__':
+    main(*(int(a) for a in sys.argv[1:3]))
@@ -2,12 +2,22 @@
 """BlockMeshDict class."""
 from .boundarycondition import BoundingBoxBoundaryCondition, EmptyBoundaryCondition
 from .foamfile import FoamFile
+from .foamwriter import text_stream
+from . import vectormath
 from .vectormath import *
 from .grading import SimpleGrading, Grading, MultiGrading
 from .parser import CppDictParser
 from .geometry import BFGeometry
 from math import sqrt, sin, cos, radians
 from collections import OrderedDict
+import io
+
+
+def _foam_list(values):
+    """Convert a tuple of numbers to an OpenFOAM list. e.g. (0, 1) -> (0 1)."""
+    return '({})'.format(' '.join(
+        _foam_list(v) if isinstance(v, (list, tuple)) else str(v)
+        for v in values))
 
 
 class BlockMeshDict(FoamFile):
@@ -716,25 +726,22 @@ class BlockMeshDict(FoamFile):
             except AttributeError as e:
                 raise TypeError('Wrong input geometry!\n{}'.format(e))
 
-    def __boundary_to_openfoam(self):
-        _body = "   %s\n" \
-                "   {\n" \
-                "       type %s;\n" \
-                "       faces\n" \
-                "       (" \
-                "       %s\n" \
-                "       );\n" \
-                "   }\n"
-
-        col = (_body % (name, attr['type'],
-                        '\n' + '\n'.join('\t' + str(indices).replace(",", "")
-                                         for indices in attr['faces']))
-               if isinstance(attr['faces'][0], tuple) else
-               _body % (name, attr['type'],
-                        '\n\t' + str(attr['faces']).replace(",", ""))
-               for name, attr in self.boundary.items())
-
-        return 'boundary\n(%s);\n' % '\n'.join(col)
+    def __write_boundary(self, f):
+        f.write('boundary\n(')
+        for count, (name, attr) in enumerate(self.boundary.items()):
+            if count:
+                f.write('\n')
+            f.write('   {}\n   {{\n       type {};\n       faces\n       (       '
+                    .format(name, attr['type']))
+            if isinstance(attr['faces'][0], tuple):
+                for indices in attr['faces']:
+                    f.write('\n\t')
+                    f.write(_foam_list(indices))
+            else:
+                f.write('\n\t')
+                f.write(_foam_list(attr['faces']))
+            f.write('\n       );\n   }\n')
+        f.write(');\n')
 
     @staticmethod
     def _distance(v1, v2):
@@ -761,7 +768,7 @@ class BlockMeshDict(FoamFile):
             groups[p[2]].append((p[0], p[1]))
 
         z_values = sorted(groups.keys())
-        point_groups = groups.values()
+        point_groups = list(groups.values())
 
         assert len(z_values) == 2, \
             'Number of Z values must be 2 not {}: {}.'.format(len(z_values),
@@ -783,36 +790,35 @@ class BlockMeshDict(FoamFile):
         sorted_points = [(pt[0], pt[1], z) for z in z_values for pt in sorted_points2d]
         return sorted_points
 
+    def _snapshot(self):
+        """Vertices and blocks are not in values. Use the file content."""
+        return self.to_openfoam()
+
+    def write(self, f):
+        """Write blockMeshDict to an open file.
+
+        Args:
+            f: A text or binary file handle.
+        """
+        with text_stream(f) as stream:
+            stream.write(self.header())
+            stream.write('\nconvertToMeters %.4f;\n\nvertices\n(\n' %
+                         self.convertToMeters)
+            for count, ver in enumerate(self.vertices):
+                stream.write('\t' if not count else '\n\t')
+                stream.write(_foam_list(ver))
+            stream.write('\n);\n\nblocks\n(\nhex {} {} {}\n);\n\n'.format(
+                _foam_list(self.vertices_order), _foam_list(self.n_div_xyz),
+                self.grading))
+            stream.write('edges\n(\n);\n\n')
+            self.__write_boundary(stream)
+            stream.write('\nmergePatchPair\n(\n);\n')
+
     def to_openfoam(self):
         """Return OpenFOAM representation as a string."""
-        _hea = self.header()
-        _body = "\nconvertToMeters %.4f;\n" \
-                "\n" \
-                "vertices\n" \
-                "(\n\t%s\n);\n" \
-                "\n" \
-                "blocks\n" \
-                "(\nhex %s %s %s\n);\n" \
-                "\n" \
-                "edges\n" \
-                "(%s);\n" \
-                "\n" \
-                "%s" \
-                "\n" \
-                "mergePatchPair\n" \
-                "(%s);\n"
-
-        return _hea + \
-            _body % (
-                self.convertToMeters,
-                "\n\t".join(tuple(str(ver).replace(",", "")
-                                  for ver in self.vertices)),
-                str(self.vertices_order).replace(",", ""),
-                str(self.n_div_xyz).replace(",", ""),
-                self.grading,  # blocks
-                "\n",  # edges
-                self.__boundary_to_openfoam(),  # boundary
-                "\n")  # merge patch pair
+        f = io.StringIO()
+        self.write(f)
+        return f.getvalue()
 
     def ToString(self):
         """Overwrite .NET ToString method."""
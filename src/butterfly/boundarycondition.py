@@ -7,6 +7,7 @@ from .fields import AtmBoundaryLayerInletVelocity, AtmBoundaryLayerInletK, \
     InletOutlet, KqRWallFunction, NutkWallFunction, NutkAtmRoughWallFunction, \
     Slip, ZeroGradient, AlphatJayatillekeWallFunction, FixedFluxPressure, Empty, \
     OmegaWallFunction, Field
+from .utilities import copy_object
 
 
 class BoundaryCondition(object):
@@ -149,6 +150,10 @@ class BoundaryCondition(object):
         """Duplicate Boundary Condition."""
         return deepcopy(self)
 
+    def __deepcopy__(self, memo):
+        """Copy the fields of boundary condition."""
+        return copy_object(self, memo)
+
     def ToString(self):
         """Overwrite .NET ToString."""
         return self.__repr__()
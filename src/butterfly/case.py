@@ -1,10 +1,13 @@
 ﻿"""Butterfly OpenFOAM Case."""
 import os
 import re  # to check input names
+import multiprocessing
+import threading
 from shutil import rmtree  # to remove case folders if needed
 from distutils.dir_util import copy_tree  # to copy sHM meshes over to tri
-from collections import namedtuple
+from collections import OrderedDict, namedtuple
 from copy import deepcopy
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 try:
     from itertools import izip as zip
 except:
@@ -13,10 +16,14 @@ except:
 from .version import Version
 from .utilities import load_case_files, load_probe_values_from_folder, \
     load_probes_from_postProcessing_file, load_probes_and_values_from_sample_file
-from .geometry import bf_geometry_from_stl_file, calculate_min_max_from_bf_geometries
+from .utilities import get_boundary_conditions_from_geometries
+from .geometry import bf_geometry_from_stl_file, calculate_min_max_from_bf_geometries, \
+    stl_signature, write_stl_file
 from .refinementRegion import refinementRegions_from_stl_file
 from .meshingparameters import MeshingParameters
 from .fields import Field
+from .meshcache import clone_case_folder, mesh_key
+from .parser import ParseCache, parse_cache
 
 #
 from .foamfile import FoamFile
@@ -51,6 +58,69 @@ from .decomposeParDict import DecomposeParDict
 from .sampleDict import SampleDict
 
 
+# stl files larger than this are parsed in a process pool by from_folder
+PROCESS_STL_SIZE = 8 * 1024 ** 2
+
+# from_folder imports dictionaries on a thread pool only if the files which are
+# not in the parse cache are larger than this in total
+THREAD_IMPORT_SIZE = 1024 ** 2
+
+# from_folder keeps a copy of imported foamfiles smaller than this and returns
+# copies of them until the files are modified
+CACHE_FOAMFILE_SIZE = 1024 ** 2
+
+# {(filepath, convertToMeters): ((mtime, size, inode), foamfile)}
+_imported = OrderedDict()
+_imported_lock = threading.Lock()
+
+
+def _call(function, args):
+    """Call function and return (result, exception)."""
+    try:
+        return function(*args), None
+    except Exception as e:
+        return None, e
+
+
+def _map_tasks(tasks, workers=None, processes=False):
+    """Run (function, args) tasks concurrently.
+
+    Args:
+        tasks: A list of (function, args). Functions should be picklable
+            (module level) for processes.
+        workers: Number of workers. Use 1 to run the tasks serially
+            (default: executor default).
+        processes: Use a process pool instead of a thread pool. Falls back to
+            threads if processes are not available (default: False).
+
+    Returns:
+        A list of (result, exception) in the same order as tasks.
+    """
+    if processes and not workers:
+        workers = multiprocessing.cpu_count()
+    if workers == 1 or len(tasks) < 2:
+        return [_call(f, args) for f, args in tasks]
+
+    executor = None
+    if processes:
+        try:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        except (NotImplementedError, OSError, ImportError):
+            executor = None
+    if executor is None:
+        executor = ThreadPoolExecutor(max_workers=workers)
+
+    with executor:
+        futures = [executor.submit(f, *args) for f, args in tasks]
+        results = []
+        for future in futures:
+            try:
+                results.append((future.result(), None))
+            except Exception as e:
+                results.append((None, e))
+    return results
+
+
 class Case(object):
     """
     Principal class for OpenFOAM Cases.
@@ -127,16 +197,39 @@ class Case(object):
         # use .add_refinementRegions to add regions to case
         self.__refinementRegions = []
 
+        # mesh is loaded from polyMesh folder on first call to .mesh
+        self.__mesh = None
+        self.__mesh_signature = None
+
+        # run manager is created on first call to .runmanager
+        self.__runmanager = None
+
+        # case folder when the case was loaded or saved. used by clone_to
+        self.__source_dir = None
+
+        # {filepath: ((mtime, size), stl_signature)} of written stl files
+        self.__stl_files = {}
+
     @classmethod
-    def from_folder(cls, path, name=None, convert_from_meters=1, import_geometry=False):
+    def from_folder(cls, path, name=None, convert_from_meters=1, import_geometry=False,
+                    workers=None, verbose=True):
         """Create a Butterfly case from a case folder.
 
+        Dictionaries are imported on a thread pool if the files which are not
+        in the parse cache are larger than THREAD_IMPORT_SIZE and stl files
+        larger than PROCESS_STL_SIZE on a process pool. Files are added to the
+        case in the same order as a serial import.
+
         Args:
             path: Full path to case folder.
             name: An optional new name for this case.
             convert_from_meters: A number to be multiplied to stl file vertices
                 to be converted to the new units if not meters. This value will
                 be the inverse of convertToMeters.
+            workers: Number of threads and processes. Use 1 to import the
+                files serially (default: executor default).
+            verbose: Print a message for each imported file. Failed imports
+                are always reported (default: True).
         """
         # collect foam files
         __originalName = os.path.split(path)[-1]
@@ -146,31 +239,60 @@ class Case(object):
         _files = load_case_files(path, fullpath=True)
 
         # convert files to butterfly objects
+        paths = tuple(p for f in (_files.zero, _files.constant, _files.system)
+                      for p in f if p)
+        tasks = [(cls.__import_foamfile, (p, 1.0 / convert_from_meters))
+                 for p in paths]
+        if workers is None and sum(os.path.getsize(p) for p in paths
+                                   if p not in parse_cache) < THREAD_IMPORT_SIZE:
+            # starting the threads takes longer than parsing a few small files
+            # or copying values from the parse cache
+            workers = 1
         ff = []
-        for f in (_files.zero, _files.constant, _files.system):
-            for p in f:
-                if not p:
-                    continue
-                try:
-                    ff.append(
-                        cls.__create_foamfile_from_file(
-                            p, 1.0 / convert_from_meters))
-                    print('Imported {} from case.'.format(p))
-                except Exception as e:
-                    print('Failed to import {}:\n\t{}'.format(p, e))
+        for p, (foamfile, e) in zip(paths, _map_tasks(tasks, workers)):
+            if e is not None:
+                print('Failed to import {}:\n\t{}'.format(p, e))
+                continue
+            ff.append(foamfile)
+            if verbose:
+                print('Imported {} from case.'.format(p))
         s_hmd = cls.__get_foam_file_by_name('snappyHexMeshDict', ff)
 
+        stlfiles = tuple(f for f in _files.stl if f and f.lower().endswith('.stl'))
         if s_hmd and import_geometry == True:
             s_hmd.project_name = name
-
-            stlfiles = tuple(f for f in _files.stl if f.lower().endswith('.stl'))
-            bf_geometries = tuple(
-                geo for f in stlfiles
-                for geo in bf_geometry_from_stl_file(f, convert_from_meters)
+            geometry_files = tuple(
+                f for f in stlfiles
                 if os.path.split(f)[-1][:-4] in s_hmd.stl_file_names)
+        else:
+            geometry_files = ()
 
+        if s_hmd:
+            region_files = tuple(
+                f for f in stlfiles
+                if os.path.split(f)[-1][:-4] in s_hmd.refinementRegion_names)
         else:
-            bf_geometries = []
+            region_files = ()
+
+        # parse all the stl files at once. large files in a process pool
+        tasks = [(bf_geometry_from_stl_file,
+                  (f, convert_from_meters, False,
+                   s_hmd.stl_regions(os.path.split(f)[-1][:-4])))
+                 for f in geometry_files] + \
+            [(refinementRegions_from_stl_file,
+              (f, s_hmd.refinementRegion_mode(os.path.split(f)[-1][:-4])))
+             for f in region_files]
+        large = any(os.path.getsize(f) > PROCESS_STL_SIZE
+                    for f in geometry_files + region_files)
+        results = _map_tasks(tasks, workers, processes=large)
+        for f, (_, e) in zip(geometry_files + region_files, results):
+            if e is not None:
+                raise e
+            if verbose:
+                print('Imported {} from case.'.format(f))
+
+        bf_geometries = [geo for geos, _ in results[:len(geometry_files)]
+                         for geo in geos]
 
         _case = cls(name, ff, bf_geometries)
 
@@ -190,20 +312,15 @@ class Case(object):
                     else:
                         setattr(geo.boundary_condition, ff.name, Field.from_dict(f))
 
-        if s_hmd:
-            refinementRegions = tuple(
-                ref for f in _files.stl
-                if os.path.split(f)[-1][:-4] in s_hmd.refinementRegion_names
-                for ref in refinementRegions_from_stl_file(
-                    f, s_hmd.refinementRegion_mode(os.path.split(f)[-1][:-4]))
-            )
-
-            _case.add_refinementRegions(refinementRegions)
+        if region_files:
+            _case.add_refinementRegions(
+                ref for refs, _ in results[len(geometry_files):] for ref in refs)
 
         # original name is a variable to address the current limitation to change
         # the name of stl file in snappyHexMeshDict. It will be removed once the
         # limitation is addressed.
         _case.__originalName = __originalName
+        _case.__source_dir = os.path.abspath(path)
 
         return _case
 
@@ -278,15 +395,17 @@ class Case(object):
         except TypeError:
             _geometries = tuple(geometries) + blockMeshDict.geometry
 
-        u = U.from_bf_geometries(_geometries)
-        p = P.from_bf_geometries(_geometries)
-        k = K.from_bf_geometries(_geometries)
-        epsilon = Epsilon.from_bf_geometries(_geometries)
-        omega = Omega.from_bf_geometries(_geometries)
-        nut = Nut.from_bf_geometries(_geometries)
-        t = T.from_bf_geometries(_geometries)
-        alphat = Alphat.from_bf_geometries(_geometries)
-        p_rgh = P_rgh.from_bf_geometries(_geometries)
+        # go through geometries once for all the fields
+        _bcs = get_boundary_conditions_from_geometries(_geometries)
+        u = U.from_bf_geometries(_bcs)
+        p = P.from_bf_geometries(_bcs)
+        k = K.from_bf_geometries(_bcs)
+        epsilon = Epsilon.from_bf_geometries(_bcs)
+        omega = Omega.from_bf_geometries(_bcs)
+        nut = Nut.from_bf_geometries(_bcs)
+        t = T.from_bf_geometries(_bcs)
+        alphat = Alphat.from_bf_geometries(_bcs)
+        p_rgh = P_rgh.from_bf_geometries(_bcs)
 
         # system folder
         fvSchemes = FvSchemes()
@@ -375,6 +494,31 @@ class Case(object):
         """polyMesh folder fullpath."""
         return os.path.join(self.project_dir, 'constant/polyMesh')
 
+    @property
+    def mesh(self):
+        """Mesh in constant/polyMesh as a butterfly.polymesh.PolyMesh.
+
+        The mesh is loaded on the first call and arrays such as cell_centres
+        and cell_volumes are calculated once when they are requested. The mesh
+        will be reloaded if the files in polyMesh folder change.
+        """
+        from .polymesh import PolyMesh
+
+        assert os.path.isdir(self.polyMesh_folder), \
+            'Failed to find polyMesh folder at {}.'.format(self.polyMesh_folder)
+
+        signature = tuple(
+            (f, os.stat(os.path.join(self.polyMesh_folder, f)).st_mtime,
+             os.stat(os.path.join(self.polyMesh_folder, f)).st_size)
+            for f in sorted(os.listdir(self.polyMesh_folder))
+            if f.split('.')[0] in ('points', 'faces', 'owner', 'neighbour',
+                                   'boundary'))
+
+        if self.__mesh is None or signature != self.__mesh_signature:
+            self.__mesh = PolyMesh(self.polyMesh_folder)
+            self.__mesh_signature = signature
+        return self.__mesh
+
     @property
     def triSurface_folder(self):
         """triSurface folder fullpath."""
@@ -645,22 +789,37 @@ class Case(object):
         """
         raise NotImplementedError()
 
-    def save(self, overwrite=False, minimum=True):
+    def save(self, overwrite=False, minimum=True, stl_format='ascii'):
         """Save case to folder.
 
+        Only the foamfiles and stl files which have changed since they were
+        last saved or loaded are written. Files are written to a temporary file
+        first and moved over the current file.
+
         Args:
-            overwrite: If True all the current content will be overwritten
-                (default: False).
+            overwrite: If True result folders, processor folders,
+                postProcessing and snappyHexMesh folders will be removed. The
+                mesh in polyMesh folder is also removed if any of the meshing
+                inputs has changed (default: False).
             minimum: Write minimum necessary files for case. These files will
                 be enough for meshing the case but not running any commands.
                 Files are ('fvSchemes', 'fvSolution', 'controlDict',
                 'blockMeshDict','snappyHexMeshDict'). Rest of the files will be
                 created from a Solution.
+            stl_format: Format of stl files in triSurface folder. ascii or
+                binary. Binary files are about 5 times smaller and faster to
+                read for snappyHexMesh (default: ascii).
         """
-        # create folder and subfolders if they are not already created
-        if overwrite and os.path.exists(self.project_dir):
-            rmtree(self.project_dir, ignore_errors=True)
+        assert stl_format in ('ascii', 'binary'), \
+            'stl_format should be ascii or binary not {}.'.format(stl_format)
+
+        # meshing inputs before saving to find out if the mesh is outdated
+        if overwrite and os.path.isdir(self.project_dir):
+            key = mesh_key(self.project_dir)
+        else:
+            key = None
 
+        # create folder and subfolders if they are not already created
         for f in self.SUBFOLDERS:
             p = os.path.join(self.project_dir, f)
             if not os.path.exists(p):
@@ -673,6 +832,12 @@ class Case(object):
                     else:
                         raise IOError(msg)
 
+        # region names in snappyHexMeshDict depend on stl format
+        stl_name = self.__originalName or self.project_name
+        if self.__geometries and hasattr(self, 'snappyHexMeshDict'):
+            self.snappyHexMeshDict.set_stl_regions(
+                stl_name, self.__geometries, stl_format)
+
         # save foamfiles
         if minimum:
             foam_files = (ff for ff in self.foam_files
@@ -688,25 +853,203 @@ class Case(object):
         bmd = next(bmds)
         convertToMeters = bmd.convertToMeters
 
-        # write bfgeometries to stl file. __geometries is geometries without
+        # stream bfgeometries to stl file. __geometries is geometries without
         # blockMesh geometry
-        stl_str = (geo.to_stl(convertToMeters) for geo in self.__geometries)
-        stl_name = self.__originalName or self.project_name
-        with open(os.path.join(self.triSurface_folder,
-                               '%s.stl' % stl_name), 'wb') as stlf:
-            stlf.writelines(stl_str)
+        self.__write_stl(
+            os.path.join(self.triSurface_folder, '%s.stl' % stl_name),
+            self.__geometries, convertToMeters, stl_format)
 
         # write refinementRegions to stl files
         for ref in self.refinementRegions:
-            ref.write_to_stl(self.triSurface_folder, convertToMeters)
+            self.__write_stl(
+                os.path.join(self.triSurface_folder, '%s.stl' % ref.name),
+                (ref,), convertToMeters, stl_format)
+
+        if key:
+            self.purge(remove_polyMesh_content=key != mesh_key(self.project_dir),
+                       remove_result_folders=True,
+                       remove_postProcessing_folder=True)
+            self.remove_processor_folders()
 
         # add .foam file
-        with open(os.path.join(self.project_dir,
-                               self.project_name + '.foam'), 'wb') as ffile:
-            ffile.write(b'')
+        foam = os.path.join(self.project_dir, self.project_name + '.foam')
+        if not os.path.isfile(foam):
+            with open(foam, 'wb') as ffile:
+                ffile.write(b'')
 
+        self.__source_dir = os.path.abspath(self.project_dir)
         print('{} is saved to: {}'.format(self.project_name, self.project_dir))
 
+    @staticmethod
+    def __stat(filepath):
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        return st.st_mtime, st.st_size
+
+    def __write_stl(self, filepath, geometries, convertToMeters, stl_format):
+        """Write geometries to an stl file if they have changed.
+
+        Returns:
+            True if the file is written.
+        """
+        filepath = os.path.abspath(filepath)
+        signature = stl_signature(geometries, convertToMeters, stl_format)
+        if self.__stl_files.get(filepath) == (self.__stat(filepath), signature):
+            return False
+        write_stl_file(filepath, geometries, convertToMeters, stl_format)
+        self.__stl_files[filepath] = (self.__stat(filepath), signature)
+        return True
+
+    def clone_to(self, path, share_mesh=True):
+        """Clone this case to a new case folder.
+
+        Only the dictionaries which are changed since the case was loaded or
+        saved are written. The rest of the case folder is copied and mesh files
+        (constant/polyMesh, stl files in constant/triSurface, cellLevel and
+        pointLevel) are reflinked or hard linked to the original case. Only
+        0, constant and system folders are copied.
+        Geometries are not written again and changes to them are ignored.
+
+        Hard linked mesh files must not be overwritten in the clone (e.g.
+        renumberMesh -overwrite). Run blockMesh before snappyHexMesh
+        -overwrite to remesh a clone or use share_mesh=False.
+
+        Args:
+            path: Full path to new case folder. Folder name will be the
+                project name of the clone. It will be removed if exists.
+            share_mesh: Link mesh files instead of copying them (default: True).
+
+        Returns:
+            A butterfly Case for the clone.
+        """
+        assert self.__source_dir and os.path.isdir(self.__source_dir), \
+            'Failed to find the folder for {}. Save the case before cloning ' \
+            'it.'.format(self.project_name)
+        path = os.path.abspath(path)
+        assert os.path.normpath(path) != os.path.normpath(self.__source_dir), \
+            'Cannot clone {} to its own folder.'.format(self.project_name)
+
+        # path of foamfiles relative to case folder
+        rel_paths, changed = {}, set()
+        for ff in self.foam_files:
+            saved = ff.saved_file
+            if saved and saved.startswith(self.__source_dir + os.sep):
+                rel_paths[ff.name] = os.path.relpath(saved, self.__source_dir)
+                if ff.is_saved(saved):
+                    continue
+            else:
+                rel_paths[ff.name] = os.path.join(
+                    ff.location.replace('"', ''), ff.name)
+            changed.add(ff.name)
+
+        skip = tuple(rel_paths[name] for name in changed)
+        clone_case_folder(self.__source_dir, path, share_mesh, skip)
+
+        case = self.duplicate()
+        case.working_dir, case.project_name = os.path.split(path)
+        case.__source_dir = path
+
+        for ff in case.foam_files:
+            if ff.name in changed:
+                ff.save(path, os.path.dirname(rel_paths[ff.name]))
+            else:
+                ff.mark_saved(os.path.join(path, rel_paths[ff.name]))
+
+        # stl files are linked or copied from this case
+        case.__stl_files = {}
+        for filepath, (_, signature) in self.__stl_files.items():
+            if filepath.startswith(self.__source_dir + os.sep):
+                filepath = os.path.join(
+                    path, os.path.relpath(filepath, self.__source_dir))
+                case.__stl_files[filepath] = (self.__stat(filepath), signature)
+
+        foam = os.path.join(path, case.project_name + '.foam')
+        if not os.path.isfile(foam):
+            with open(foam, 'wb') as ffile:
+                ffile.write(b'')
+
+        return case
+
+    @property
+    def runmanager(self):
+        """Run manager to run OpenFOAM commands for this case.
+
+        RunManagerPosix is used on Linux, macOS and WSL and RunManagerBlueCFD on
+        Windows.
+        """
+        if os.name == 'posix':
+            if self.__runmanager is None or \
+                    self.__runmanager.project_folder != self.project_dir:
+                from .runmanager_posix import RunManagerPosix
+                self.__runmanager = RunManagerPosix(self.project_name,
+                                                    self.project_dir)
+        elif self.__runmanager is None:
+            from .runmanager_bluecfd import RunManagerBlueCFD
+            self.__runmanager = RunManagerBlueCFD(self.project_name)
+        return self.__runmanager
+
+    def command(self, cmd, args=None, decomposeParDict=None, run=True, wait=True):
+        """Run an OpenFOAM command for this case.
+
+        This method creates a log and err file under log folder for each
+        command.
+
+        Args:
+            cmd: OpenFOAM command.
+            args: Command arguments.
+            decomposeParDict: Optional input for decomposeParDict to run analysis
+                in parallel if desired.
+            run: Run the command. If False only the command lines are returned.
+            wait: Wait until command is finished. If False the process is
+                returned as soon as it is started.
+        Returns:
+            If run is True returns a namedtuple for
+                (success, error, process, logfiles, errorfiles). success and
+                error are only checked if wait is True.
+            else returns a namedtuple for (cmd, logfiles, errorfiles).
+        """
+        if not run:
+            return self.runmanager.command(cmd, args, decomposeParDict)
+
+        log = namedtuple('log', 'success error process logfiles errorfiles')
+        p, logfiles, errfiles = self.runmanager.run(cmd, args, decomposeParDict,
+                                                    wait)
+        logfiles = tuple(os.path.normpath(os.path.join(self.project_dir, f))
+                         for f in logfiles)
+        errfiles = tuple(os.path.normpath(os.path.join(self.project_dir, f))
+                         for f in errfiles)
+
+        if not wait:
+            return log(True, None, p, logfiles, errfiles)
+
+        return self.check_command(cmd, log(True, None, p, logfiles, errfiles))
+
+    def check_command(self, cmd, log):
+        """Wait for a command to finish and check if it was successful.
+
+        Args:
+            cmd: OpenFOAM command.
+            log: The namedtuple from command(..., wait=False).
+        Returns:
+            A namedtuple for (success, error, process, logfiles, errorfiles).
+        """
+        p = log.process
+        if hasattr(p, 'wait'):
+            p.wait()
+        has_error, err = self.runmanager.check_file_contents(log.errorfiles,
+                                                             mute=True)
+        # use exit code if available. OpenFOAM may write warnings to stderr
+        returncode = getattr(p, 'returncode', None)
+        if returncode is None:
+            success = not has_error
+        else:
+            success = returncode == 0
+            if not success and not err:
+                err = '{} failed with exit code {}.'.format(cmd, returncode)
+        return log._replace(success=success, error=None if success else err)
+
     def blockMesh(self, args=None, wait=True, overwrite=True,):
         """Run blockMesh.
 
@@ -833,6 +1176,34 @@ class Case(object):
             if f.name == name:
                 return f
 
+    @classmethod
+    def __import_foamfile(cls, p, convertToMeters=1):
+        """Create a foamfile from file and mark it as saved to the file.
+
+        Copying a foamfile which is already imported is faster than creating
+        it again from the parsed values.
+        """
+        key = (os.path.abspath(p), convertToMeters)
+        try:
+            stamp = ParseCache.stamp(p)
+        except OSError:
+            stamp = None
+        with _imported_lock:
+            cached = _imported.pop(key, None)
+            if cached and cached[0] == stamp:
+                _imported[key] = cached
+                return cached[1].duplicate()
+
+        foamfile = cls.__create_foamfile_from_file(p, convertToMeters)
+        if foamfile:
+            foamfile.mark_saved(p)
+            if stamp and stamp[1] <= CACHE_FOAMFILE_SIZE:
+                with _imported_lock:
+                    _imported[key] = (stamp, foamfile.duplicate())
+                    while len(_imported) > parse_cache.maxsize:
+                        _imported.popitem(last=False)
+        return foamfile
+
     @staticmethod
     def __create_foamfile_from_file(p, convertToMeters=1):
         """Create a foamfile object from an OpenFOAM foamfile.
@@ -887,6 +1258,29 @@ class Case(object):
         # This is a abstract property which should be implemented in subclasses
         raise NotImplementedError()
 
+    def load_field(self, field, time=None, copy=False):
+        """Load an OpenFOAM field from a time folder as numpy arrays.
+
+        Args:
+            field: Field name (e.g. U, p).
+            time: Time folder name. Default is the latest result folder or 0 if
+                there is no results.
+            copy: Set to True to copy binary data to new arrays instead of
+                returning views over the memory-mapped file (default: False).
+
+        Returns:
+            A namedtuple of (name, field_class, dimensions, internal_field,
+            boundary_field). See butterfly.volfield.load_field.
+        """
+        from .volfield import load_field
+
+        if time is None:
+            folders = self.get_result_folders()
+            time = folders[-1] if folders else '0'
+
+        return load_field(
+            os.path.join(self.project_dir, str(time), field), copy)
+
     def load_probe_values(self, field):
         """Return OpenFOAM probes results for a field."""
         if self.probes.probes_count == 0:
@@ -910,8 +1304,17 @@ class Case(object):
         return load_probes_from_postProcessing_file(self.probes_folder, field)
 
     def duplicate(self):
-        """Return a copy of this object."""
-        return deepcopy(self)
+        """Return a copy of this object.
+
+        Loaded mesh and run manager are not copied and are created again on
+        first use.
+        """
+        mesh, runmanager = self.__mesh, self.__runmanager
+        self.__mesh = self.__runmanager = None
+        try:
+            return deepcopy(self)
+        finally:
+            self.__mesh, self.__runmanager = mesh, runmanager
 
     def ToString(self):
         """Overwrite .NET ToString method."""
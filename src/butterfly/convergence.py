@@ -0,0 +1,363 @@
+# coding=utf-8
+"""Detect convergence of a running case and stop the solver cleanly.
+
+ConvergenceMonitor follows forceCoeffs.dat and the solver log of a running
+case and checks a list of criteria every few seconds. Once the criteria are
+met it writes stopAt writeNow to system/controlDict. With runTimeModifiable
+the solver reads the change, writes the current time step and exits
+normally.
+
+    Usage:
+
+        log = case.command('simpleFoam', wait=False)
+        monitor = ConvergenceMonitor(
+            case.project_dir,
+            (ForceVariance('Cd', window=100, tolerance=1e-3),
+             ResidualThreshold(1e-4)),
+            logfile=log.logfiles[-1])
+        status = monitor.watch(log.process)
+"""
+import os
+import re
+import time
+from collections import namedtuple
+
+from .parser import FunctionObjectParser, ResidualParser
+from .utilities import atomic_write
+
+ConvergenceStatus = namedtuple('ConvergenceStatus',
+                               'converged stopped time messages')
+
+_stop_at = re.compile(r'^([ \t]*stopAt[ \t]+)[^;\s]+([ \t]*;)', re.M)
+
+
+def write_stop_at(project_folder, value='writeNow'):
+    """Set stopAt in system/controlDict without touching the rest of the file.
+
+    The file is written to a temporary file and moved over controlDict so the
+    solver never reads a partially written file.
+
+    Args:
+        project_folder: Full path to case folder.
+        value: A valid stopAt value (default: writeNow).
+    """
+    filepath = os.path.join(project_folder, 'system', 'controlDict')
+    with open(filepath) as f:
+        text = f.read()
+
+    text, count = _stop_at.subn(r'\g<1>{}\g<2>'.format(value), text, count=1)
+    if not count:
+        text = '{}\nstopAt          {};\n'.format(text.rstrip(), value)
+
+    with atomic_write(filepath, 'w') as f:
+        f.write(text)
+
+
+class Criterion(object):
+    """Base class for convergence criteria.
+
+    Subclasses implement check which returns (met, message).
+    """
+
+    def check(self, forces, residuals):
+        """Check the criterion.
+
+        Args:
+            forces: A FunctionObjectParser for forceCoeffs.dat or None.
+            residuals: A ResidualParser for solver log or None.
+
+        Returns:
+            (met, message)
+        """
+        raise NotImplementedError()
+
+    @staticmethod
+    def _values(forces, coefficient):
+        """Values of a force coefficient or an empty tuple."""
+        if forces is None or coefficient not in forces.columns:
+            return ()
+        return forces.get_values(coefficient)
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+
+class ForceVariance(Criterion):
+    """Force coefficient is flat over a sliding window.
+
+    Met when standard deviation / |mean| of the last window values is less
+    than tolerance.
+
+    Args:
+        coefficient: Column in forceCoeffs.dat (default: Cd).
+        window: Number of iterations in window (default: 100).
+        tolerance: Relative standard deviation (default: 1e-3).
+    """
+
+    def __init__(self, coefficient='Cd', window=100, tolerance=1e-3):
+        """Init criterion."""
+        self.coefficient = coefficient
+        self.window = int(window)
+        self.tolerance = float(tolerance)
+
+    def check(self, forces, residuals):
+        """Check the criterion."""
+        values = self._values(forces, self.coefficient)
+        if len(values) < self.window:
+            return False, '{}: {} of {} iterations'.format(
+                self.coefficient, len(values), self.window)
+
+        values = values[-self.window:]
+        mean = abs(values.mean())
+        deviation = values.std() / mean if mean else float('inf')
+        return bool(deviation <= self.tolerance), \
+            '{}: relative deviation {:.3g} over {} iterations'.format(
+                self.coefficient, deviation, self.window)
+
+    def __repr__(self):
+        """Criterion representation."""
+        return 'ForceVariance::{}::{}::{}'.format(
+            self.coefficient, self.window, self.tolerance)
+
+
+class ResidualThreshold(Criterion):
+    """Initial residuals are below thresholds.
+
+    Args:
+        thresholds: A single value for all the solved quantities or a
+            dictionary of quantity: threshold (e.g. {'p': 1e-4, 'Ux': 1e-5}).
+    """
+
+    def __init__(self, thresholds=1e-4):
+        """Init criterion."""
+        self.thresholds = thresholds
+
+    def check(self, forces, residuals):
+        """Check the criterion."""
+        if residuals is None or not len(residuals):
+            return False, 'residuals: no time steps'
+
+        values = residuals.initial_residuals
+        if isinstance(self.thresholds, dict):
+            thresholds = self.thresholds
+        else:
+            thresholds = dict((q, self.thresholds) for q in values)
+
+        above = []
+        for quantity, threshold in thresholds.items():
+            try:
+                solved = values[quantity][values[quantity] == values[quantity]]
+            except KeyError:
+                solved = ()
+            if not len(solved) or solved[-1] > threshold:
+                above.append(quantity)
+
+        if above:
+            return False, 'residuals: {} above threshold'.format(
+                ', '.join(sorted(above)))
+        return True, 'residuals: all below threshold'
+
+    def __repr__(self):
+        """Criterion representation."""
+        return 'ResidualThreshold::{}'.format(self.thresholds)
+
+
+class Oscillation(Criterion):
+    """Force coefficient oscillates around a stable mean.
+
+    Some cases never become flat (e.g. vortex shedding in a steady state
+    solver). Met when the last window has at least min_cycles oscillations and
+    the mean over the complete cycles of the last window and the window before
+    it differ less than tolerance.
+
+    Args:
+        coefficient: Column in forceCoeffs.dat (default: Cd).
+        window: Number of iterations in window (default: 200).
+        tolerance: Relative difference between mean values (default: 1e-3).
+        min_cycles: Minimum number of oscillations in window (default: 3).
+    """
+
+    def __init__(self, coefficient='Cd', window=200, tolerance=1e-3,
+                 min_cycles=3):
+        """Init criterion."""
+        self.coefficient = coefficient
+        self.window = int(window)
+        self.tolerance = float(tolerance)
+        self.min_cycles = int(min_cycles)
+
+    @staticmethod
+    def cycle_mean(values):
+        """Mean of values over complete cycles and number of cycles.
+
+        Cycles start where the values cross their mean upwards.
+        """
+        side = values > values.mean()
+        up = (~side[:-1] & side[1:]).nonzero()[0] + 1
+        if len(up) < 2:
+            return values.mean(), 0
+        return values[up[0]:up[-1]].mean(), len(up) - 1
+
+    def check(self, forces, residuals):
+        """Check the criterion."""
+        values = self._values(forces, self.coefficient)
+        if len(values) < 2 * self.window:
+            return False, '{}: {} of {} iterations'.format(
+                self.coefficient, len(values), 2 * self.window)
+
+        last = values[-self.window:]
+        mean, cycles = self.cycle_mean(last)
+        previous, _ = self.cycle_mean(values[-2 * self.window:-self.window])
+        change = abs(mean - previous) / abs(mean) if mean else float('inf')
+        met = bool(change <= self.tolerance and cycles >= self.min_cycles)
+        return met, '{}: mean {:.6g} changed {:.3g} with amplitude {:.3g} ' \
+            'over {} cycles'.format(self.coefficient, mean, change,
+                                    (last.max() - last.min()) / 2.0, cycles)
+
+    def __repr__(self):
+        """Criterion representation."""
+        return 'Oscillation::{}::{}::{}'.format(
+            self.coefficient, self.window, self.tolerance)
+
+
+class ConvergenceMonitor(object):
+    """Follow a running case and stop it once it's converged.
+
+    Args:
+        project_folder: Full path to case folder.
+        criteria: A list of criteria.
+        require_all: If True all criteria must be met. Otherwise any of them
+            (default: True).
+        logfile: Solver log for residuals (default: log/<application>.log).
+        forces_function: Name of forceCoeffs function (default: forces).
+        min_iterations: Don't stop before this number of iterations
+            (default: 0).
+    """
+
+    def __init__(self, project_folder, criteria, require_all=True, logfile=None,
+                 forces_function='forces', min_iterations=0):
+        """Init monitor."""
+        self.project_folder = project_folder
+        self.criteria = tuple(criteria)
+        assert self.criteria, 'At least one criterion is required.'
+        self.require_all = require_all
+        self.logfile = logfile
+        self.forces_function = forces_function
+        self.min_iterations = min_iterations
+        self.stopped = False
+        self.__forces = None
+        self.__residuals = None
+
+    @property
+    def forces(self):
+        """FunctionObjectParser for the latest forceCoeffs.dat."""
+        folder = os.path.join(self.project_folder, 'postProcessing',
+                              self.forces_function)
+        try:
+            times = [t for t in os.listdir(folder)
+                     if any(os.path.isfile(os.path.join(folder, t, f))
+                            for f in ('forceCoeffs.dat', 'coefficient.dat'))]
+        except OSError:
+            return None
+        if not times:
+            return None
+
+        def key(name):
+            try:
+                return float(name)
+            except ValueError:
+                return float('-inf')
+
+        folder = os.path.join(folder, max(times, key=key))
+        filepath = os.path.join(folder, 'forceCoeffs.dat')
+        if not os.path.isfile(filepath):
+            filepath = os.path.join(folder, 'coefficient.dat')
+        # follow the file of the latest start time after a restart
+        if self.__forces is None or self.__forces.filepath != filepath:
+            self.__forces = FunctionObjectParser(filepath, parse=False)
+        return self.__forces
+
+    @property
+    def residuals(self):
+        """ResidualParser for solver log."""
+        if self.__residuals is None:
+            logfile = self.logfile or self.__default_logfile()
+            if not logfile:
+                return None
+            self.__residuals = ResidualParser(logfile, parse=False)
+        return self.__residuals
+
+    def __default_logfile(self):
+        filepath = os.path.join(self.project_folder, 'system', 'controlDict')
+        try:
+            with open(filepath) as f:
+                application = re.search(r'^\s*application\s+(\w+)\s*;',
+                                        f.read(), re.M).group(1)
+        except (IOError, AttributeError):
+            return None
+        return os.path.join(self.project_folder, 'log',
+                            '{}.log'.format(application))
+
+    def update(self):
+        """Read new values and check the criteria.
+
+        Returns:
+            A namedtuple of (converged, stopped, time, messages).
+        """
+        forces, residuals = self.forces, self.residuals
+        for parser in (forces, residuals):
+            if parser is not None:
+                parser.parse()
+
+        results = [c.check(forces, residuals) for c in self.criteria]
+        met = [r[0] for r in results]
+        converged = all(met) if self.require_all else any(met)
+
+        iterations = max(len(forces or ()), len(residuals or ()))
+        if iterations < self.min_iterations:
+            converged = False
+
+        if residuals is not None and len(residuals):
+            latest = float(residuals.timestep)
+        elif forces is not None and len(forces):
+            latest = float(forces.times[-1])
+        else:
+            latest = None
+
+        return ConvergenceStatus(converged, self.stopped, latest,
+                                 tuple(r[1] for r in results))
+
+    def stop(self):
+        """Write stopAt writeNow to controlDict."""
+        write_stop_at(self.project_folder, 'writeNow')
+        self.stopped = True
+
+    def watch(self, process, interval=5):
+        """Check the criteria until the process is finished.
+
+        The case is stopped the first time the criteria are met. Use it with
+        a process from Case.command(..., wait=False).
+
+        Args:
+            process: A process with poll method.
+            interval: Seconds between checks (default: 5).
+
+        Returns:
+            The latest ConvergenceStatus.
+        """
+        status = self.update()
+        while process.poll() is None:
+            if status.converged and not self.stopped:
+                self.stop()
+            time.sleep(interval)
+            status = self.update()
+        return status._replace(stopped=self.stopped)
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Monitor representation."""
+        return 'ConvergenceMonitor::{}::{} criteria'.format(
+            self.project_folder, len(self.criteria))
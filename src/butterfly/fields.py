@@ -3,6 +3,109 @@
 from collections import OrderedDict
 from copy import deepcopy
 
+import numpy as np
+
+from .utilities import copy_object
+
+
+class NonuniformList(object):
+    """Values of a nonuniform field as a numpy array.
+
+    Arrays are stored as they are and written as nonuniform List<type> in
+    ascii or binary format without converting them to strings.
+
+    Args:
+        values: A (n,) array for scalars or a (n, 3) array for vectors
+            ((n, 6) for symmTensor and (n, 9) for tensor).
+        kind: OpenFOAM type of items (scalar, vector, symmTensor, tensor or
+            label). By default kind is set from the shape of values.
+    """
+
+    KINDS = {1: 'scalar', 3: 'vector', 6: 'symmTensor', 9: 'tensor'}
+
+    def __init__(self, values, kind=None):
+        """Init nonuniform list."""
+        if isinstance(values, NonuniformList):
+            kind = kind or values.kind
+            values = values.values
+        values = np.asarray(values)
+        if values.ndim == 2 and values.shape[1] == 1:
+            values = values[:, 0]
+        width = 1 if values.ndim == 1 else values.shape[-1]
+        assert values.ndim in (1, 2) and width in self.KINDS, \
+            'Invalid shape for a nonuniform list: {}.'.format(values.shape)
+        self.kind = kind or self.KINDS[width]
+        self.values = values
+
+    @property
+    def dtype(self):
+        """numpy dtype for binary data. Byte order is always little endian."""
+        return '<i4' if self.kind == 'label' else '<f8'
+
+    def write_foam(self, f, binary=False, precision=None):
+        """Write nonuniform List<type> to an open file.
+
+        Args:
+            f: A text file handle. Binary lists need a handle with a buffer.
+            binary: Write values as binary data (default: False).
+            precision: Number of significant digits for ascii values
+                (default: repr).
+        """
+        from .foamarray import write_list
+        f.write('nonuniform List<{}>'.format(self.kind))
+        write_list(f, self.values, self.dtype, binary, precision)
+
+    def __len__(self):
+        """Number of items."""
+        return len(self.values)
+
+    def __eq__(self, other):
+        """Check if kind and values are the same."""
+        if not isinstance(other, NonuniformList):
+            return False
+        if self.values is other.values:
+            return True
+        return self.kind == other.kind and \
+            self.values.shape == other.values.shape and \
+            bool((self.values == other.values).all())
+
+    def __ne__(self, other):
+        """Check inequality."""
+        return not self.__eq__(other)
+
+    __hash__ = None
+
+    def __deepcopy__(self, memo):
+        """Read-only arrays (e.g. a memory-mapped file) are not copied."""
+        if not self.values.flags.writeable:
+            return self
+        return NonuniformList(self.values.copy(), self.kind)
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Nonuniform list representation."""
+        return 'nonuniform List<{}> ({} items)'.format(self.kind, len(self))
+
+
+def field_value(value, is_unifrom=True):
+    """Convert a value to an OpenFOAM field value.
+
+    numpy arrays are converted to NonuniformList if is_unifrom is False.
+    Otherwise they are written as uniform values (e.g. uniform (1 0 0)).
+    """
+    if isinstance(value, NonuniformList) or hasattr(value, 'ndim'):
+        if not is_unifrom:
+            return NonuniformList(value)
+        if isinstance(value, NonuniformList):
+            raise ValueError('A nonuniform list can\'t be uniform.')
+        if value.ndim == 0:
+            return 'uniform {!r}'.format(value.item())
+        return 'uniform ({})'.format(' '.join(repr(v) for v in value.tolist()))
+    return 'uniform {}'.format(str(value)) if is_unifrom else str(value)
+
 
 class Field(object):
     """OpenFOAM field values base class."""
@@ -41,6 +144,10 @@ class Field(object):
         """Return a copy of this object."""
         return deepcopy(self)
 
+    def __deepcopy__(self, memo):
+        """Copy the values dictionary and share the strings."""
+        return copy_object(self, memo)
+
     def ToString(self):
         """Overwrite .NET ToString method."""
         return self.__repr__()
@@ -73,15 +180,16 @@ class Calculated(Field):
     """OpenFOAM calculated value.
 
     Args:
-        value: value.
+        value: value. A numpy array with is_unifrom=False is stored as a
+            NonuniformList.
         is_unifrom: A boolean that indicates if the values is uniform.
     """
 
     def __init__(self, value=None, is_unifrom=True):
         """Init Calculated class."""
         Field.__init__(self)
-        if value:
-            self.value = 'uniform {}'.format(str(value)) if is_unifrom else str(value)
+        if hasattr(value, 'ndim') or isinstance(value, NonuniformList) or value:
+            self.value = field_value(value, is_unifrom)
         else:
             self.value = None
 
@@ -89,7 +197,7 @@ class Calculated(Field):
     def value_dict(self):
         """Get fields as a dictionary."""
         _d = OrderedDict()
-        if self.value:
+        if self.value is not None:
             _d['type'] = self.type
             _d['value'] = self.value
         else:
@@ -238,14 +346,15 @@ class FixedValue(Field):
     """OpenFOAM fixed value.
 
     Args:
-        value: value.
+        value: value. A numpy array with is_unifrom=False is stored as a
+            NonuniformList (e.g. a mapped inlet profile).
         is_unifrom: A boolean that indicates if the values is uniform.
     """
 
     def __init__(self, value, is_unifrom=True):
         """Init the class."""
         Field.__init__(self)
-        self.value = 'uniform {}'.format(str(value)) if is_unifrom else str(value)
+        self.value = field_value(value, is_unifrom)
 
     @property
     def value_dict(self):
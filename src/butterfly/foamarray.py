@@ -0,0 +1,301 @@
+"""Read and write OpenFOAM lists (labelList, vectorField, faceList, ...).
+
+Both ascii and binary formats are supported. Files are memory-mapped and the
+binary data is read with numpy.frombuffer without any parsing in Python.
+Gzipped files (*.gz) are decompressed in memory. Lists are written from numpy
+arrays in chunks so large lists never exist as a single string.
+"""
+import gzip
+import io
+import mmap
+import os
+import re
+
+import numpy as np
+
+from .parser import CppDictParser
+
+# number of components for each OpenFOAM type
+COMPONENTS = {'label': 1, 'scalar': 1, 'vector': 3, 'symmTensor': 6,
+              'tensor': 9, 'sphericalTensor': 1}
+
+_header = re.compile(br'FoamFile\s*\{(.*?)\}', re.DOTALL)
+# list size followed by ( or { for uniform lists. Comments are skipped.
+_list_start = re.compile(
+    br'(?:\s|//[^\n]*|/\*.*?\*/)*(\d+)(?:\s|//[^\n]*|/\*.*?\*/)*([({])',
+    re.DOTALL)
+_list_end = re.compile(br'\n[ \t]*\)')
+
+# number of items which are formatted at once in write_list
+CHUNK_SIZE = 1 << 14
+
+
+def read_file(filepath):
+    """Return the content of an OpenFOAM file as a buffer.
+
+    Uncompressed files are memory-mapped and gzipped files (*.gz) are read to
+    memory. If filepath doesn't exist filepath + '.gz' will be tried.
+    """
+    if not os.path.isfile(filepath) and os.path.isfile(filepath + '.gz'):
+        filepath += '.gz'
+
+    assert os.path.isfile(filepath), 'Failed to find {}'.format(filepath)
+
+    if filepath.endswith('.gz'):
+        with gzip.open(filepath, 'rb') as f:
+            return f.read()
+
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return b''
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_header(buf):
+    """Read FoamFile header.
+
+    Args:
+        buf: File content as bytes or a memory-mapped file.
+
+    Returns:
+        A tuple of (header values as a dictionary, index of the first byte
+        after the header).
+    """
+    match = _header.search(buf, 0, 4096) or _header.search(buf)
+    if not match:
+        return {}, 0
+    header = CppDictParser(match.group(1).decode('ascii', 'replace')).values
+    return header, match.end()
+
+
+def is_binary(header):
+    """Check if the format of the file is binary."""
+    return header.get('format', 'ascii') == 'binary'
+
+
+def dtypes(header):
+    """Return numpy dtypes for (label, scalar) based on arch in header.
+
+    arch is "LSB;label=32;scalar=64" by default.
+    """
+    arch = header.get('arch', '').strip('"')
+    order = '>' if 'MSB' in arch else '<'
+    label = re.search(r'label=(\d+)', arch)
+    scalar = re.search(r'scalar=(\d+)', arch)
+    label = int(label.group(1)) // 8 if label else 4
+    scalar = int(scalar.group(1)) // 8 if scalar else 8
+    return np.dtype('{}i{}'.format(order, label)), \
+        np.dtype('{}f{}'.format(order, scalar))
+
+
+def read_list(buf, start, dtype, width=1, binary=False, copy=True):
+    """Read an OpenFOAM List from buf.
+
+    Args:
+        buf: File content as bytes or a memory-mapped file.
+        start: Index in buf to start the search for the list.
+        dtype: numpy dtype for values in the list (e.g. int32, float64). For
+            binary lists the dtype must match the data in the file.
+        width: Number of components for each item in the list (e.g. 3 for
+            vector).
+        binary: Set to True if the file format is binary.
+        copy: Set to False to return binary data as a read-only view over buf
+            (e.g. a memory-mapped file) with no copy. The view will have the
+            byte order of the file (default: True).
+
+    Returns:
+        A tuple of (numpy array, index of the first byte after the list). The
+        array is 1D if width is 1 and (n, width) otherwise.
+    """
+    match = _list_start.match(buf, start)
+    if not match:
+        raise ValueError(
+            'Failed to find the start of the list at {}.'.format(start))
+
+    count = int(match.group(1))
+    dtype = np.dtype(dtype)
+    native = dtype.newbyteorder('=')
+    shape = (count,) if width == 1 else (count, width)
+    pos = match.end()
+
+    if match.group(2) == b'{':
+        # uniform list. e.g. 100{0}
+        end = buf.find(b'}', pos + (dtype.itemsize * width if binary else 0))
+        if binary:
+            value = np.frombuffer(buf, dtype, width, pos)
+        else:
+            value = _ascii_values(buf[pos:end], native)
+        return np.tile(value.astype(native), count).reshape(shape), end + 1
+
+    if binary:
+        end = pos + count * width * dtype.itemsize
+        values = np.frombuffer(buf, dtype, count * width, pos).reshape(shape)
+        assert buf[end:end + 1] == b')', \
+            'Binary list of {} items is not closed at {}.'.format(count, end)
+        if not copy:
+            return values, end + 1
+        # copy to a native and aligned array which doesn't hold the file open
+        return values.astype(native, copy=True), end + 1
+
+    end = _closing_parenthesis(buf, pos, width > 1)
+    values = _ascii_values(buf[pos:end], native)
+    assert values.size == count * width, \
+        'Expected {} values in the list but found {}.'.format(count * width,
+                                                            values.size)
+    return values.reshape(shape), end + 1
+
+
+def read_list_size(buf, start):
+    """Read the number of items in an OpenFOAM List without reading the list."""
+    match = _list_start.match(buf, start)
+    if not match:
+        raise ValueError(
+            'Failed to find the start of the list at {}.'.format(start))
+    return int(match.group(1))
+
+
+def read_face_list(buf, start, label_dtype, binary=False, compact=False):
+    """Read faceList or faceCompactList to compressed sparse rows.
+
+    Args:
+        buf: File content as bytes or a memory-mapped file.
+        start: Index in buf to start the search for the list.
+        label_dtype: numpy dtype for labels.
+        binary: Set to True if the file format is binary.
+        compact: Set to True for faceCompactList.
+
+    Returns:
+        A tuple of (vertex indices, offsets, index of the first byte after the
+        list). Vertices of face i are indices[offsets[i]:offsets[i + 1]].
+    """
+    if compact:
+        offsets, end = read_list(buf, start, label_dtype, 1, binary)
+        indices, end = read_list(buf, end, label_dtype, 1, binary)
+        return indices, offsets, end
+
+    assert not binary, 'Binary faceList is not supported. Use faceCompactList.'
+
+    match = _list_start.match(buf, start)
+    if not match:
+        raise ValueError(
+            'Failed to find the start of the list at {}.'.format(start))
+    count = int(match.group(1))
+    pos = match.end()
+    if count == 0:
+        end = buf.find(b')', pos)
+        return np.zeros(0, label_dtype), np.zeros(1, label_dtype), end + 1
+
+    # every face is written as n(v0 v1 ... vn). Mark the end of faces by -1
+    # and use the markers to separate sizes from indices without a loop.
+    end = _closing_parenthesis(buf, pos, True)
+    values = np.fromstring(
+        bytes(buf[pos:end]).replace(b'(', b' ').replace(b')', b' -1 '),
+        dtype=np.int64, sep=' ')
+    ends = np.flatnonzero(values == -1)
+    assert ends.size == count, \
+        'Expected {} faces in the list but found {}.'.format(count, ends.size)
+    sizes = values[np.concatenate(([0], ends[:-1] + 1))]
+    keep = np.ones(values.size, dtype=bool)
+    keep[ends] = False
+    keep[ends[:-1] + 1] = False
+    keep[0] = False
+    offsets = np.zeros(count + 1, label_dtype)
+    np.cumsum(sizes, out=offsets[1:])
+    indices = values[keep].astype(label_dtype)
+    assert indices.size == offsets[-1], 'Face sizes do not match the vertices.'
+    return indices, offsets, end + 1
+
+
+def write_list(f, values, dtype=None, binary=False, precision=None,
+               chunk_size=CHUNK_SIZE):
+    """Write an OpenFOAM List from a numpy array.
+
+    The list is written as it follows List<type> in a file: size and the
+    items in parentheses with one item per line for ascii lists. Items are
+    formatted or converted to bytes in chunks of chunk_size.
+
+    Args:
+        f: A text or binary file handle. Binary lists need a binary handle or a
+            text handle with a buffer (e.g. open(filepath, 'w')).
+        values: A 1D array for scalars and labels or a (n, width) array.
+        dtype: numpy dtype for binary data (default: values.dtype).
+        binary: Write values as binary data (default: False).
+        precision: Number of significant digits for ascii floats. By default
+            floats are written with repr which reads back to the same value.
+            Fewer digits (e.g. 6 as writePrecision in controlDict) are faster
+            to format.
+        chunk_size: Number of items to format at once.
+    """
+    values = np.asarray(values)
+    count = len(values)
+    write = _writer(f)
+    if binary:
+        write('\n{}\n('.format(count))
+        dtype = values.dtype if dtype is None else np.dtype(dtype)
+        stream = f
+        if isinstance(f, io.TextIOBase):
+            f.flush()
+            stream = f.buffer
+        for st in range(0, count, chunk_size):
+            stream.write(np.ascontiguousarray(values[st:st + chunk_size],
+                                              dtype=dtype).tobytes())
+        write(')')
+        return
+
+    write('\n{}\n(\n'.format(count))
+    if precision is None or values.dtype.kind != 'f':
+        fmt = '%r'
+    else:
+        fmt = '%.{}g'.format(int(precision))
+    if values.ndim == 1:
+        item = fmt
+    else:
+        item = '({})'.format(' '.join((fmt,) * values.shape[1]))
+    for st in range(0, count, chunk_size):
+        chunk = values[st:st + chunk_size]
+        write('\n'.join((item,) * len(chunk)) % tuple(chunk.ravel().tolist()))
+        write('\n')
+    write(')')
+
+
+def _writer(f):
+    """Return a function to write strings to a text or binary file handle."""
+    if isinstance(f, io.TextIOBase):
+        return f.write
+    return lambda text: f.write(text.encode('ascii'))
+
+
+def _ascii_values(text, dtype):
+    """Convert ascii text with numbers and parentheses to a 1D array."""
+    text = bytes(text).translate(None, b'()')
+    if dtype.kind == 'f':
+        return np.fromstring(text, dtype=np.float64, sep=' ').astype(dtype)
+    return np.fromstring(text, dtype=np.int64, sep=' ').astype(dtype)
+
+
+def _closing_parenthesis(buf, pos, nested):
+    """Find the index of the parenthesis which closes an ascii list."""
+    if not nested:
+        close = buf.find(b')', pos)
+    else:
+        # OpenFOAM writes long lists with one item per line and the closing
+        # parenthesis on its own line.
+        match = _list_end.search(buf, pos)
+        close = match.end() - 1 if match else -1
+        if close != -1:
+            chunk = buf[pos:close]
+            if chunk.count(b'(') != chunk.count(b')'):
+                close = -1
+        if close == -1:
+            # short lists on a single line. e.g. 2((0 0 0) (1 1 1))
+            depth, i = 1, pos
+            while depth:
+                close = buf.find(b')', i)
+                if close == -1:
+                    break
+                depth += buf[i:close].count(b'(') - 1
+                i = close + 1
+
+    if close == -1:
+        raise ValueError('List at {} is not closed.'.format(pos))
+    return close
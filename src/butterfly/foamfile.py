@@ -1,12 +1,86 @@
 # coding=utf-8
 """Foam File Class."""
 from .version import Version, Header
-from .utilities import get_boundary_field_from_geometries
+from .utilities import atomic_write, copy_object, copy_values, equal_values, \
+    fingerprint, get_boundary_field_from_geometries
 from .parser import CppDictParser
+from .foamwriter import text_stream, write_values
+from .fields import NonuniformList
+import io
+import mmap
 import os
-import json
-import collections
-from copy import deepcopy
+from copy import copy, deepcopy
+
+
+def _shorten(value, length=100):
+    """Shorten a value for log messages."""
+    value = str(value)
+    return value if len(value) < length else '%s...' % value[:length]
+
+
+_text = (str, int, float)
+
+
+def has_nonuniform_list(filepath):
+    """Check if a file has nonuniform lists without reading it to memory."""
+    try:
+        with open(filepath, 'rb') as f:
+            if not os.fstat(f.fileno()).st_size:
+                return False
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return buf.find(b'nonuniform') != -1
+            finally:
+                buf.close()
+    except (IOError, OSError):
+        return False
+
+
+def read_foam_values(filepath):
+    """Read values of an OpenFOAM file.
+
+    Files with nonuniform lists (e.g. ascii or binary fields) are read with
+    volfield.read_values and the lists are loaded as NonuniformList. Binary
+    lists are memory-mapped and not copied.
+    """
+    if has_nonuniform_list(filepath):
+        from .volfield import read_values
+        return read_values(filepath)
+    return CppDictParser.from_file(filepath).values
+
+
+def _with_defaults(default_values, values):
+    """Merge values into a copy of default_values.
+
+    Same as updating a copy of default_values with values but the default
+    values which are replaced are not copied. values are not copied.
+    """
+    if not values:
+        return copy_values(default_values)
+    merged = copy(default_values)
+    for key, value in merged.items():
+        if key in values:
+            new = values[key]
+            if isinstance(value, dict) and isinstance(new, dict):
+                merged[key] = _with_defaults(value, new)
+            else:
+                merged[key] = new
+        else:
+            merged[key] = copy_values(value)
+    for key, value in values.items():
+        if key not in merged:
+            merged[key] = value
+    return merged
+
+
+def _same(original, new):
+    """Check if two values are the same as in an OpenFOAM file."""
+    if isinstance(original, dict) and isinstance(new, dict):
+        return len(original) == len(new) and \
+            all(k in original and _same(original[k], v) for k, v in new.items())
+    if isinstance(original, _text) and isinstance(new, _text):
+        return str(original) == str(new)
+    return equal_values(original, new)
 
 
 class FoamFile(object):
@@ -29,6 +103,10 @@ class FoamFile(object):
                  default_values=None, values=None):
         """Init foam file."""
         self.__dict__['is{}'.format(self.__class__.__name__)] = True
+        # dirty is set when values change. saved is (filepath, (mtime, size),
+        # snapshot) of the last write or the file which this is loaded from
+        self.__dirty = True
+        self.__saved = None
         self.__version = str(Version.of_ver)
         self.format = str(file_format)  # ascii / binary
         self.cls = str(cls)  # dictionary or field
@@ -49,8 +127,7 @@ class FoamFile(object):
             values = {}
         if not default_values:
             default_values = {}
-        self.__values = deepcopy(default_values)
-        self.update_values(values, mute=True)
+        self.__values = _with_defaults(default_values, values)
 
     @classmethod
     def from_file(cls, filepath, location=None):
@@ -73,7 +150,7 @@ class FoamFile(object):
         assert not filepath.endswith('blockMeshDict'), \
             'To parse blockMeshDict from file use BlockMeshDict.from_file()'
 
-        _values = CppDictParser.from_file(filepath).values
+        _values = read_foam_values(filepath)
         p, _name = os.path.split(filepath)
 
         default = {
@@ -94,6 +171,16 @@ class FoamFile(object):
 
         return cls(_name, _cls, _location, _file_format, values=_values)
 
+    def __setattr__(self, name, value):
+        """Set attribute and mark the file as changed for public attributes.
+
+        Property setters of subclasses (e.g. ControlDict.endTime) are called
+        from here so they mark the file as changed too.
+        """
+        object.__setattr__(self, name, value)
+        if not name.startswith('_'):
+            object.__setattr__(self, '_FoamFile__dirty', True)
+
     @property
     def isFoamFile(self):
         """Return True for FoamFile."""
@@ -125,76 +212,60 @@ class FoamFile(object):
         """Return values as a dictionary."""
         return self.__values
 
-    # TODO(Mostapha): replace log changes with update_dict from utilities
     def update_values(self, v, replace=False, mute=False):
         """Update current values from dictionary v.
 
         if key is not available in current values it will be added, if the key
-        already exists it will be updated.
+        already exists it will be updated. Values are compared and merged in a
+        single pass. With replace the top level keys which have changed are
+        replaced instead of merged.
 
         Returns:
-            True is the dictionary is updated.
+            A list of changed keys as tuples of nested keys (e.g.
+            [('SIMPLE', 'nCorrectors')]). The list is empty if nothing has
+            changed.
         """
-        def log_changes(original, new):
-            """compare this dictionary with the current values."""
+        assert isinstance(v, dict), 'Expected dictionary not {}!'.format(type(v))
+        changes = []
+
+        def log_change(path, original, value):
+            changes.append(path)
+            if mute:
+                return
+            parents = '.'.join((self.__class__.__name__,) + path[:-1])
             if original is None:
-                original = {}
+                print('{} :: New values are added for {}.'.format(parents, path[-1]))
+            else:
+                print('{}.{} is changed from "{}" to "{}".'.format(
+                    parents, path[-1], _shorten(original), _shorten(value)))
 
+        def merge(original, new, path):
+            """Compare new values with original and update original."""
             for key, value in new.items():
-
                 if key not in original:
-                    # there is a new key so dictionary has changed.
-                    if not mute:
-                        msg = '{} :: New values are added for {}.' \
-                            .format('.'.join(self.__parents), key)
-                        print(msg)
-                    self.__hasChanged = True
-                    return
-
-                if isinstance(value, (dict, collections.OrderedDict)):
-                    self.__parents.append(key)
-                    log_changes(original[key], value)
-                elif str(original[key]) != str(value):
-                    # there is a change in value
-                    if not mute:
-                        msg = '{}.{} is changed from "{}" to "{}".'\
-                            .format('.'.join(self.__parents), key,
-                                    original[key] if len(str(original[key])) < 100
-                                    else '%s...' % str(original[key])[:100],
-                                    value if len(str(value)) < 100
-                                    else '%s...' % str(value)[:100])
-                        print(msg)
-                    self.__hasChanged = True
-                    return
-
-        def modify_dict(original, new):
-            """Modify a dictionary based on a new dictionary."""
-            for key, value in new.items():
-                if key in original and isinstance(value, dict):
-                    if isinstance(original[key], dict):
-                        modify_dict(original[key], value)
-                    else:
-                        # the value was not a dict, replce them with the new one
-                        original[key] = value
-                else:
+                    log_change(path + (key,), None, value)
+                    original[key] = value
+                elif isinstance(value, dict) and isinstance(original[key], dict):
+                    merge(original[key], value, path + (key,))
+                elif not _same(original[key], value):
+                    log_change(path + (key,), original[key], value)
                     original[key] = value
 
-            return original
-
-        assert isinstance(v, dict), 'Expected dictionary not {}!'.format(type(v))
-
-        self.__parents = [self.__class__.__name__]
-        self.__hasChanged = False
-        log_changes(self.__values, v)
-
-        if self.__hasChanged:
-            if replace:
-                self.__values.update(v)
-            else:
-                self.__values = modify_dict(self.__values, v)
-            return True
+        if not replace:
+            merge(self.__values, v, ())
         else:
-            return False
+            for key, value in v.items():
+                if key not in self.__values:
+                    log_change((key,), None, value)
+                elif not _same(self.__values[key], value):
+                    log_change((key,), self.__values[key], value)
+                else:
+                    continue
+                self.__values[key] = value
+
+        if changes:
+            self.__dirty = True
+        return changes
 
     @property
     def parameters(self):
@@ -222,60 +293,97 @@ class FoamFile(object):
             value: Parameter value as a string.
         """
         self.values[parameter] = value
+        self.__dirty = True
+
+    @property
+    def is_dirty(self):
+        """True if values are set since the file was last saved or loaded.
+
+        Changes to nested values (e.g. ff.values['functions'][name] = ...) don't
+        set this flag but they are found by comparing the values on save.
+        """
+        return self.__dirty
+
+    @property
+    def saved_file(self):
+        """Full path to the file which this is last saved to or loaded from."""
+        return self.__saved[0] if self.__saved else None
+
+    @staticmethod
+    def __stat(filepath):
+        try:
+            st = os.stat(filepath)
+        except OSError:
+            return None
+        return st.st_mtime, st.st_size
+
+    def _snapshot(self):
+        """A fingerprint of the state which is written to file.
+
+        Subclasses which write more than values should override this method.
+        """
+        return fingerprint(self.values)
+
+    def mark_saved(self, filepath):
+        """Mark the file as saved to filepath.
+
+        Use it after loading a file from filepath. The file will not be
+        written to filepath again until the values change.
+
+        Args:
+            filepath: Full path to file.
+        """
+        filepath = os.path.abspath(filepath)
+        self.__saved = (filepath, self.__stat(filepath), self._snapshot())
+        self.__dirty = False
+
+    def is_saved(self, filepath):
+        """Check if filepath is up to date with this file.
+
+        The file on disk should be the file which was last saved or loaded and
+        not modified since then and the values of this file should not have
+        changed.
+        """
+        if self.__dirty or not self.__saved:
+            return False
+        filepath = os.path.abspath(filepath)
+        if self.__saved[0] != filepath or \
+                self.__saved[1] != self.__stat(filepath):
+            return False
+        return equal_values(self.__saved[2], self._snapshot())
 
     def header(self):
         """Return open foam style string."""
+        # binary lists are written as little endian 32 bit labels and 64 bit
+        # scalars
+        arch = '\tarch\t\t"LSB;label=32;scalar=64";\n' \
+            if self.format == 'binary' else ''
         if self.location:
             return Header.header() + \
                 "FoamFile\n{\n" \
                 "\tversion\t\t%s;\n" \
                 "\tformat\t\t%s;\n" \
+                "%s" \
                 "\tclass\t\t%s;\n" \
                 "\tlocation\t%s;\n" \
                 "\tobject\t\t%s;\n" \
-                "}\n" % (self.__version, self.format, self.cls, self.location,
-                         self.name)
+                "}\n" % (self.__version, self.format, arch, self.cls,
+                         self.location, self.name)
         else:
             return Header.header() + \
                 "FoamFile\n{\n" \
                 "\tversion\t\t%s;\n" \
                 "\tformat\t\t%s;\n" \
+                "%s" \
                 "\tclass\t\t%s;\n" \
                 "\tobject\t\t%s;\n" \
-                "}\n" % (self.__version, self.format, self.cls, self.name)
-
-    @staticmethod
-    def _split_line(line):
-        """Split lines which ends with { to two lines."""
-        return line[4:-1] + "\n" + \
-            (len(line) - len(line.strip()) - 4) * ' ' + '{'
+                "}\n" % (self.__version, self.format, arch, self.cls, self.name)
 
     def body(self):
         """Return body string."""
-        # remove None values
-        def remove_none(d):
-            if isinstance(d, (dict, collections.OrderedDict)):
-                return collections.OrderedDict(
-                    (k, remove_none(v)) for k, v in d.items()
-                    if v == {} or (v and remove_none(v)))
-            elif isinstance(d, (list, tuple)):
-                return [remove_none(v) for v in d if v and remove_none(v)]
-            else:
-                return d
-            return remove_none
-
-        _values = remove_none(self.values)
-
-        # make python dictionary look like c++ dictionary!!
-        of = json.dumps(_values, indent=4, separators=(";", "\t\t")) \
-            .replace('\\"', '@').replace('"\n', ";\n").replace('"', '') \
-            .replace('};', '}').replace('\t\t{', '{').replace('@', '"')
-
-        # remove first and last {} and prettify[!] the file
-        content = (line[4:] if not line.endswith('{') else self._split_line(line)
-                   for line in of.split("\n")[1:-1])
-
-        return "\n\n".join(content)
+        f = io.StringIO()
+        write_values(f, self.values)
+        return f.getvalue()
 
     @staticmethod
     def convert_bool_value(v=True):
@@ -290,13 +398,41 @@ class FoamFile(object):
         else:
             return 'off'
 
+    def write(self, f, binary=None):
+        """Write OpenFOAM text to an open file.
+
+        Values are streamed to the file and large numpy arrays are written in
+        chunks without creating the full text in memory.
+
+        Args:
+            f: A text or binary file handle.
+            binary: Write nonuniform lists and arrays as binary data. Text
+                handles must have a buffer (default: True if format is binary).
+        """
+        if binary is None:
+            binary = self.format == 'binary'
+        with text_stream(f) as stream:
+            stream.write(self.header())
+            stream.write('\n')
+            write_values(stream, self.values, binary)
+
     def to_openfoam(self):
-        """Return OpenFOAM string."""
-        return "\n".join((self.header(), self.body()))
+        """Return OpenFOAM string.
+
+        Nonuniform lists are always ascii in the string. Use save or write to
+        write a binary file.
+        """
+        f = io.StringIO()
+        self.write(f, binary=False)
+        return f.getvalue()
 
     def save(self, project_folder, sub_folder=None, overwrite=True):
         """Save to file.
 
+        The file is only written if it has changed since it was last saved or
+        loaded. It is written to a temporary file first and moved over the
+        current file.
+
         Args:
             project_folder: Path to project folder as a string.
             sub_folder: Optional input for sub_folder (default: self.location).
@@ -307,18 +443,28 @@ class FoamFile(object):
         if not overwrite and os.path.isfile(fp):
             return
 
-        with open(fp, "wt") as outf:
-            outf.write(self.to_openfoam())
+        if self.is_saved(fp):
+            return fp
+
+        with atomic_write(fp, "wt") as outf:
+            self.write(outf)
+        self.mark_saved(fp)
         return fp
 
     def __eq__(self, other):
         """Check equality."""
-        return self.values == other.values
+        return equal_values(self.values, other.values)
 
     def duplicate(self):
         """Return a copy of this object."""
         return deepcopy(self)
 
+    def __deepcopy__(self, memo):
+        """Copy values with copy_values instead of a generic deepcopy."""
+        # the saved state is a tuple of fingerprints and can be shared
+        memo[id(self.__saved)] = self.__saved
+        return copy_object(self, memo)
+
     def ToString(self):
         """Overwrite .NET ToString method."""
         return self.__repr__()
@@ -338,16 +484,38 @@ class FoamFileZeroFolder(FoamFile):
 
     @classmethod
     def from_bf_geometries(cls, bf_geometries, values=None):
-        """Init class by bf_geometries."""
+        """Init class by bf_geometries.
+
+        bf_geometries can also be a dictionary from
+        utilities.get_boundary_conditions_from_geometries to create several
+        fields for the same geometries.
+        """
         _cls = cls(values)
         _cls.set_boundary_field(bf_geometries)
         return _cls
 
+    @property
+    def internalField(self):
+        """Get and set internalField.
+
+        Set a numpy array with a value for each cell to set a nonuniform
+        internalField (e.g. an initial field). The array is stored as a
+        NonuniformList and is not converted to a string.
+        """
+        return self.values['internalField']
+
+    @internalField.setter
+    def internalField(self, value):
+        if hasattr(value, 'ndim') or isinstance(value, NonuniformList):
+            value = NonuniformList(value)
+        self.values['internalField'] = value
+
     def set_boundary_field(self, bf_geometries):
         """Set FoamFile boundaryField values from bf_geometries.
 
         Args:
-            bf_geometries: List of Butterfly geometries.
+            bf_geometries: List of Butterfly geometries or a dictionary of
+                boundary conditions by geometry name.
         """
         self.values['boundaryField'] = \
             get_boundary_field_from_geometries(bf_geometries, self.name)
@@ -391,7 +559,7 @@ def foam_file_from_file(filepath, name=None, header=False):
         assert _name.lower() == name.lower(), \
             'Illegal file input {} for creating {}'.format(_name, name)
 
-    _values = CppDictParser.from_file(filepath).values
+    _values = read_foam_values(filepath)
 
     if not header and 'FoamFile' in _values:
         del(_values['FoamFile'])
@@ -0,0 +1,186 @@
+# coding=utf-8
+"""Write FoamFile values to an open file without building the text in memory.
+
+Values are written line by line in the same format as FoamFile.body. numpy
+arrays in values are written as OpenFOAM lists in bulk (see
+foamarray.write_list) so writing large fields is limited by the disk and not
+by string concatenation. Values with a write_foam method (e.g.
+fields.NonuniformList) write themselves.
+
+    Usage:
+
+        with open(filepath, 'w') as f:
+            f.write(foamfile.header())
+            f.write('\n')
+            write_values(f, foamfile.values)
+"""
+import io
+import json
+import re
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    from json.encoder import encode_basestring_ascii as _encode_string
+except ImportError:
+    _encode_string = json.dumps
+
+
+def is_array(value):
+    """Check if a value is a numpy array with at least one dimension."""
+    return getattr(value, 'ndim', 0) > 0
+
+
+def remove_none(values):
+    """Remove None and empty values from nested dictionaries and lists.
+
+    Empty dictionaries are kept as values of a dictionary.
+    """
+    if isinstance(values, dict):
+        cleaned = OrderedDict()
+        for key, value in values.items():
+            c = remove_none(value)
+            if (isinstance(value, dict) and not value) or _keep(value, c):
+                cleaned[key] = c
+        return cleaned
+    elif isinstance(values, (list, tuple)):
+        cleaned = (remove_none(v) for v in values)
+        return [c for v, c in zip(values, cleaned) if _keep(v, c)]
+    else:
+        return values
+
+
+def _keep(value, cleaned):
+    if is_array(value):
+        return value.size > 0
+    return bool(value) and bool(cleaned)
+
+
+def _encode(value):
+    """Encode a key or a single value as a json string."""
+    if isinstance(value, str):
+        return _encode_string(value)
+    return json.dumps(value)
+
+
+# keys of repeated directives (e.g. #includeFunc#2). See parser.CppDictParser
+_repeated_directive = re.compile(r'(#[A-Za-z]\w*)#\d+$')
+
+
+def _key(key):
+    if not isinstance(key, str):
+        return _encode(json.dumps(key))
+    if key[:1] == '#':
+        match = _repeated_directive.match(key)
+        if match:
+            key = match.group(1)
+    return _encode(key)
+
+
+def _json_lines(value, indent, prefix, suffix):
+    """Yield lines of value as json with indent=4 and ; as item separator.
+
+    Arrays are yielded as (prefix, array) tuples.
+    """
+    if isinstance(value, dict):
+        if not value:
+            yield prefix + '{}' + suffix
+            return
+        yield prefix + '{'
+        pad = ' ' * (indent + 4)
+        last = len(value) - 1
+        for count, (key, v) in enumerate(value.items()):
+            for line in _json_lines(v, indent + 4, pad + _key(key) + '\t\t',
+                                    ';' if count < last else ''):
+                yield line
+        yield ' ' * indent + '}' + suffix
+    elif isinstance(value, (list, tuple)):
+        if not value:
+            yield prefix + '[]' + suffix
+            return
+        yield prefix + '['
+        pad = ' ' * (indent + 4)
+        last = len(value) - 1
+        for count, v in enumerate(value):
+            for line in _json_lines(v, indent + 4, pad,
+                                    ';' if count < last else ''):
+                yield line
+        yield ' ' * indent + ']' + suffix
+    elif is_array(value) or hasattr(value, 'write_foam'):
+        yield prefix, value
+    else:
+        yield prefix + _encode(value) + suffix
+
+
+def _foam_line(line):
+    """Make a json line look like a line of a c++ dictionary."""
+    line = line.replace('\\"', '@')
+    if line.endswith('"'):
+        line = line[:-1] + ';'
+    line = line.replace('"', '').replace('};', '}').replace('\t\t{', '{') \
+        .replace('@', '"')
+    if not line.endswith('{'):
+        return line[4:]
+    # split lines which end with { to two lines
+    return line[4:-1] + '\n' + (len(line) - len(line.strip()) - 4) * ' ' + '{'
+
+
+def iter_values(values):
+    """Yield the text of FoamFile values in pieces.
+
+    Arrays and values with a write_foam method are yielded as they are and
+    should be written followed by ;.
+    """
+    values = remove_none(values)
+    last = len(values) - 1
+    first = True
+    for count, (key, value) in enumerate(values.items()):
+        for line in _json_lines(value, 4, '    ' + _key(key) + '\t\t',
+                                ';' if count < last else ''):
+            if not first:
+                yield '\n\n'
+            first = False
+            if isinstance(line, tuple):
+                yield _foam_line(line[0])
+                yield line[1]
+            else:
+                yield _foam_line(line)
+
+
+def write_values(f, values, binary=False):
+    """Write FoamFile values to an open text file.
+
+    Args:
+        f: A text file handle (e.g. open(filepath, 'w') or io.StringIO()).
+        values: FoamFile values as a dictionary.
+        binary: Write arrays as binary lists. f must have a buffer (default:
+            False).
+    """
+    for piece in iter_values(values):
+        if hasattr(piece, 'write_foam'):
+            piece.write_foam(f, binary)
+            f.write(';')
+        elif is_array(piece):
+            # numpy is only needed if there are arrays in values
+            from .foamarray import write_list
+            write_list(f, piece, binary=binary)
+            f.write(';')
+        else:
+            f.write(piece)
+
+
+@contextmanager
+def text_stream(f, encoding='utf-8'):
+    """Use a binary file handle as a text file handle.
+
+    Text file handles are returned as they are.
+    """
+    if isinstance(f, io.TextIOBase):
+        yield f
+        return
+    stream = io.TextIOWrapper(f, encoding=encoding, newline='')
+    try:
+        yield stream
+        stream.flush()
+    finally:
+        stream.detach()
@@ -4,6 +4,8 @@ from .foamfile import FoamFile, foam_file_from_file
 from .parser import CppDictParser
 from collections import OrderedDict
 
+import numpy as np
+
 
 class Function(FoamFile):
     """OpenFOAM function object.
@@ -149,7 +151,11 @@ class Probes(Function):
     @property
     def probes_count(self):
         """Get number of probes."""
-        if not self.probeLocations:
+        if self.probeLocations is None:
+            return 0
+        elif hasattr(self.probeLocations, 'ndim'):
+            return len(self.probeLocations)
+        elif not self.probeLocations:
             return 0
         else:
             return len(self.probeLocations[1:-1].split(')')) - 1
@@ -161,9 +167,9 @@ class Probes(Function):
 
     @probeLocations.setter
     def probeLocations(self, pts):
-        ptlist = (str(tuple(pt)).replace(',', ' ') for pt in pts)
+        # written as a list in bulk by the foamfile writer
         self.values['functions']['probes']['probeLocations'] = \
-            '({})'.format(' '.join(ptlist))
+            np.asarray(pts, dtype=np.float64).reshape(-1, 3)
 
     @property
     def filename(self):
@@ -1,15 +1,30 @@
 # coding=utf-8
 """BF geometry library."""
+import hashlib
+import math
 import os
+import re
+import struct
 from copy import deepcopy
+from itertools import islice
 from .boundarycondition import IndoorWallBoundaryCondition
-from .stl import read_ascii_string
+from .stl import is_binary_file as is_binary_stl_file, read_ascii_string, \
+    read_file as read_stl_file
+from .utilities import atomic_write, get_stl_region_ids
 from .vectormath import cross_product, rotate, angle_anitclockwise
 
+# mesh data which is shared between duplicates
+_shared = ('_BFMesh__vertices', '_BFMesh__face_indices', '_BFMesh__normals')
+
 
 class _BFMesh(object):
     """Base mesh geometry.
 
+    If vertices or face_indices are numpy arrays the mesh is stored as numpy
+    arrays and normals, min, max and stl files are calculated with vectorized
+    numpy operations. Otherwise vertices, face_indices and normals are stored
+    as they are.
+
     Attributes:
         name: Name as a string (A-Z a-z 0-9 _).
         vertices: A flatten list of (x, y, z) for vertices.
@@ -21,10 +36,22 @@ class _BFMesh(object):
         """Init Butterfly mesh."""
         self.name = name
 
+        self.__is_array = hasattr(vertices, 'ndim') or \
+            hasattr(face_indices, 'ndim')
+
+        if self.__is_array:
+            import numpy as np
+            vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+            face_indices = np.asarray(face_indices).reshape(-1, 3)
+            if normals is not None and len(normals) > 0:
+                normals = np.asarray(normals, dtype=np.float64).reshape(-1, 3)
+            else:
+                normals = None
+
         self.__vertices = vertices
         self.__face_indices = face_indices
 
-        if not normals:
+        if normals is None or len(normals) == 0:
             normals = self.__calculate_normals()
 
         self.__normals = normals
@@ -67,6 +94,11 @@ class _BFMesh(object):
         """A flatten list of (x, y, z) for normals."""
         return self.__normals
 
+    @property
+    def is_array(self):
+        """Return True if the mesh is stored as numpy arrays."""
+        return self.__is_array
+
     @property
     def min(self):
         return self.__min
@@ -77,6 +109,17 @@ class _BFMesh(object):
 
     def __calculate_normals(self):
         """Calculate normals from vertices."""
+        if self.__is_array:
+            import numpy as np
+            pts = self.__vertices[self.__face_indices]
+            normals = np.cross(pts[:, 1] - pts[:, 0], pts[:, 2] - pts[:, 0])
+            length = np.sqrt(np.einsum('ij,ij->i', normals, normals))
+            if not length.all():
+                raise ValueError(
+                    'Failed to calculate normal:\n\t{} faces have no area.'
+                    .format(len(length) - np.count_nonzero(length)))
+            return normals / length[:, None]
+
         return tuple(self.__calculate_normal_from_points(
             tuple(self.vertices[i] for i in ind)) for ind in self.face_indices)
 
@@ -98,6 +141,11 @@ class _BFMesh(object):
 
     def __calculate_min_max(self):
         """Calculate maximum and minimum x, y, z for this geometry."""
+        if self.__is_array:
+            self.__min = self.__vertices.min(axis=0).tolist()
+            self.__max = self.__vertices.max(axis=0).tolist()
+            return
+
         min_pt = list(self.vertices[0])
         max_pt = list(self.vertices[0])
 
@@ -118,49 +166,151 @@ class _BFMesh(object):
             convertToMeters: A value to scale the geometry to meters. For isinstance
                 if the mesh is in mm the value should be 0.001 (default: 1).
         """
-        _hea = "solid {}".format(self.name)
-        _tale = "endsolid {}".format(self.name)
-        _body = "   facet normal {0} {1} {2}\n" \
-                "     outer loop\n" \
-                "       vertex {3} {4} {5}\n" \
-                "       vertex {6} {7} {8}\n" \
-                "       vertex {9} {10} {11}\n" \
-                "     endloop\n" \
-                "   endfacet"
-
-        _bodyCollector = tuple(_body.format(
-            self.__normals[count][0],
-            self.__normals[count][1],
-            self.__normals[count][2],
-            self.__vertices[faceInd[0]][0] * convertToMeters,
-            self.__vertices[faceInd[0]][1] * convertToMeters,
-            self.__vertices[faceInd[0]][2] * convertToMeters,
-            self.__vertices[faceInd[1]][0] * convertToMeters,
-            self.__vertices[faceInd[1]][1] * convertToMeters,
-            self.__vertices[faceInd[1]][2] * convertToMeters,
-            self.__vertices[faceInd[2]][0] * convertToMeters,
-            self.__vertices[faceInd[2]][1] * convertToMeters,
-            self.__vertices[faceInd[2]][2] * convertToMeters
-        ) for count, faceInd in enumerate(self.__face_indices))
-
-        return "{}\n{}\n{}\n".format(
-            _hea, "\n".join(_bodyCollector), _tale
-        )
-
-    def write_to_stl(self, folder, convertToMeters=1):
+        return ''.join(self.__ascii_chunks(convertToMeters))
+
+    def to_binary_stl(self, convertToMeters=1):
+        """Get binary STL definition for this geometry as bytes.
+
+        Args:
+            convertToMeters: A value to scale the geometry to meters. For isinstance
+                if the mesh is in mm the value should be 0.001 (default: 1).
+        """
+        return binary_stl_header(self.name, len(self.__face_indices)) + \
+            b''.join(self.__binary_chunks(convertToMeters))
+
+    def write_facets(self, stl_file, convertToMeters=1, stl_format='ascii',
+                     attribute=0):
+        """Stream facets of this geometry to an open stl file.
+
+        Facets are written in chunks and the whole stl is never built in memory.
+        In ascii format the facets are written as a solid named after the
+        geometry. In binary format only the facets are written and the header
+        should be written separately (see write_stl_file).
+
+        Args:
+            stl_file: A file object opened in binary mode ('wb').
+            convertToMeters: A value to scale the geometry to meters. For isinstance
+                if the mesh is in mm the value should be 0.001 (default: 1).
+            stl_format: ascii or binary (default: ascii).
+            attribute: Attribute byte count for binary facets. OpenFOAM uses the
+                attribute as the region index (default: 0).
+        """
+        if stl_format == 'binary':
+            for chunk in self.__binary_chunks(convertToMeters, attribute):
+                stl_file.write(chunk)
+        else:
+            for chunk in self.__ascii_chunks(convertToMeters):
+                stl_file.write(chunk.encode())
+
+    def __ascii_chunks(self, convertToMeters=1, chunk_size=50000):
+        """Generate ascii STL for this geometry in chunks of facets."""
+        yield "solid {}\n".format(self.name)
+
+        if self.__is_array:
+            # format facets with a single % operation per chunk. 9 significant
+            # digits are more than what single precision binary stl keeps.
+            _body = "   facet normal %.9g %.9g %.9g\n" \
+                    "     outer loop\n" \
+                    "       vertex %.9g %.9g %.9g\n" \
+                    "       vertex %.9g %.9g %.9g\n" \
+                    "       vertex %.9g %.9g %.9g\n" \
+                    "     endloop\n" \
+                    "   endfacet\n"
+            for st in range(0, len(self.__face_indices), chunk_size):
+                values = self.__facet_array(convertToMeters, st, st + chunk_size)
+                yield (_body * len(values)) % tuple(values.ravel().tolist())
+        else:
+            _body = "   facet normal {0} {1} {2}\n" \
+                    "     outer loop\n" \
+                    "       vertex {3} {4} {5}\n" \
+                    "       vertex {6} {7} {8}\n" \
+                    "       vertex {9} {10} {11}\n" \
+                    "     endloop\n" \
+                    "   endfacet\n"
+
+            _bodyCollector = (_body.format(
+                self.__normals[count][0],
+                self.__normals[count][1],
+                self.__normals[count][2],
+                self.__vertices[faceInd[0]][0] * convertToMeters,
+                self.__vertices[faceInd[0]][1] * convertToMeters,
+                self.__vertices[faceInd[0]][2] * convertToMeters,
+                self.__vertices[faceInd[1]][0] * convertToMeters,
+                self.__vertices[faceInd[1]][1] * convertToMeters,
+                self.__vertices[faceInd[1]][2] * convertToMeters,
+                self.__vertices[faceInd[2]][0] * convertToMeters,
+                self.__vertices[faceInd[2]][1] * convertToMeters,
+                self.__vertices[faceInd[2]][2] * convertToMeters
+            ) for count, faceInd in enumerate(self.__face_indices))
+
+            for st in range(0, len(self.__face_indices), chunk_size):
+                yield ''.join(islice(_bodyCollector, chunk_size))
+
+        yield "endsolid {}\n".format(self.name)
+
+    def __binary_chunks(self, convertToMeters=1, attribute=0, chunk_size=200000):
+        """Generate binary STL facets for this geometry in chunks of bytes."""
+        if self.__is_array:
+            import numpy as np
+            for st in range(0, len(self.__face_indices), chunk_size):
+                values = self.__facet_array(convertToMeters, st, st + chunk_size)
+                facets = np.empty(len(values), [('values', '<f4', (12,)),
+                                                 ('attributes', '<u2')])
+                facets['values'] = values
+                facets['attributes'] = attribute
+                yield facets.tobytes()
+            return
+
+        _pack = struct.Struct('<12fH').pack
+        vertices = self.__vertices
+        facets = (
+            _pack(n[0], n[1], n[2],
+                  *(vertices[i][c] * convertToMeters
+                    for i in ind for c in range(3)), attribute)
+            for n, ind in zip(self.__normals, self.__face_indices))
+        for st in range(0, len(self.__face_indices), chunk_size):
+            yield b''.join(islice(facets, chunk_size))
+
+    def __facet_array(self, convertToMeters=1, start=0, end=None):
+        """Return a (n, 12) array of normal and vertices for facets."""
+        import numpy as np
+        face_indices = self.__face_indices[start:end]
+        values = np.empty((len(face_indices), 12))
+        values[:, :3] = self.__normals[start:end]
+        values[:, 3:] = (self.__vertices[face_indices] *
+                         convertToMeters).reshape(-1, 9)
+        return values
+
+    def write_to_stl(self, folder, convertToMeters=1, stl_format='ascii'):
         """Save BFFace to a stl file. File name will be self.name.
 
         Args:
             convertToMeters: A value to scale the geometry to meters. For isinstance
                 if the mesh is in mm the value should be 0.001 (default: 1).
+            stl_format: ascii or binary (default: ascii).
         """
-        with open(os.path.join(folder, "{}.stl".format(self.name)), "wb") as outf:
-            outf.write(self.to_stl(convertToMeters))
+        write_stl_file(os.path.join(folder, "{}.stl".format(self.name)), (self,),
+                       convertToMeters, stl_format)
 
     def duplicate(self):
         """Return a copy of this object."""
         return deepcopy(self)
 
+    def __deepcopy__(self, memo):
+        """Copy the mesh.
+
+        Vertices, face_indices and normals have no setters and tuples of them
+        are shared between the copies.
+        """
+        copied = self.__class__.__new__(self.__class__)
+        memo[id(self)] = copied
+        for key, value in self.__dict__.items():
+            if key in _shared and isinstance(value, tuple):
+                copied.__dict__[key] = value
+            else:
+                copied.__dict__[key] = deepcopy(value, memo)
+        return copied
+
     def ToString(self):
         """Overwrite .NET ToString method."""
         return self.__repr__()
@@ -294,32 +444,121 @@ class BFBlockGeometry(BFGeometry):
         return self.__border_vertices
 
 
-def bf_geometry_from_stl_block(stl_block, convert_from_meters=1):
-    """Create BFGeometry from an stl block as a string."""
-    solid = read_ascii_string(stl_block)
+def binary_stl_header(name, count):
+    """Get the 80 bytes header and the number of facets for a binary stl file.
 
-    vertices = tuple(tuple(i * convert_from_meters for i in ver)
-                     for ver in tuple(solid.vertices))
+    The header doesn't start with solid so the file is not mistaken for ascii.
+    """
+    header = "binary stl {}".format(name).encode()[:80].ljust(80, b'\0')
+    return header + struct.pack('<I', count)
 
-    origi_ver = tuple(solid.vertices)
 
-    indices = tuple(tuple(origi_ver.index(ver) for ver in facet.vertices)
-                    for facet in solid.facets)
-    normals = tuple(facet.normal for facet in solid.facets)
+def write_stl_file(filepath, geometries, convertToMeters=1, stl_format='ascii'):
+    """Stream butterfly geometries to a single stl file.
 
-    return BFGeometry(solid.name, vertices, indices, normals)
+    In ascii format each geometry is written as a solid named after the
+    geometry. Binary stl has no solid names and OpenFOAM names the regions
+    patch0, patch1, ... by facet attribute. Facets of each geometry are written
+    with the index of the geometry name as attribute (see
+    utilities.get_stl_region_ids) so regions can be mapped to geometry names
+    in snappyHexMeshDict.
 
+    Args:
+        filepath: Full path to stl file.
+        geometries: A list of butterfly geometries.
+        convertToMeters: A value to scale the geometry to meters (default: 1).
+        stl_format: ascii or binary (default: ascii).
+    """
+    assert stl_format in ('ascii', 'binary'), \
+        'stl_format should be ascii or binary not {}.'.format(stl_format)
+    geometries = tuple(geometries)
+
+    with atomic_write(filepath, 'wb') as stlf:
+        if stl_format == 'ascii':
+            for geo in geometries:
+                geo.write_facets(stlf, convertToMeters)
+            return
+
+        region_ids = get_stl_region_ids(geometries)
+        name = os.path.splitext(os.path.split(filepath)[-1])[0]
+        stlf.write(binary_stl_header(
+            name, sum(len(geo.face_indices) for geo in geometries)))
+        for geo in geometries:
+            geo.write_facets(stlf, convertToMeters, 'binary',
+                             region_ids[geo.name])
+
+
+def stl_signature(geometries, convertToMeters=1, stl_format='ascii'):
+    """Hash of the content of an stl file for geometries.
 
-def bf_geometry_from_stl_file(filepath, convert_from_meters=1):
-    """Return a tuple of BFGeometry from an stl file."""
-    with open(filepath, 'rb') as f:
-        line = ''.join(f.readlines())
+    Use it to check if an stl file should be written again. Boundary conditions
+    and refinement levels are not part of the stl file and don't change the
+    hash.
+    """
+    sha = hashlib.sha1(
+        '{}:{}'.format(float(convertToMeters), stl_format).encode('utf-8'))
+    for geo in geometries:
+        sha.update(geo.name.encode('utf-8'))
+        for values in (geo.vertices, geo.face_indices, geo.normals):
+            if geo.is_array:
+                sha.update(values.tobytes())
+            else:
+                sha.update(repr(tuple(values)).encode('utf-8'))
+    return sha.hexdigest()
 
-    blocks = ('\nsolid{}'.format(t) if not t.startswith('solid') else '\n{}'.format(t)
-              for t in line.split('\nsolid'))
-    del(line)
 
-    return tuple(bf_geometry_from_stl_block(b, convert_from_meters) for b in blocks)
+def bf_geometry_from_stl_block(stl_block, convert_from_meters=1):
+    """Create BFGeometry from an stl block as a string."""
+    return _bf_geometry_from_solid(read_ascii_string(stl_block),
+                                   convert_from_meters)
+
+
+def bf_geometry_from_stl_file(filepath, convert_from_meters=1, as_arrays=False,
+                              regions=None):
+    """Return a tuple of BFGeometry from an stl file.
+
+    Both ascii and binary stl files are supported. Each solid in the file will
+    be a separate geometry. Regions of binary files (patch0, patch1, ...) are
+    separate geometries too and are renamed to the names in regions. Solids
+    without a name are named after the file.
+
+    Args:
+        filepath: Path to stl file.
+        convert_from_meters: A number to be multiplied to vertices.
+        as_arrays: Set to True to store geometries as numpy arrays. This is
+            much faster for large stl files (default: False).
+        regions: Optional regions of the file in snappyHexMeshDict geometry
+            to name the regions of binary files (e.g.
+            {'patch0': {'name': 'monkey'}}).
+    """
+    solids = read_stl_file(filepath)
+    stem = re.sub(r'\W+', '_', os.path.splitext(os.path.split(filepath)[-1])[0])
+    binary = regions and is_binary_stl_file(filepath)
+    geometries = []
+    for solid in solids:
+        name = solid.name or stem
+        if binary and len(solid):
+            region = regions.get('patch{}'.format(int(solid.attributes[0])))
+            if isinstance(region, dict) and region.get('name'):
+                name = region['name']
+        solid.name = name
+        geometries.append(
+            _bf_geometry_from_solid(solid, convert_from_meters, as_arrays))
+    return tuple(geometries)
+
+
+def _bf_geometry_from_solid(solid, convert_from_meters=1, as_arrays=False):
+    """Create BFGeometry from an stl.ArraySolid."""
+    vertices, indices = solid.weld()
+    vertices = vertices.astype(float) * convert_from_meters
+    normals = solid.facet_normals.astype(float)
+    if as_arrays:
+        return BFGeometry(solid.name, vertices, indices, normals)
+
+    return BFGeometry(solid.name,
+                      tuple(tuple(v) for v in vertices.tolist()),
+                      tuple(tuple(f) for f in indices.tolist()),
+                      tuple(tuple(n) for n in normals.tolist()))
 
 
 def calculate_min_max_from_bf_geometries(geometries, x_axis=None):
@@ -366,6 +605,17 @@ def calculate_min_max(geometry, angle):
 
     angle: Anticlockwise rotation angle of the new coordinates system.
     """
+    if getattr(geometry, 'is_array', False):
+        import numpy as np
+        # rotate all the vertices around z axis at once
+        rad = math.radians(-angle)
+        cosine, sine = math.cos(rad), math.sin(rad)
+        v = geometry.vertices
+        x = cosine * v[:, 0] - sine * v[:, 1]
+        y = sine * v[:, 0] + cosine * v[:, 1]
+        return [float(x.min()), float(y.min()), float(v[:, 2].min())], \
+            [float(x.max()), float(y.max()), float(v[:, 2].max())]
+
     # get list of vertices in the new coordinates system
     vertices = (rotate((0, 0, 0), v, -angle) for v in geometry.vertices)
 
@@ -0,0 +1,363 @@
+# coding=utf-8
+"""Cache meshes by the content of the meshing inputs.
+
+The key of a mesh is a hash of blockMeshDict, snappyHexMeshDict,
+surfaceFeatureExtractDict, meshQualityDict and the files in
+constant/triSurface. Dictionaries are normalised before hashing so comments,
+the FoamFile header and white space don't change the key. After meshing,
+constant/polyMesh is stored under the key and any case with the same inputs
+gets the mesh back as copy-on-write clones (reflink) or hard links instead of
+running blockMesh and snappyHexMesh again.
+
+Cached files are read-only. A restored mesh must not be modified in place
+(e.g. renumberMesh -overwrite). Use link=False to restore independent copies.
+
+    Usage:
+
+        case.save(overwrite=True)
+        cache = MeshCache()
+        cache.build(case)  # meshes the case only if the inputs are new
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+
+from .parser import CppDictParser
+
+# meshing inputs relative to case folder
+MESH_DICTIONARIES = (
+    'system/blockMeshDict',
+    'constant/polyMesh/blockMeshDict',
+    'system/snappyHexMeshDict',
+    'system/surfaceFeatureExtractDict',
+    'system/meshQualityDict',
+)
+
+_header = re.compile(r'FoamFile\s*\{.*?\}', re.DOTALL)
+
+# Linux ioctl to clone a file on copy-on-write file systems (btrfs, xfs)
+_FICLONE = 0x40049409
+
+# folders which are copied to the clones. Files and other folders in the case
+# folder (results, processor folders, logs, scripts, sweeps, ...) are not.
+CASE_FOLDERS = ('0', 'constant', 'system')
+
+
+def normalise_dictionary(text):
+    """Remove comments, FoamFile header and extra white space from a dictionary."""
+    text = CppDictParser.remove_comments(text + '\n')
+    text = _header.sub('', text, count=1)
+    return ' '.join(text.split())
+
+
+def mesh_key(project_folder):
+    """Hash of the meshing inputs of a case.
+
+    Args:
+        project_folder: Full path to case folder.
+
+    Returns:
+        A hexadecimal sha256 hash.
+    """
+    sha = hashlib.sha256()
+    for rel in MESH_DICTIONARIES:
+        filepath = os.path.join(project_folder, rel)
+        if not os.path.isfile(filepath):
+            continue
+        with open(filepath, 'rb') as f:
+            text = f.read().decode('utf-8', 'replace')
+        sha.update('{}\n{}\n'.format(rel, normalise_dictionary(text)).encode())
+
+    folder = os.path.join(project_folder, 'constant', 'triSurface')
+    if os.path.isdir(folder):
+        for name in sorted(os.listdir(folder)):
+            filepath = os.path.join(folder, name)
+            # eMesh files are written by surfaceFeatureExtract
+            if not os.path.isfile(filepath) or name.endswith('.eMesh'):
+                continue
+            sha.update('constant/triSurface/{}\n'.format(name).encode())
+            with open(filepath, 'rb') as f:
+                for chunk in iter(lambda: f.read(1 << 20), b''):
+                    sha.update(chunk)
+    return sha.hexdigest()
+
+
+def reflink(src, dst):
+    """Clone a file with copy-on-write.
+
+    Raises:
+        OSError if the file system or the platform doesn't support reflinks.
+    """
+    try:
+        import fcntl
+    except ImportError:
+        raise OSError('reflink is not supported on this platform.')
+
+    with open(src, 'rb') as s, open(dst, 'wb') as d:
+        try:
+            fcntl.ioctl(d.fileno(), _FICLONE, s.fileno())
+            return
+        except (IOError, OSError):
+            pass
+    os.remove(dst)
+    raise OSError('Failed to reflink {}.'.format(src))
+
+
+def link_file(src, dst, link=True):
+    """Create dst as a reflink, a hard link or a copy of src.
+
+    Args:
+        src: Source file.
+        dst: Destination file. It must not exist.
+        link: Set to False to always copy the file (default: True).
+
+    Returns:
+        reflink, hardlink or copy.
+    """
+    if link:
+        try:
+            reflink(src, dst)
+            return 'reflink'
+        except OSError:
+            pass
+        try:
+            os.link(src, dst)
+            return 'hardlink'
+        except (OSError, AttributeError):
+            pass
+    shutil.copyfile(src, dst)
+    return 'copy'
+
+
+def is_mesh_file(rel_path):
+    """Check if a file is a large mesh file which is never edited by butterfly.
+
+    Mesh files are the files in constant/polyMesh except blockMeshDict, stl
+    files in constant/triSurface and cellLevel and pointLevel.
+
+    Args:
+        rel_path: Path to file relative to case folder.
+    """
+    parts = os.path.normpath(rel_path).split(os.sep)
+    name = parts[-1]
+    if name.split('.')[0] in ('cellLevel', 'pointLevel'):
+        return True
+    if parts[:2] == ['constant', 'polyMesh']:
+        return name.split('.')[0] != 'blockMeshDict'
+    if parts[:2] == ['constant', 'triSurface']:
+        return name.lower().endswith(('.stl', '.stl.gz', '.stlb'))
+    return False
+
+
+def clone_case_folder(source, destination, share_mesh=True, skip=()):
+    """Copy an OpenFOAM case folder and link mesh files.
+
+    Only 0, constant and system folders are copied. Result folders, processor
+    folders, postProcessing, log and the files in the case folder (e.g.
+    scripts and <case>.foam) are not copied. Mesh files (see is_mesh_file)
+    are reflinked or hard linked (or copied if links are not supported). Hard
+    linked files must not be overwritten in the clone (e.g. renumberMesh
+    -overwrite). Dictionaries are always copied.
+
+    Args:
+        source: Path to case folder.
+        destination: Path to new case folder. It will be removed if exists.
+        share_mesh: Link mesh files. Set to False to copy all the files
+            (default: True).
+        skip: Files which are not copied as paths relative to case folder
+            (e.g. system/controlDict).
+
+    Returns:
+        Number of linked files.
+    """
+    assert os.path.isdir(source), 'Failed to find {}.'.format(source)
+    if os.path.exists(destination):
+        shutil.rmtree(destination)
+
+    skip = set(os.path.normpath(f) for f in skip)
+    linked = 0
+    for root, folders, files in os.walk(source):
+        rel = os.path.relpath(root, source)
+        if rel == '.':
+            folders[:] = [f for f in folders if f in CASE_FOLDERS]
+            files = ()
+        target = os.path.normpath(os.path.join(destination, rel))
+        if not os.path.isdir(target):
+            os.makedirs(target)
+        for f in files:
+            rel_path = os.path.normpath(os.path.join(rel, f))
+            if rel_path in skip:
+                continue
+            src, dst = os.path.join(root, f), os.path.join(target, f)
+            if share_mesh and is_mesh_file(rel_path):
+                if link_file(src, dst) != 'copy':
+                    linked += 1
+                    continue
+            shutil.copy2(src, dst)
+    return linked
+
+
+class MeshCache(object):
+    """Content-addressed cache of constant/polyMesh folders.
+
+    Args:
+        folder: Cache folder (default: ~/butterfly/.meshcache). The cache
+            should be on the same file system as the cases for hard links.
+        link: Restore meshes as reflinks or hard links. Set to False to copy
+            the files (default: True).
+    """
+
+    def __init__(self, folder=None, link=True):
+        """Init mesh cache."""
+        self.folder = folder or os.path.join(os.path.expanduser('~'),
+                                             'butterfly', '.meshcache')
+        self.link = link
+
+    @staticmethod
+    def key(project_folder):
+        """Hash of the meshing inputs of a case."""
+        return mesh_key(project_folder)
+
+    def mesh_folder(self, key):
+        """Path to cached polyMesh folder for a key."""
+        return os.path.join(self.folder, key, 'polyMesh')
+
+    def has(self, key):
+        """Check if there is a cached mesh for key."""
+        return os.path.isdir(self.mesh_folder(key))
+
+    def keys(self):
+        """List of keys in cache."""
+        if not os.path.isdir(self.folder):
+            return []
+        return sorted(k for k in os.listdir(self.folder) if self.has(k))
+
+    def store(self, project_folder, key=None):
+        """Store constant/polyMesh of a case.
+
+        Files are copied so later changes to the case don't change the cache.
+
+        Args:
+            project_folder: Full path to case folder.
+            key: Mesh key. It should be calculated before meshing if the
+                meshing changes the inputs (default: mesh_key(project_folder)).
+
+        Returns:
+            Mesh key.
+        """
+        key = key or mesh_key(project_folder)
+        if self.has(key):
+            return key
+
+        source = os.path.join(project_folder, 'constant', 'polyMesh')
+        assert os.path.isfile(os.path.join(source, 'owner')), \
+            'Failed to find a mesh in {}.'.format(source)
+
+        # copy to a temporary folder and rename it so other processes never
+        # see a partial mesh
+        temp = os.path.join(self.folder, '.{}.{}'.format(key, uuid.uuid4().hex))
+        target = os.path.join(temp, 'polyMesh')
+        shutil.copytree(source, target,
+                        ignore=shutil.ignore_patterns('blockMeshDict'))
+        if os.name == 'posix':
+            for root, _, files in os.walk(target):
+                for f in files:
+                    os.chmod(os.path.join(root, f), 0o444)
+        with open(os.path.join(temp, 'source.json'), 'w') as f:
+            json.dump({'case': os.path.abspath(project_folder),
+                       'time': time.time()}, f)
+
+        try:
+            os.rename(temp, os.path.join(self.folder, key))
+        except OSError:
+            # stored by another process
+            shutil.rmtree(temp, ignore_errors=True)
+            if not self.has(key):
+                raise
+        return key
+
+    def restore(self, project_folder, key=None):
+        """Restore the cached mesh of a case to constant/polyMesh.
+
+        Args:
+            project_folder: Full path to case folder.
+            key: Mesh key (default: mesh_key(project_folder)).
+
+        Returns:
+            True if the mesh was restored and False if the mesh is not in cache.
+        """
+        key = key or mesh_key(project_folder)
+        if not self.has(key):
+            return False
+
+        source = self.mesh_folder(key)
+        target = os.path.join(project_folder, 'constant', 'polyMesh')
+        if os.path.isdir(target):
+            for name in os.listdir(target):
+                if name == 'blockMeshDict':
+                    continue
+                filepath = os.path.join(target, name)
+                if os.path.isdir(filepath):
+                    shutil.rmtree(filepath)
+                else:
+                    os.remove(filepath)
+
+        for root, _, files in os.walk(source):
+            folder = os.path.join(target, os.path.relpath(root, source))
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+            for f in files:
+                link_file(os.path.join(root, f), os.path.join(folder, f),
+                          self.link)
+        return True
+
+    def build(self, case, snappy=True, surface_feature_extract=True):
+        """Restore the mesh of a case from cache or mesh the case and store it.
+
+        Args:
+            case: A butterfly Case which is saved to case.project_dir.
+            snappy: Run snappyHexMesh after blockMesh (default: True).
+            surface_feature_extract: Run surfaceFeatureExtract before
+                snappyHexMesh if surfaceFeatureExtractDict exists
+                (default: True).
+
+        Returns:
+            (key, cached). cached is True if the mesh was restored from cache.
+        """
+        key = mesh_key(case.project_dir)
+        if self.restore(case.project_dir, key):
+            return key, True
+
+        commands = [case.blockMesh]
+        if snappy:
+            if surface_feature_extract and os.path.isfile(os.path.join(
+                    case.project_dir, 'system', 'surfaceFeatureExtractDict')):
+                commands.append(case.surfaceFeatureExtract)
+            commands.append(lambda: case.snappyHexMesh(args=('-overwrite',)))
+
+        for command in commands:
+            log = command()
+            if not log.success:
+                raise Exception('Failed to mesh {}:\n\t{}'.format(
+                    case.project_dir, log.error))
+
+        self.store(case.project_dir, key)
+        return key, False
+
+    def remove(self, key):
+        """Remove a mesh from cache."""
+        folder = os.path.join(self.folder, key)
+        if os.path.isdir(folder):
+            shutil.rmtree(folder)
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Mesh cache representation."""
+        return 'MeshCache::{}::{} meshes'.format(self.folder, len(self.keys()))
@@ -1,6 +1,143 @@
 """OpenFOAM/c++ dictionary parser."""
+import hashlib
+import math
+import os
+import pickle
 import re
-from collections import OrderedDict
+import threading
+from collections import OrderedDict, namedtuple
+
+from .utilities import atomic_write, copy_values
+
+ParseCacheInfo = namedtuple('ParseCacheInfo', 'hits misses disk_hits size')
+
+
+class ParseCache(object):
+    """Cache of parsed dictionaries keyed by file path, mtime and size.
+
+    Each call returns an independent copy of the values so they can be
+    modified. The cache is thread safe.
+
+    Args:
+        maxsize: Maximum number of files in memory (default: 1024).
+        folder: Optional folder to store parsed values as pickle files so
+            other processes (e.g. sweep drivers) can use them. Use
+            BUTTERFLY_PARSE_CACHE environment variable to set the folder for
+            the default cache.
+    """
+
+    def __init__(self, maxsize=1024, folder=None):
+        """Init cache."""
+        self.maxsize = maxsize
+        self.folder = folder
+        self.__values = OrderedDict()
+        self.__lock = threading.Lock()
+        self.clear()
+
+    @staticmethod
+    def stamp(filepath):
+        """(mtime, size, inode) of a file."""
+        st = os.stat(filepath)
+        return getattr(st, 'st_mtime_ns', st.st_mtime), st.st_size, st.st_ino
+
+    def values(self, filepath):
+        """Get parsed values of a file.
+
+        Args:
+            filepath: Path to an OpenFOAM dictionary.
+
+        Returns:
+            A copy of the values as nested dictionaries.
+        """
+        filepath = os.path.abspath(filepath)
+        stamp = self.stamp(filepath)
+        with self.__lock:
+            cached = self.__values.pop(filepath, None)
+            if cached and cached[0] == stamp:
+                self.__values[filepath] = cached
+                self.__hits += 1
+                return copy_values(cached[1])
+
+        values = self.__load(filepath, stamp)
+        if values is None:
+            with open(filepath) as f:
+                values = CppDictParser._parse(f.read())
+            self.__dump(filepath, stamp, values)
+            kind = 'misses'
+        else:
+            kind = 'disk_hits'
+
+        with self.__lock:
+            if kind == 'misses':
+                self.__misses += 1
+            else:
+                self.__disk_hits += 1
+            self.__values[filepath] = (stamp, values)
+            while len(self.__values) > self.maxsize:
+                self.__values.popitem(last=False)
+        return copy_values(values)
+
+    def __contains__(self, filepath):
+        """Check if up to date values of a file are in memory."""
+        filepath = os.path.abspath(filepath)
+        try:
+            stamp = self.stamp(filepath)
+        except OSError:
+            return False
+        with self.__lock:
+            cached = self.__values.get(filepath)
+        return bool(cached) and cached[0] == stamp
+
+    def __pickle_file(self, filepath):
+        name = hashlib.sha1(filepath.encode('utf-8')).hexdigest()
+        return os.path.join(self.folder, name + '.pickle')
+
+    def __load(self, filepath, stamp):
+        """Load values from the pickle file or None."""
+        if not self.folder:
+            return None
+        try:
+            with open(self.__pickle_file(filepath), 'rb') as f:
+                cached_path, cached_stamp, values = pickle.load(f)
+        except Exception:
+            # missing, partial or from a different python version
+            return None
+        if cached_path != filepath or tuple(cached_stamp) != stamp:
+            return None
+        return values
+
+    def __dump(self, filepath, stamp, values):
+        """Write values to the pickle file."""
+        if not self.folder:
+            return
+        try:
+            if not os.path.isdir(self.folder):
+                os.makedirs(self.folder)
+            with atomic_write(self.__pickle_file(filepath), 'wb') as f:
+                pickle.dump((filepath, stamp, values), f,
+                            pickle.HIGHEST_PROTOCOL)
+        except (IOError, OSError) as e:
+            print('Failed to write parse cache for {}:\n\t{}'.format(filepath, e))
+
+    def info(self):
+        """Cache statistics as a namedtuple of (hits, misses, disk_hits, size)."""
+        with self.__lock:
+            return ParseCacheInfo(self.__hits, self.__misses, self.__disk_hits,
+                                  len(self.__values))
+
+    def clear(self):
+        """Remove the values in memory and reset the statistics."""
+        with self.__lock:
+            self.__values.clear()
+            self.__hits = self.__misses = self.__disk_hits = 0
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Cache representation."""
+        return 'ParseCache::{}'.format(self.info())
 
 
 class CppDictParser(object):
@@ -8,21 +145,50 @@ class CppDictParser(object):
 
     Use values property to get the dictionary.
 
+    The text is parsed in a single pass. Comments are removed and the text is
+    split on {, }, ;, quoted strings and directives in one go. Everything in
+    between is collected as plain text so the cost is linear in the size of
+    the input.
+
+    Lists (...) are kept as whitespace-normalized strings, quoted strings are
+    kept as they are, $macro references are not expanded and directives are
+    stored as keys (e.g. {'#include': '"initialConditions"'}). Repeated
+    directives in the same dictionary are stored as #name#2, #name#3, ... so
+    they keep their order and are written back as #name (see foamwriter).
+
     Attributes:
         text: OpenFOAM dictionary as a single multiline string.
     """
 
+    _comments = re.compile(r'//[^\n]*|/\*.*?\*/', re.DOTALL)
+    # a quote followed by a comment on the same line. Only in this case the
+    # comments have to be removed with the slower pattern which skips strings
+    _quoted_comments = re.compile(r'"[^"\n]*(?://|/\*)')
+    _comments_and_strings = re.compile(
+        r'("[^"\\]*(?:\\.[^"\\]*)*")|//[^\n]*|/\*.*?\*/', re.DOTALL)
+    _delimiters = re.compile(
+        r'([{};]|"[^"\\]*(?:\\.[^"\\]*)*"|\#\{.*?\#\}|\#[A-Za-z]\w*[^\n;{}]*)',
+        re.DOTALL)
+
     def __init__(self, text):
         """Init an OpenFOAMDictParser."""
-        _t = self.remove_comments(text)
-        _t = ''.join(_t.replace('\r\n', ' ').replace('\n', ' '))
-        self.__values = self._convert_to_dict(self._parse_nested(_t))
+        self.__values = self._parse(text)
 
     @classmethod
-    def from_file(cls, filepath):
-        """Create a parser from an OpenFOAM file."""
-        with open(filepath) as f:
-            return cls('\n'.join(f.readlines()))
+    def from_file(cls, filepath, cache=True):
+        """Create a parser from an OpenFOAM file.
+
+        Args:
+            filepath: Path to file.
+            cache: Use parse_cache to parse the file only if it has changed
+                since the last call (default: True).
+        """
+        if not cache:
+            with open(filepath) as f:
+                return cls(f.read())
+        _parser = cls.__new__(cls)
+        _parser.__values = parse_cache.values(filepath)
+        return _parser
 
     @property
     def values(self):
@@ -37,55 +203,150 @@ class CppDictParser(object):
         # remove all occurance singleline comments (//COMMENT\n ) from string
         return re.sub(re.compile('//.*?\n'), '', text)
 
-    def _convert_to_dict(self, parsed):
-        """Convert parsed list to a dictionary."""
-        d = dict()
-        itp = iter(parsed)
-        for pp in itp:
-            if not isinstance(pp, list):
-                if pp.find(';') == -1:
-                    # if not a list and doesn't include ';' it's a key and
-                    # next item is the value
-                    d[pp.strip()] = self._convert_to_dict(next(itp))
-                else:
-                    s = pp.split(';')
-                    if not pp.endswith(';'):
-                        # last item is a key and next item is the value
-                        d[s[-1].strip()] = self._convert_to_dict(next(itp))
-                        s = s[:-1]
-                    for ppp in s:
-                        ss = ppp.split()
-                        if ss:
-                            d[ss[0].strip()] = ' '.join(ss[1:]).strip()
-        return d
+    @classmethod
+    def _uncomment(cls, text):
+        """Replace comments with whitespace and keep quoted strings intact."""
+        if '/' not in text:
+            return text
+        if '"' in text and cls._quoted_comments.search(text):
+            return cls._comments_and_strings.sub(r'\1 ', text)
+        return cls._comments.sub(' ', text)
 
-    @staticmethod
-    def _parse_nested(text, left=r'[{]', right=r'[}]', sep='#'):
-        """Parse nested.
+    @classmethod
+    def _parse(cls, text):
+        """Parse text to nested dictionaries in a single pass."""
+        tokens = cls._delimiters.split(cls._uncomment(text))
+        stack = [dict()]
+        current = stack[0]
+        parts = []  # pieces of the current statement
+        literal = False  # True if parts include quoted strings or directives
+        depth = 0  # depth of () for the current statement
 
-        http://stackoverflow.com/a/14715850/4394669
-        """
-        pat = r'({}|{}|{})'.format(left, right, sep)
-        tokens = re.split(pat, text)
-        stack = [[]]
-        for x in tokens:
-            if not x.strip() or re.match(sep, x):
-                continue
-            if re.match(left, x):
-                # Nest a new list inside the current list
-                current = []
-                stack[-1].append(current)
-                stack.append(current)
-            elif re.match(right, x):
+        # tokens are [text, delimiter, text, delimiter, ..., text]
+        for i in range(0, len(tokens), 2):
+            t = tokens[i]
+            if '(' in t or ')' in t:
+                depth += t.count('(') - t.count(')')
+                if depth < 0:
+                    raise ValueError('error: opening bracket is missing')
+            if '"' in t:
+                raise ValueError('error: unterminated string: {}'.format(t.strip()))
+
+            try:
+                d = tokens[i + 1]
+            except IndexError:
+                parts.append(t)
+                break
+
+            if depth:
+                # braces, semicolons and strings inside lists are values
+                parts.append(t)
+                parts.append(d)
+            elif d == ';':
+                if not parts:
+                    # key value; which is the most common statement
+                    kv = t.split(None, 1)
+                    if kv:
+                        current[kv[0]] = ' '.join(kv[1].split()) \
+                            if len(kv) == 2 else ''
+                    continue
+                parts.append(t)
+                if literal or not t.isspace():
+                    key, value = cls._split_statement(parts, literal)
+                    current[key] = value
+                parts, literal = [], False
+            elif d == '{':
+                parts.append(t)
+                new = dict()
+                current[cls._join(parts, literal)] = new
+                stack.append(new)
+                current = new
+                parts, literal = [], False
+            elif d == '}':
+                parts.append(t)
+                if cls._has_text(parts, literal):
+                    # last entry of the dictionary with no semicolon
+                    key, value = cls._split_statement(parts, literal)
+                    current[key] = value
+                parts, literal = [], False
                 stack.pop()
                 if not stack:
                     raise ValueError('error: opening bracket is missing')
+                current = stack[-1]
+            elif d[0] == '#' and d[1] != '{':
+                # directives such as #include "file" and #includeFunc name
+                parts.append(t)
+                directive = d.split(None, 1)
+                if cls._has_text(parts, literal) or len(directive) == 1:
+                    # directive in place of a value (e.g. $a #calc "...")
+                    # or directive with a dictionary (e.g. #codeStream {...})
+                    parts.append(cls._Literal(d.strip()))
+                    literal = True
+                else:
+                    key = directive[0]
+                    count = 1
+                    while key in current:
+                        count += 1
+                        key = '{}#{}'.format(directive[0], count)
+                    current[key] = ' '.join(directive[1].split())
+                    parts = []
             else:
-                stack[-1].append(x.strip())
+                # quoted strings and #{ verbatim text #}
+                parts.append(t)
+                parts.append(cls._Literal(d))
+                literal = True
+
+        if depth:
+            raise ValueError('error: closing bracket is missing')
+
+        if cls._has_text(parts, literal):
+            key, value = cls._split_statement(parts, literal)
+            current[key] = value
+
         if len(stack) > 1:
-            print(stack)
             raise ValueError('error: closing bracket is missing')
-        return stack.pop()
+
+        return stack[0]
+
+    class _Literal(str):
+        """Quoted strings and verbatim text which are kept as they are."""
+
+        pass
+
+    @staticmethod
+    def _has_text(parts, literal):
+        """Check if statement parts include anything other than whitespace."""
+        return literal or bool(''.join(parts).strip())
+
+    @classmethod
+    def _join(cls, parts, literal):
+        """Join statement parts and collapse whitespace outside quoted strings."""
+        if not literal:
+            return ' '.join(''.join(parts).split())
+
+        out = []
+        for p in parts:
+            if isinstance(p, cls._Literal):
+                out.append(p)
+            elif p.strip():
+                out.append(' '.join(p.split()))
+        return ' '.join(out)
+
+    @classmethod
+    def _split_statement(cls, parts, literal):
+        """Split a statement to key and value."""
+        if literal:
+            for c, p in enumerate(parts):
+                if isinstance(p, cls._Literal):
+                    if not p.startswith('"') or parts[:c] and ''.join(parts[:c]).strip():
+                        break
+                    # quoted key (e.g. "(U|k|epsilon)")
+                    return p, cls._join(parts[c + 1:], True)
+                elif p.strip():
+                    break
+
+        kv = cls._join(parts, literal).split(None, 1)
+        return kv[0], kv[1] if len(kv) == 2 else ''
 
     def ToString(self):
         """Overwrite ToString method."""
@@ -97,39 +358,214 @@ class CppDictParser(object):
 
 
 class ResidualParser(object):
-    """Paeser for residual values from a log file.
+    """Incremental parser for residuals from a solver log file.
+
+    The parser remembers the byte offset of the last complete line and every
+    call to parse only reads the lines which are added to the log since the
+    last call. This makes it cheap to follow the log of a running solver.
+    Values are collected in numpy arrays which grow with the time steps.
+
+    For each time step the initial residual is from the first solve of the
+    quantity, the final residual is from the last solve and iterations is the
+    sum of iterations for all the solves (e.g. PIMPLE outer correctors).
+    Courant numbers which are reported before Time = (e.g. pimpleFoam) are
+    assigned to the next time step. Missing values are nan.
 
     Attributes:
         filepath: Full file path to .log file.
-        parser: If ture Parser will start parsing the values once initiated.
+        parse: If True parser will start parsing the values once initiated.
     """
 
+    # the groups are numbered so each type of line can be found by lastindex
+    _lines = re.compile(
+        br'^[ \t]*(?:'
+        br'Time = ([-+0-9.eE]+)|'
+        br'\S+:  Solving for ([^,\s]+), Initial residual = ([^,\s]+), '
+        br'Final residual = ([^,\s]+), No Iterations (\d+)|'
+        br'Courant Number mean: (\S+) max: (\S+)|'
+        br'ExecutionTime = (\S+) s[ \t]+ClockTime = (\S+) s)',
+        re.M)
+    chunk_size = 1 << 24
+
     def __init__(self, filepath, parse=True):
         """Init residual parser."""
         self.filepath = filepath
-        self.__residuals = OrderedDict()
+        self.reset()
         if parse:
             self.parse()
 
+    def reset(self):
+        """Remove the values and start from the beginning of the file."""
+        self.__offset = 0
+        self.__size = 0
+        self.__columns = OrderedDict()  # per quantity arrays
+        self.__arrays = None  # time, courant mean/max, execution/clock time
+        self.__step_closed = True  # ExecutionTime is reported for last step
+        self.__pending_courant = None
+
     def parse(self):
-        """Parse the log file."""
-        # open the file
-        # try to find the first line with Time =
-        # send the file to a recursive residualParser
+        """Parse new lines of the log file.
+
+        If the file is smaller than the current offset (e.g. the log is
+        overwritten by a new run) the values are reset and the file is parsed
+        from the beginning.
+
+        Returns:
+            Number of new time steps.
+        """
+        try:
+            size = os.path.getsize(self.filepath)
+        except OSError:
+            return 0
+        if size < self.__offset:
+            self.reset()
+        if size == self.__offset:
+            return 0
+
+        count = self.__size
         try:
             with open(self.filepath, 'rb') as f:
-                for line in f:
-                    if line.startswith('Time ='):
-                        self.timestep = self.__get_time(line)
-                        self.__residuals[self.timestep] = {}
-                        self.__parse_residuals(f)
+                f.seek(self.__offset)
+                while True:
+                    chunk = f.read(self.chunk_size)
+                    if not chunk:
+                        break
+                    # only parse complete lines. the rest will be read later
+                    end = chunk.rfind(b'\n') + 1
+                    if end == 0:
+                        if len(chunk) < self.chunk_size:
+                            break
+                        end = len(chunk)
+                    self.__parse_lines(chunk, end)
+                    self.__offset += end
+                    if end != len(chunk):
+                        f.seek(self.__offset)
         except Exception as e:
             raise Exception('Failed to parse {}:\n\t{}'.format(self.filepath, e))
 
+        return self.__size - count
+
+    def __parse_lines(self, chunk, end):
+        for match in self._lines.finditer(chunk, 0, end):
+            group = match.lastindex
+            if group == 1:
+                self.__add_step(float(match.group(1)))
+            elif group == 5:
+                if not self.__size:
+                    continue
+                row = self.__size - 1
+                initial, final, iterations = self.__column(
+                    match.group(2).decode('ascii', 'replace'))
+                if initial[row] != initial[row]:
+                    # nan. first solve in this time step
+                    initial[row] = float(match.group(3))
+                final[row] = float(match.group(4))
+                iterations[row] += int(match.group(5))
+            elif group == 7:
+                courant = float(match.group(6)), float(match.group(7))
+                if self.__size and not self.__step_closed:
+                    self.__arrays[self.__size - 1, 1:3] = courant
+                else:
+                    self.__pending_courant = courant
+            elif group == 9 and self.__size:
+                self.__arrays[self.__size - 1, 3:5] = \
+                    float(match.group(8)), float(match.group(9))
+                self.__step_closed = True
+
+    def __add_step(self, time):
+        import numpy as np
+        if self.__arrays is None:
+            self.__arrays = np.full((1024, 5), np.nan)
+        elif self.__size == len(self.__arrays):
+            self.__arrays = _grow(self.__arrays, np.nan)
+            for q, (initial, final, iterations) in self.__columns.items():
+                self.__columns[q] = (_grow(initial, np.nan),
+                                     _grow(final, np.nan),
+                                     _grow(iterations, 0))
+
+        self.__arrays[self.__size, 0] = time
+        if self.__pending_courant:
+            self.__arrays[self.__size, 1:3] = self.__pending_courant
+            self.__pending_courant = None
+        self.__size += 1
+        self.__step_closed = False
+
+    def __column(self, quantity):
+        try:
+            return self.__columns[quantity]
+        except KeyError:
+            import numpy as np
+            capacity = len(self.__arrays)
+            self.__columns[quantity] = (np.full(capacity, np.nan),
+                                        np.full(capacity, np.nan),
+                                        np.zeros(capacity, dtype=np.int64))
+            return self.__columns[quantity]
+
+    @property
+    def offset(self):
+        """Byte offset of the first line which is not parsed yet."""
+        return self.__offset
+
+    @property
+    def quantities(self):
+        """Solved quantities (e.g. Ux, p, k)."""
+        return tuple(self.__columns.keys())
+
+    @property
+    def times(self):
+        """Time values as a numpy array."""
+        return self.__values(0)
+
+    @property
+    def timestep(self):
+        """Latest time step."""
+        return self.times[-1] if self.__size else None
+
+    @property
+    def initial_residuals(self):
+        """Initial residuals as an OrderedDict of quantity: numpy array."""
+        return self.__quantity_values(0)
+
+    @property
+    def final_residuals(self):
+        """Final residuals as an OrderedDict of quantity: numpy array."""
+        return self.__quantity_values(1)
+
+    @property
+    def iterations(self):
+        """Number of iterations as an OrderedDict of quantity: numpy array."""
+        return self.__quantity_values(2)
+
+    @property
+    def courant_mean(self):
+        """Mean Courant number for each time step as a numpy array."""
+        return self.__values(1)
+
+    @property
+    def courant_max(self):
+        """Max Courant number for each time step as a numpy array."""
+        return self.__values(2)
+
+    @property
+    def execution_time(self):
+        """ExecutionTime in seconds as a numpy array."""
+        return self.__values(3)
+
+    @property
+    def clock_time(self):
+        """ClockTime in seconds as a numpy array."""
+        return self.__values(4)
+
     @property
     def residuals(self):
-        """Get residuals as a dictionary."""
-        return self.__residuals
+        """Get initial residuals as a dictionary of time: {quantity: value}."""
+        _residuals = OrderedDict()
+        values = OrderedDict((q, v.tolist())
+                             for q, v in self.initial_residuals.items())
+        for c, t in enumerate(self.times.tolist()):
+            _residuals[t] = {q: v[c] for q, v in values.items()
+                             if not math.isnan(v[c])}
+        return _residuals
 
     @property
     def time_range(self):
@@ -139,42 +575,203 @@ class ResidualParser(object):
 
     def get_times(self):
         """Get time steps."""
-        return self.__residuals.keys()
+        return self.times
+
+    def get_residuals(self, quantity, time_range=None):
+        """Get initial residuals for a quantity as a numpy array.
 
-    def get_residuals(self, quantity, time_range):
-        """Get residuals for a quantity."""
-        if quantity not in self.quantities:
-            print ('Invalid quantity [{}]. Try from the list below:\n{}'
-                   .format(quantity, self.quantities))
+        Args:
+            quantity: A solved quantity (e.g. Ux).
+            time_range: Optional (start, end) time to filter the values.
+        """
+        if quantity not in self.__columns:
+            print('Invalid quantity [{}]. Try from the list below:\n{}'
+                  .format(quantity, self.quantities))
             return ()
 
+        values = self.initial_residuals[quantity]
         if not time_range:
-            return (v[quantity] for v in self.__residuals.itervalues())
-        else:
-            available_time_range = self.time_range
-            try:
-                t0 = max(available_time_range[0], time_range[0])
-                t1 = min(available_time_range[1], time_range[1])
-            except IndexError as e:
-                raise ValueError('Failed to read time_range:\n{}'.format(e))
+            return values
 
-            return (self.__residuals[int(t)][quantity] for t in xrange(t0, t1))
+        try:
+            t0, t1 = float(time_range[0]), float(time_range[1])
+        except (IndexError, TypeError) as e:
+            raise ValueError('Failed to read time_range:\n{}'.format(e))
+        times = self.times
+        return values[(times >= t0) & (times <= t1)]
+
+    def __values(self, index):
+        if self.__arrays is None:
+            import numpy as np
+            return np.zeros(0)
+        return self.__arrays[:self.__size, index]
+
+    def __quantity_values(self, index):
+        return OrderedDict((q, v[index][:self.__size])
+                           for q, v in self.__columns.items())
+
+    def __len__(self):
+        """Number of time steps."""
+        return self.__size
+
+    def ToString(self):
+        """Overwrite ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Class representation."""
+        return 'ResidualParser::{}::{} time steps'.format(self.filepath,
+                                                          self.__size)
+
+
+class FunctionObjectParser(object):
+    """Incremental parser for function object .dat files.
+
+    e.g. postProcessing/forces/0/forceCoeffs.dat or residuals.dat. Column
+    names are read from the commented header line which starts with Time.
+    Like ResidualParser only the lines which are added since the last call to
+    parse are read. N/A values are nan. If the file is truncated or replaced
+    by a new file (e.g. the run is started again) the values are removed and
+    the file is parsed from the beginning.
+
+    Attributes:
+        filepath: Full file path to .dat file.
+        parse: If True parser will start parsing the values once initiated.
+    """
+
+    def __init__(self, filepath, parse=True):
+        """Init function object parser."""
+        self.filepath = filepath
+        self.__reloads = 0
+        self.reset()
+        if parse:
+            self.parse()
+
+    def reset(self):
+        """Remove the values and start from the beginning of the file."""
+        self.__offset = 0
+        self.__inode = None
+        self.__size = 0
+        self.__columns = ()
+        self.__array = None
+
+    def parse(self):
+        """Parse new lines of the file.
+
+        Returns:
+            Number of new rows.
+        """
+        try:
+            f = open(self.filepath, 'rb')
+        except (IOError, OSError):
+            return 0
+
+        with f:
+            st = os.fstat(f.fileno())
+            if st.st_size < self.__offset or \
+                    self.__inode is not None and st.st_ino != self.__inode:
+                # truncated or recreated
+                self.reset()
+                self.__reloads += 1
+            self.__inode = st.st_ino
+            if st.st_size == self.__offset:
+                return 0
+            f.seek(self.__offset)
+            chunk = f.read()
+
+        # only parse complete lines. the rest will be read later
+        end = chunk.rfind(b'\n') + 1
+        self.__offset += end
+
+        rows = []
+        for line in chunk[:end].splitlines():
+            if line.startswith(b'#'):
+                fields = line[1:].decode('utf-8', 'replace').split()
+                if fields and fields[0] == 'Time' and not self.__size:
+                    self.__columns = tuple(fields)
+                continue
+            fields = line.replace(b'N/A', b'nan').split()
+            if self.__columns and len(fields) == len(self.__columns):
+                rows.append(fields)
+
+        if rows:
+            self.__append(rows)
+        return len(rows)
+
+    def __append(self, rows):
+        import numpy as np
+        rows = np.array(rows, dtype=np.float64)
+        if self.__array is None:
+            self.__array = np.full((max(1024, len(rows)), len(self.__columns)),
+                                   np.nan)
+        while self.__size + len(rows) > len(self.__array):
+            self.__array = _grow(self.__array, np.nan)
+        self.__array[self.__size:self.__size + len(rows)] = rows
+        self.__size += len(rows)
+
+    @property
+    def offset(self):
+        """Byte offset of the first line which is not parsed yet."""
+        return self.__offset
+
+    @property
+    def reloads(self):
+        """Number of times the file was truncated or recreated."""
+        return self.__reloads
+
+    @property
+    def columns(self):
+        """Column names (e.g. Time, Cm, Cd, Cl)."""
+        return self.__columns
+
+    @property
+    def values(self):
+        """Parsed rows as a (rows, columns) numpy array."""
+        if self.__array is None:
+            import numpy as np
+            return np.zeros((0, len(self.__columns)))
+        return self.__array[:self.__size]
+
+    @property
+    def times(self):
+        """Time values as a numpy array."""
+        return self.get_values('Time')
+
+    def get_values(self, column):
+        """Get values of a column as a numpy array.
+
+        Raises:
+            ValueError if the column is not in the file.
+        """
+        if column not in self.__columns:
+            raise ValueError('Invalid column [{}]. Try from the list below:\n{}'
+                             .format(column, self.__columns))
+        if self.__array is None:
+            import numpy as np
+            return np.zeros(0)
+        return self.__array[:self.__size, self.__columns.index(column)]
+
+    def __len__(self):
+        """Number of rows."""
+        return self.__size
+
+    def ToString(self):
+        """Overwrite ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Class representation."""
+        return 'FunctionObjectParser::{}::{} rows'.format(self.filepath,
+                                                          self.__size)
+
+
+def _grow(array, fill):
+    """Return a copy of array with double the length filled with fill."""
+    import numpy as np
+    new = np.full((2 * len(array),) + array.shape[1:], fill, dtype=array.dtype)
+    new[:len(array)] = array
+    return new
 
-    @staticmethod
-    def __get_time(line):
-        return int(line.split('Time =')[-1])
-
-    def __parse_residuals(self, f):
-        for line in f:
-            if not line.startswith('Time ='):
-                try:
-                    # quantity, Initial residual, Final residual, No Iterations
-                    q, ir, fr, ni = line.split(':  Solving for ')[1].split(',')
-                    self.__residuals[self.timestep][q] = ir.split('= ')[-1]
-                except IndexError:
-                    pass
-            else:
-                self.timestep = self.__get_time(line)
-                self.__residuals[self.timestep] = {}
 
-        self.quantities = self.__residuals[self.timestep].keys()
+# default cache for CppDictParser.from_file
+parse_cache = ParseCache(folder=os.environ.get('BUTTERFLY_PARSE_CACHE'))
@@ -0,0 +1,359 @@
+"""Read OpenFOAM polyMesh (points, faces, owner, neighbour, boundary) to numpy.
+
+    Usage:
+
+        mesh = load_polyMesh('c:/ladybug/case/constant/polyMesh')
+        print(mesh.points.shape)
+        # vertices of the first face
+        print(mesh.faces[mesh.face_offsets[0]:mesh.face_offsets[1]])
+
+        # mesh with lazy geometry
+        mesh = PolyMesh('c:/ladybug/case/constant/polyMesh')
+        print(mesh.cell_centres.shape, mesh.cell_volumes.sum())
+"""
+import os
+import re
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from .foamarray import read_file, read_header, is_binary, dtypes, read_list, \
+    read_face_list
+from .parser import CppDictParser
+
+PolyMeshArrays = namedtuple(
+    'PolyMeshArrays',
+    'points faces face_offsets owner neighbour boundary n_cells')
+
+
+def load_points(filepath):
+    """Load points file as a (N, 3) float64 array."""
+    buf = read_file(filepath)
+    header, start = read_header(buf)
+    label, scalar = dtypes(header)
+    points, _ = read_list(buf, start, scalar, 3, is_binary(header))
+    return points.astype(np.float64, copy=False)
+
+
+def load_faces(filepath):
+    """Load faces file as compressed sparse rows.
+
+    Returns:
+        A tuple of (vertex indices, offsets) as int32 arrays. Vertices of face
+        i are indices[offsets[i]:offsets[i + 1]].
+    """
+    buf = read_file(filepath)
+    header, start = read_header(buf)
+    label, scalar = dtypes(header)
+    compact = header.get('class') == 'faceCompactList'
+    indices, offsets, _ = read_face_list(buf, start, label, is_binary(header),
+                                         compact)
+    return _to_int32(indices), _to_int32(offsets)
+
+
+def load_labels(filepath):
+    """Load a labelList file (e.g. owner, neighbour) as an int32 array."""
+    buf = read_file(filepath)
+    header, start = read_header(buf)
+    label, scalar = dtypes(header)
+    labels, _ = read_list(buf, start, label, 1, is_binary(header))
+    return _to_int32(labels)
+
+
+def load_boundary(filepath):
+    """Load boundary file as an OrderedDict of patch name: patch values.
+
+    nFaces and startFace are converted to integers.
+    """
+    buf = read_file(filepath)
+    header, start = read_header(buf)
+    text = bytes(buf[start:]).decode('utf-8', 'replace')
+    text = CppDictParser.remove_comments(text + '\n')
+    # N ( patch {...} patch {...} )
+    st, en = text.find('('), text.rfind(')')
+    if st == -1 or en == -1:
+        return OrderedDict()
+
+    patches = OrderedDict()
+    for name, values in CppDictParser(text[st + 1:en]).values.items():
+        for key in ('nFaces', 'startFace'):
+            if key in values:
+                values[key] = int(values[key])
+        patches[name] = values
+    return patches
+
+
+def mesh_size(filepath):
+    """Get nPoints, nCells, nFaces and nInternalFaces from owner file note.
+
+    Returns:
+        A dictionary. The dictionary is empty if the note is not available.
+    """
+    buf = read_file(filepath)
+    header, _ = read_header(buf)
+    return {k: int(v) for k, v in
+            re.findall(r'(n\w+):\s*(\d+)', header.get('note', ''))}
+
+
+def load_polyMesh(folder):
+    """Load polyMesh folder.
+
+    Args:
+        folder: Path to polyMesh folder (e.g. case/constant/polyMesh).
+
+    Returns:
+        A namedtuple of (points, faces, face_offsets, owner, neighbour,
+        boundary, n_cells). points is a (N, 3) float64 array, faces and
+        face_offsets are int32 compressed sparse rows, owner and neighbour are
+        int32 arrays and boundary is an OrderedDict of patches.
+    """
+    assert os.path.isdir(folder), 'Failed to find {}.'.format(folder)
+
+    points = load_points(os.path.join(folder, 'points'))
+    faces, face_offsets = load_faces(os.path.join(folder, 'faces'))
+    owner = load_labels(os.path.join(folder, 'owner'))
+    neighbour = load_labels(os.path.join(folder, 'neighbour'))
+    boundary = load_boundary(os.path.join(folder, 'boundary'))
+
+    n_cells = mesh_size(os.path.join(folder, 'owner')).get('nCells')
+    if n_cells is None:
+        n_cells = int(max(owner.max(initial=-1), neighbour.max(initial=-1))) + 1
+
+    return PolyMeshArrays(points, faces, face_offsets, owner, neighbour,
+                          boundary, n_cells)
+
+
+class PolyMesh(object):
+    """OpenFOAM polyMesh with lazy numpy arrays.
+
+    Arrays are loaded from polyMesh folder on first access and geometrical
+    properties are calculated once and cached. Face and cell centres, areas and
+    volumes are calculated the same way as OpenFOAM (primitiveMesh) by
+    decomposing faces to triangles and cells to pyramids.
+
+    Attributes:
+        folder: Path to polyMesh folder.
+    """
+
+    def __init__(self, folder):
+        """Init PolyMesh."""
+        assert os.path.isdir(folder), 'Failed to find {}.'.format(folder)
+        self.folder = folder
+        self.__arrays = None
+        self.__cache = {}
+
+    @classmethod
+    def from_arrays(cls, arrays, folder=None):
+        """Create a PolyMesh from PolyMeshArrays."""
+        _cls = cls.__new__(cls)
+        _cls.folder = folder
+        _cls.__arrays = arrays
+        _cls.__cache = {}
+        return _cls
+
+    @property
+    def arrays(self):
+        """PolyMeshArrays for this mesh. Loaded on the first call."""
+        if self.__arrays is None:
+            self.__arrays = load_polyMesh(self.folder)
+        return self.__arrays
+
+    @property
+    def points(self):
+        """Points as a (N, 3) float64 array."""
+        return self.arrays.points
+
+    @property
+    def faces(self):
+        """Vertex indices of faces. Use with face_offsets."""
+        return self.arrays.faces
+
+    @property
+    def face_offsets(self):
+        """Offsets of faces in faces. Face i is faces[offsets[i]:offsets[i+1]]."""
+        return self.arrays.face_offsets
+
+    @property
+    def owner(self):
+        """Owner cell for each face."""
+        return self.arrays.owner
+
+    @property
+    def neighbour(self):
+        """Neighbour cell for each internal face."""
+        return self.arrays.neighbour
+
+    @property
+    def boundary(self):
+        """Boundary patches as an OrderedDict."""
+        return self.arrays.boundary
+
+    @property
+    def n_points(self):
+        """Number of points."""
+        return len(self.points)
+
+    @property
+    def n_faces(self):
+        """Number of faces."""
+        return len(self.owner)
+
+    @property
+    def n_internal_faces(self):
+        """Number of internal faces."""
+        return len(self.neighbour)
+
+    @property
+    def n_cells(self):
+        """Number of cells."""
+        return self.arrays.n_cells
+
+    @property
+    def face_sizes(self):
+        """Number of vertices for each face."""
+        return np.diff(self.face_offsets)
+
+    @property
+    def face_centres(self):
+        """Face centres as a (n_faces, 3) array."""
+        return self._face_geometry()[0]
+
+    @property
+    def face_area_vectors(self):
+        """Face area vectors (Sf) as a (n_faces, 3) array."""
+        return self._face_geometry()[1]
+
+    @property
+    def face_areas(self):
+        """Face areas (magSf) as a (n_faces,) array."""
+        if 'face_areas' not in self.__cache:
+            self.__cache['face_areas'] = np.sqrt(
+                np.einsum('ij,ij->i', self.face_area_vectors,
+                          self.face_area_vectors))
+        return self.__cache['face_areas']
+
+    @property
+    def cell_centres(self):
+        """Cell centres as a (n_cells, 3) array."""
+        return self._cell_geometry()[0]
+
+    @property
+    def cell_volumes(self):
+        """Cell volumes as a (n_cells,) array."""
+        return self._cell_geometry()[1]
+
+    def patch_slice(self, name):
+        """Get slice of faces for a boundary patch.
+
+        Use it to get the values for a patch from face arrays (e.g.
+        mesh.face_centres[mesh.patch_slice('inlet')]).
+        """
+        try:
+            patch = self.boundary[name]
+        except KeyError:
+            raise ValueError('Failed to find {} in {}.'.format(
+                name, tuple(self.boundary.keys())))
+        return slice(patch['startFace'], patch['startFace'] + patch['nFaces'])
+
+    def _face_geometry(self):
+        """Calculate face centres and face area vectors."""
+        if 'face_geometry' in self.__cache:
+            return self.__cache['face_geometry']
+
+        faces, offsets = self.faces, self.face_offsets
+        n_faces = len(offsets) - 1
+        sizes = np.diff(offsets)
+        # face index for each face vertex and index of the next vertex
+        face_ids = np.repeat(np.arange(n_faces, dtype=np.int32), sizes)
+        nxt = np.arange(1, len(faces) + 1, dtype=np.int32)
+        nxt[offsets[1:] - 1] = offsets[:-1]
+
+        # work with x, y, z components as contiguous 1D arrays
+        pts = [np.ascontiguousarray(c)[faces] for c in self.points.T]
+
+        # estimated centre as the average of points
+        est = [np.bincount(face_ids, c, n_faces) / sizes for c in pts]
+
+        # decompose faces to triangles around the estimated centre
+        # n = (next - p) x (est - p), c = p + next + est
+        e = [c[nxt] - c for c in pts]
+        d = [ce[face_ids] - c for ce, c in zip(est, pts)]
+        n = (e[1] * d[2] - e[2] * d[1],
+             e[2] * d[0] - e[0] * d[2],
+             e[0] * d[1] - e[1] * d[0])
+        a = np.sqrt(n[0] * n[0] + n[1] * n[1] + n[2] * n[2])
+        sum_a = np.bincount(face_ids, a, n_faces)
+
+        centres = np.empty((n_faces, 3))
+        areas = np.empty((n_faces, 3))
+        valid = sum_a > 1e-150
+        for i in range(3):
+            # sum(a * (p + next + est)) = sum(a * (3p + e + d))
+            sum_ac = np.bincount(face_ids, a * (3 * pts[i] + e[i] + d[i]),
+                                 n_faces)
+            centres[:, i] = np.where(
+                valid, sum_ac / (3.0 * np.where(valid, sum_a, 1)), est[i])
+            areas[:, i] = 0.5 * np.bincount(face_ids, n[i], n_faces)
+        areas[~valid] = 0
+
+        self.__cache['face_geometry'] = centres, areas
+        return centres, areas
+
+    def _cell_geometry(self):
+        """Calculate cell centres and cell volumes."""
+        if 'cell_geometry' in self.__cache:
+            return self.__cache['cell_geometry']
+
+        fc, sf = self._face_geometry()
+        own, nei = self.owner, self.neighbour
+        n_cells, n_int = self.n_cells, len(nei)
+        # each internal face is shared by owner and neighbour
+        cells = np.concatenate((own, nei))
+        faces = np.concatenate((np.arange(len(own)), np.arange(n_int)))
+
+        # estimated centre as the average of face centres
+        n_cell_faces = np.bincount(cells, minlength=n_cells)
+        est = _sum_by(cells, fc[faces], n_cells) / \
+            np.maximum(n_cell_faces, 1)[:, None]
+
+        # decompose cells to pyramids with the face as base and the estimated
+        # centre as apex. 3 * volume of the pyramid
+        pyr3_vol = np.einsum('ij,ij->i', sf[faces], fc[faces] - est[cells])
+        pyr3_vol[len(own):] *= -1
+        pyr_ctr = 0.75 * fc[faces] + 0.25 * est[cells]
+
+        volumes = np.bincount(cells, pyr3_vol, n_cells)
+        centres = _sum_by(cells, pyr_ctr * pyr3_vol[:, None], n_cells)
+
+        valid = np.abs(volumes) > 1e-150
+        centres[valid] /= volumes[valid, None]
+        centres[~valid] = est[~valid]
+        volumes *= 1.0 / 3.0
+
+        self.__cache['cell_geometry'] = centres, volumes
+        return centres, volumes
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """PolyMesh representation."""
+        return 'PolyMesh: {}'.format(self.folder)
+
+
+def _sum_by(ids, values, size):
+    """Sum rows of a (n, 3) array by ids using np.bincount."""
+    out = np.empty((size, values.shape[1]))
+    for i in range(values.shape[1]):
+        out[:, i] = np.bincount(ids, values[:, i], size)
+    return out
+
+
+def _to_int32(labels):
+    """Convert labels to int32 if they fit in int32."""
+    if labels.dtype == np.int32:
+        return labels
+    if labels.size and labels.max() > np.iinfo(np.int32).max:
+        return labels
+    return labels.astype(np.int32)
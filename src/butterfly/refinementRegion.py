@@ -157,9 +157,12 @@ def refinement_mode_from_dict(d):
         return Distance(levels)
 
 
-def refinementRegions_from_stl_file(filepath, refinement_mode):
-    """Create a RefinementRegion form an stl file."""
-    geos = bf_geometry_from_stl_file(filepath)
+def refinementRegions_from_stl_file(filepath, refinement_mode, as_arrays=False):
+    """Create a RefinementRegion form an stl file.
+
+    Set as_arrays to True to store the regions as numpy arrays.
+    """
+    geos = bf_geometry_from_stl_file(filepath, as_arrays=as_arrays)
     return tuple(RefinementRegion(geo.name, geo.vertices, geo.face_indices,
                                   geo.normals, refinement_mode)
                  for geo in geos)
@@ -0,0 +1,390 @@
+# coding=utf-8
+"""Runmanager for butterfly on Linux, macOS and WSL.
+
+OpenFOAM commands are executed directly with no shell, batch file or docker
+container. The OpenFOAM environment is sourced once from etc/bashrc and cached
+for all the following commands. stdout and stderr of each command are
+redirected to log and err files by the operating system so running commands
+never block Python and the logs can be followed while the command is running
+(see parser.ResidualParser).
+"""
+import glob
+import os
+import shutil
+import signal
+import threading
+from subprocess import PIPE, Popen
+from collections import namedtuple
+from copy import deepcopy
+
+
+# usual locations of OpenFOAM bashrc. The last match is the latest version.
+BASHRC_PATTERNS = (
+    '/opt/openfoam*/etc/bashrc',
+    '/opt/OpenFOAM*/etc/bashrc',
+    '/usr/lib/openfoam/openfoam*/etc/bashrc',
+    os.path.expanduser('~/OpenFOAM/OpenFOAM-*/etc/bashrc'),
+)
+
+
+def find_bashrc():
+    """Find OpenFOAM etc/bashrc.
+
+    FOAM_BASHRC environment variable is used if it is set. Otherwise the usual
+    installation folders are searched.
+
+    Returns:
+        Full path to bashrc or None if no installation is found.
+    """
+    bashrc = os.environ.get('FOAM_BASHRC')
+    if bashrc:
+        assert os.path.isfile(bashrc), 'Failed to find {}.'.format(bashrc)
+        return bashrc
+
+    for pattern in BASHRC_PATTERNS:
+        found = sorted(glob.glob(pattern))
+        if found:
+            return found[-1]
+
+
+class RunManagerPosix(object):
+    """RunManager to run OpenFOAM commands directly on POSIX systems.
+
+    Args:
+        project_name: A string for project name.
+        project_folder: Full path to case folder. Commands are executed in
+            this folder.
+        bashrc: Optional path to OpenFOAM etc/bashrc. If the environment is
+            already set (e.g. WM_PROJECT_DIR is set) it will not be sourced
+            again. By default bashrc will be found using find_bashrc. If no
+            bashrc is found the current environment is used as is which is
+            useful for OpenFOAM installations on PATH.
+
+    Attributes:
+        mpi_args: Extra arguments for mpirun (e.g. ('--bind-to', 'none') when
+            several parallel runs share the same machine).
+    """
+
+    # sourced environments for each bashrc. Sourcing bashrc takes a few hundred
+    # milliseconds so it's only done once per bashrc.
+    __environments = {}
+    __lock = threading.Lock()
+
+    def __init__(self, project_name, project_folder, bashrc=None):
+        """Init run manager for project."""
+        assert os.name == 'posix', \
+            'RunManagerPosix is only supported on Linux, macOS and WSL.'
+        self._project_name = project_name
+        self.project_folder = project_folder
+        self.bashrc = bashrc
+        self.log_folder = 'log'
+        self.errFolder = 'log'
+        self.mpi_args = ()
+        self._process = None
+
+    @property
+    def process(self):
+        """Return the process for the latest command."""
+        return self._process
+
+    @property
+    def pid(self):
+        """Return PID for the latest command."""
+        return self._process.pid if self._process else None
+
+    @property
+    def env(self):
+        """Environment variables to run OpenFOAM commands."""
+        if self.bashrc is None and 'WM_PROJECT_DIR' in os.environ:
+            # OpenFOAM environment is already sourced
+            return os.environ.copy()
+
+        bashrc = self.bashrc or find_bashrc()
+        if not bashrc:
+            return os.environ.copy()
+
+        with self.__lock:
+            if bashrc not in self.__environments:
+                self.__environments[bashrc] = self.source(bashrc)
+        return dict(self.__environments[bashrc])
+
+    @staticmethod
+    def source(bashrc):
+        """Source a bash file and return the environment as a dictionary."""
+        assert os.path.isfile(bashrc), 'Failed to find {}.'.format(bashrc)
+        process = Popen(
+            ['bash', '-c', '. "$0" > /dev/null 2>&1; env -0', bashrc],
+            stdout=PIPE, stderr=PIPE)
+        out, err = process.communicate()
+        if process.returncode != 0:
+            raise IOError('Failed to source {}:\n\t{}'.format(
+                bashrc, err.decode('utf-8', 'replace')))
+
+        env = {}
+        for line in out.decode('utf-8', 'replace').split('\0'):
+            key, sep, value = line.partition('=')
+            if sep and not key.startswith('BASH_FUNC_'):
+                env[key] = value
+        return env
+
+    @classmethod
+    def clear_environments(cls):
+        """Clear cached environments to source bashrc files again."""
+        with cls.__lock:
+            cls.__environments.clear()
+
+    def terminate(self, pid=None, force=False):
+        """Kill the latest command and its child processes (e.g. mpirun)."""
+        if pid is None:
+            process = self._process
+            if isinstance(process, _ProcessChain):
+                # cancel and signal without a race with the next command
+                return process.kill() if force else process.terminate()
+            if process is None or process.poll() is not None:
+                return
+            pid = process.pid
+        try:
+            # processes are started in a new session so pid is the group id
+            os.killpg(pid, signal.SIGKILL if force else signal.SIGTERM)
+        except OSError:
+            pass
+
+    def command(self, cmd, args=None, decomposeParDict=None, include_header=True):
+        """Get command line for an OpenFOAM command in parallel or serial.
+
+        Args:
+            cmd: An OpenFOAM command.
+            args: List of optional arguments for command. e.g. ('-latestTime',)
+            decomposeParDict: decomposeParDict for parallel runs (default: None).
+            include_header: Not used. Environment is set from bashrc.
+        Returns:
+            (cmd, logfiles, errorfiles). cmd is a tuple of arguments for each
+            command.
+        """
+        if isinstance(cmd, str):
+            return self.__command(cmd, args, decomposeParDict)
+        elif isinstance(cmd, (list, tuple)):
+            # a list of commands
+            res = namedtuple('log', 'cmd logfiles errorfiles')
+            logs = list(range(len(cmd)))  # create a place holder for commands
+            for count, c in enumerate(cmd):
+                if c == 'blockMesh':
+                    decomposeParDict = None
+                try:
+                    arg = args[count]
+                except TypeError:
+                    arg = args
+
+                logs[count] = self.__command(c, (arg,) if arg else None,
+                                             decomposeParDict)
+
+            command = tuple(c for log in logs for c in log.cmd)
+            logfiles = tuple(ff for log in logs for ff in log.logfiles)
+            errorfiles = tuple(ff for log in logs for ff in log.errorfiles)
+
+            return res(command, logfiles, errorfiles)
+
+    def __command(self, cmd, args=None, decomposeParDict=None):
+        """Get arguments for an OpenFOAM command in parallel or serial."""
+        res = namedtuple('log', 'cmd logfiles errorfiles')
+        arguments = tuple(a for arg in (args or ()) for a in str(arg).split())
+
+        if decomposeParDict:
+            # run in parallel. processor folders are removed once the
+            # reconstruction is finished.
+            n = str(decomposeParDict.numberOfSubdomains)
+            reconstruct = ('reconstructParMesh', '-constant') \
+                if cmd == 'snappyHexMesh' else ('reconstructPar',)
+            cmds = (('decomposePar',),
+                    ('mpirun',) + tuple(self.mpi_args) + ('-np', n, cmd) +
+                    arguments + ('-parallel',),
+                    reconstruct)
+            names = ('decomposePar', cmd, reconstruct[0])
+        else:
+            # run is serial
+            cmds = ((cmd,) + arguments,)
+            names = (cmd,)
+
+        errfiles = tuple('{}/{}.err'.format(self.errFolder, name)
+                         for name in names)
+        logfiles = tuple('{}/{}.log'.format(self.log_folder, name)
+                         for name in names)
+        return res(cmds, logfiles, errfiles)
+
+    def run(self, command, args=None, decomposeParDict=None, wait=True):
+        """Run OpenFOAM command.
+
+        The process is returned as soon as it is started. If there are several
+        commands (e.g. parallel runs) they are executed one after another in a
+        background thread and a process-like object with poll, wait and
+        terminate is returned.
+        """
+        cmds, logfiles, errfiles = self.command(command, args, decomposeParDict)
+        log = namedtuple('log', 'process logfiles errorfiles')
+
+        for f in set(os.path.dirname(f) for f in logfiles + errfiles):
+            folder = os.path.join(self.project_folder, f)
+            if not os.path.isdir(folder):
+                os.makedirs(folder)
+
+        env = self.env
+        if len(cmds) == 1:
+            process = self._start(cmds[0], logfiles[0], errfiles[0], env)
+        else:
+            process = _ProcessChain(self, cmds, logfiles, errfiles, env,
+                                    cleanup=bool(decomposeParDict))
+        self._process = process
+
+        if wait:
+            process.wait()
+
+        return log(process, logfiles, errfiles)
+
+    def _start(self, args, logfile, errfile, env):
+        """Start a command with stdout and stderr redirected to files."""
+        with open(os.path.join(self.project_folder, logfile), 'wb') as outf, \
+                open(os.path.join(self.project_folder, errfile), 'wb') as errf:
+            try:
+                return Popen(args, stdout=outf, stderr=errf,
+                             cwd=self.project_folder, env=env,
+                             start_new_session=True, close_fds=True)
+            except OSError as e:
+                errf.write('Failed to run {}:\n\t{}\n'.format(
+                    ' '.join(args), e).encode())
+                raise OSError('Failed to run {}. Is OpenFOAM installed and '
+                              'sourced?\n\t{}'.format(args[0], e))
+
+    def check_file_contents(self, files, mute=False):
+        """Check files for content and print them out if any.
+
+        args:
+            files: A list of ASCII files.
+
+        returns:
+            (hasContent, content)
+            hasContent: A boolean that shows if there is any contents.
+            content: Files content if any
+        """
+        def read_file(f):
+            try:
+                with open(os.path.join(self.project_folder, f), 'rb') as log:
+                    return log.read().decode('utf-8', 'replace').strip()
+            except Exception as e:
+                err = 'Failed to read {}:\n\t{}'.format(f, e)
+                print(err)
+                return ''
+
+        _lines = '\n'.join(tuple(read_file(f) for f in files)).strip()
+
+        if len(_lines) > 0:
+            if not mute:
+                print(_lines)
+            return True, _lines
+        else:
+            return False, _lines
+
+    def duplicate(self):
+        """Return a copy of this object.
+
+        The copy doesn't share the running process of this run manager.
+        """
+        # the memo replaces the process with None in the copy
+        return deepcopy(self, {id(self._process): None})
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Run manager representation."""
+        return """RunManagerPosix::{}""".format(self._project_name)
+
+
+class _ProcessChain(object):
+    """Run several commands one after another in a background thread.
+
+    The chain stops at the first command which fails. It has the same poll,
+    wait and terminate methods as subprocess.Popen.
+    """
+
+    def __init__(self, runmanager, cmds, logfiles, errfiles, env, cleanup=False):
+        self.returncode = None
+        self.process = None
+        self.__cancelled = False
+        # cancel and start of the next command are not interleaved
+        self.__lock = threading.Lock()
+        self.__done = threading.Event()
+        self.__thread = threading.Thread(
+            target=self.__run,
+            args=(runmanager, cmds, logfiles, errfiles, env, cleanup))
+        self.__thread.daemon = True
+        self.__thread.start()
+
+    @property
+    def pid(self):
+        """PID of the current command."""
+        return self.process.pid if self.process else None
+
+    def __run(self, runmanager, cmds, logfiles, errfiles, env, cleanup):
+        returncode = 0
+        try:
+            for args, logfile, errfile in zip(cmds, logfiles, errfiles):
+                with self.__lock:
+                    if self.__cancelled:
+                        returncode = -signal.SIGTERM
+                        break
+                    self.process = runmanager._start(args, logfile, errfile,
+                                                     env)
+                returncode = self.process.wait()
+                if returncode != 0:
+                    break
+            else:
+                if cleanup:
+                    for folder in glob.glob(os.path.join(
+                            runmanager.project_folder, 'processor*')):
+                        shutil.rmtree(folder, ignore_errors=True)
+        except OSError:
+            # failed to start the command. the error is in err file
+            returncode = 1
+        finally:
+            self.returncode = returncode
+            self.__done.set()
+
+    def poll(self):
+        """Return returncode if all the commands are finished otherwise None."""
+        return self.returncode if self.__done.is_set() else None
+
+    def wait(self, timeout=None):
+        """Wait for all the commands to finish and return returncode."""
+        self.__done.wait(timeout)
+        return self.poll()
+
+    def cancel(self):
+        """Do not start the next commands."""
+        with self.__lock:
+            self.__cancelled = True
+
+    def terminate(self):
+        """Cancel the chain and terminate the current command."""
+        self.__signal(signal.SIGTERM)
+
+    def kill(self):
+        """Cancel the chain and kill the current command."""
+        self.__signal(signal.SIGKILL)
+
+    def __signal(self, sig):
+        """Send a signal to the process group of the current command.
+
+        Commands are started in a new session so the group includes child
+        processes (e.g. mpirun ranks). The chain is cancelled first so no
+        command can start after the signal.
+        """
+        with self.__lock:
+            self.__cancelled = True
+            process = self.process
+        if process is None or process.poll() is not None:
+            return
+        try:
+            os.killpg(process.pid, sig)
+        except OSError:
+            pass
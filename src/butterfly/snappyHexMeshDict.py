@@ -4,7 +4,7 @@ from collections import OrderedDict
 import re
 
 from .foamfile import FoamFile, foam_file_from_file
-from .utilities import get_snappyHexMesh_geometry_feild, \
+from .utilities import get_snappyHexMesh_geometry_feild, get_stl_region_ids, \
     get_snappyHexMesh_refinement_surfaces, get_snappyHexMesh_surface_layers
 from .refinementRegion import refinement_mode_from_dict
 
@@ -302,13 +302,79 @@ class SnappyHexMeshDict(FoamFile):
         mode = c_mesh_control['refinementRegions'][refinementRegion_name]
         return refinement_mode_from_dict(mode)
 
-    def set_geometry(self):
-        """Set geometry from bf_geometries."""
+    def set_geometry(self, stl_format='ascii'):
+        """Set geometry from bf_geometries.
+
+        Args:
+            stl_format: Format of geometry .stl file. ascii or binary
+                (default: ascii).
+        """
         _geoField = get_snappyHexMesh_geometry_feild(self.project_name,
                                                      self.geometries,
-                                                     meshing_type='triSurfaceMesh')
+                                                     meshing_type='triSurfaceMesh',
+                                                     stl_format=stl_format)
         self.values['geometry'].update(_geoField)
 
+    def stl_regions(self, file_name):
+        """Regions of an stl geometry or None.
+
+        Args:
+            file_name: Stl file name without .stl.
+        """
+        try:
+            geometry = self.values['geometry']['{}.stl'.format(file_name)]
+        except (KeyError, TypeError):
+            return None
+        return geometry.get('regions') if isinstance(geometry, dict) else None
+
+    def set_stl_regions(self, file_name, geometries, stl_format='ascii'):
+        """Set regions of a multi-region stl geometry.
+
+        Regions of binary stl files are named patch0, patch1, ... and are
+        renamed to geometry names in snappyHexMeshDict. Regions of ascii stl
+        files are named after the geometries and only regions which were
+        written for a binary file are renamed back. Other regions and values
+        of the current regions are kept. Nothing is changed if the stl file is
+        not in snappyHexMeshDict geometry.
+
+        Args:
+            file_name: Stl file name without .stl.
+            geometries: Butterfly geometries in the stl file.
+            stl_format: Format of .stl file. ascii or binary (default: ascii).
+
+        Returns:
+            True if regions are changed.
+        """
+        try:
+            geometry = self.values['geometry']['{}.stl'.format(file_name)]
+        except (KeyError, TypeError):
+            return False
+        if not isinstance(geometry, dict):
+            return False
+
+        current = geometry.get('regions') or OrderedDict()
+        regions = OrderedDict(current)
+        for name, index in get_stl_region_ids(geometries).items():
+            ascii_region, binary_region = name, 'patch{}'.format(index)
+            if stl_format == 'ascii':
+                region, other = ascii_region, binary_region
+            else:
+                region, other = binary_region, ascii_region
+
+            if region in regions:
+                continue
+            elif other in regions:
+                # rename the region and keep its values in the same place
+                regions = OrderedDict(
+                    (region if k == other else k, v) for k, v in regions.items())
+            elif stl_format != 'ascii':
+                regions[region] = {'name': name}
+
+        if list(regions.items()) == list(current.items()):
+            return False
+        geometry['regions'] = regions
+        return True
+
     def set_refinement_surfaces(self):
         """Set refinement values for geometries."""
         _ref = get_snappyHexMesh_refinement_surfaces(self.project_name,
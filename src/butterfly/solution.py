@@ -2,10 +2,11 @@
 """Butterfly Solution."""
 from copy import deepcopy
 from collections import namedtuple, OrderedDict
+import math
 import os
 
-from .utilities import tail, load_skipped_probes
-from .parser import CppDictParser
+from .utilities import load_skipped_probes
+from .parser import CppDictParser, ResidualParser
 
 
 class Solution(object):
@@ -44,6 +45,7 @@ class Solution(object):
         self.__process = None
         self.__log_files = None
         self.__errFiles = None
+        self.__residual_parser = None
 
     @property
     def project_name(self):
@@ -172,41 +174,34 @@ class Solution(object):
 
     def __get_info(self):
         i = namedtuple('Info', 'timestep residualValues')
-        # get end of the log file
         if not os.path.isfile(self.residual_file):
-            return i(0, self.__residualValues.values())
-
-        text = tail(self.residual_file).split("\nTime =")[-1].split('\n')
-        # get timestep
-        try:
-            t = int(text[0])
-        except ValueError:
-            t = 0
-
-        # read residual values
-        for line in text:
+            return i(0, list(self.__residualValues.values()))
+
+        # only the new lines of the log are parsed on each call
+        parser = self.__residual_parser
+        if parser is None or parser.filepath != self.residual_file:
+            parser = ResidualParser(self.residual_file, parse=False)
+            self.__residual_parser = parser
+        parser.parse()
+        if not len(parser):
+            return i(0, list(self.__residualValues.values()))
+
+        # read residual values for the latest time step
+        initial_residuals = parser.initial_residuals
+        for q in self.__residualValues:
             try:
-                # quantity, Initial residual, Final residual, No Iterations
-                q, ir, fr, ni = line.split(':  Solving for ')[1].split(',')
-                # use final residual
-                if q in self.__residualValues:
-                    self.__residualValues[q] = ir.split('= ')[-1]
-            except IndexError:
-                pass
+                value = initial_residuals[q][-1]
+            except KeyError:
+                continue
+            if not math.isnan(value):
+                self.__residualValues[q] = float(value)
 
-        return i(t, self.__residualValues.values())
+        t = float(parser.timestep)
+        t = int(t) if t.is_integer() else t
+        return i(t, list(self.__residualValues.values()))
 
     def __get_latestTime(self):
-        # get end of the log file
-        if not os.path.isfile(self.residual_file):
-            return 0
-        text = tail(self.residual_file).split("\nTime =")[-1].split('\n')
-        # get timestep
-        try:
-            t = int(text[0])
-        except ValueError:
-            t = 0
-        return t
+        return self.__get_info().timestep
 
     def update_from_recipe(self, recipe):
         """Update solution from recipe inputs.
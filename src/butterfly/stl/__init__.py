@@ -1,7 +1,11 @@
 
+import io
+import os
+import struct
+
 from .ascii import *
 from .binary import *
-from .types import Solid, Facet, Vector3d
+from .types import Solid, ArraySolid, Facet, Vector3d
 
 
 def read_ascii_file(file):
@@ -34,17 +38,50 @@ def read_ascii_string(data):
     """Read geometry from a :py:class:`str` containing data in the STL *ASCII* format.
 
     This is just a wrapper around :py:func:`read_ascii_file` that first wraps
-    the provided string in a :py:class:`StringIO.StringIO` object.
+    the provided string in a :py:class:`io.BytesIO` object.
     """
-    from StringIO import StringIO
-    return read_ascii_file(StringIO(data))
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return read_ascii_file(io.BytesIO(data))
 
 
 def read_binary_string(data):
     """Read geometry from a :py:class:`str` containing data in the STL *binary* format.
 
     This is just a wrapper around :py:func:`read_binary_file` that first wraps
-    the provided string in a :py:class:`StringIO.StringIO` object.
+    the provided string in a :py:class:`io.BytesIO` object.
+    """
+    return read_binary_file(io.BytesIO(data))
+
+
+def is_binary_file(filepath):
+    """Check if an STL file is in the *binary* format.
+
+    Binary files are detected by their size which must match the number of
+    facets in the header. ASCII files start with ``solid`` but so do some
+    binary files.
+    """
+    size = os.path.getsize(filepath)
+    if size < 84:
+        return False
+    with open(filepath, 'rb') as f:
+        header = f.read(84)
+    count = struct.unpack('<I', header[80:84])[0]
+    if size == 84 + 50 * count:
+        return True
+    return not header.lstrip().lower().startswith(b'solid')
+
+
+def read_file(filepath):
+    """Read all the solids in an STL file.
+
+    The format (ASCII or binary) is detected from the file. Regions of binary
+    files are separate solids (see :py:func:`stl.binary.parse_all`).
+
+    Returns:
+        A tuple of :py:class:`stl.ArraySolid` objects.
     """
-    from StringIO import StringIO
-    return read_binary_file(StringIO(data))
+    with open(filepath, 'rb') as f:
+        if is_binary_file(filepath):
+            return binary.parse_all(f)
+        return ascii.parse_all(f)
@@ -1,236 +1,118 @@
-from .types import Solid, Vector3d, Facet
+import re
 
-
-class KeywordToken(str):
-    pass
+from .types import Solid, Vector3d, Facet, ArraySolid
 
 
-class NumberToken(float):
+class SyntaxError(ValueError):
     pass
 
 
-def _token_type_name(token_type):
-    none_type = type(None)
-    if token_type is none_type:
-        return 'end of file'
-    elif token_type is KeywordToken:
-        return 'keyword'
-    elif token_type is NumberToken:
-        return 'number'
-    else:
-        return 'unknown'
-
-
-class Scanner(object):
-
-    def __init__(self, file):
-        self.file = file
-        self.peeked = None
-        self.peeked_byte = None
-        self.peeked_col = 0
-        self.peeked_row = 1
-
-    def peek_byte(self):
-        if self.peeked_byte is None:
-            self.peeked_byte = self.file.read(1)
-            if self.peeked_byte == '\n':
-                self.peeked_row += 1
-                self.peeked_col = 0
-            else:
-                self.peeked_col += 1
-
-        return self.peeked_byte
-
-    def get_byte(self):
-        byte = self.peek_byte()
-        self.peeked_byte = None
-        return byte
-
-    def peek_token(self):
-        while self.peeked is None:
-            b = self.peek_byte()
-            self.token_start_row = self.peeked_row
-            self.token_start_col = self.peeked_col
-
-            if b == '':
-                return None
-            elif b.isalpha() or b == '_':
-                self.peeked = self._read_keyword()
-            elif b.isdigit() or b == '.' or b == '-':
-                self.peeked = self._read_number()
-            elif b.isspace():
-                # Just skip over spaces
-                self.get_byte()
-                continue
-            else:
-                raise SyntaxError(
-                    "Invalid character %r at line %i, column %i" % (
-                        b, self.peeked_row, self.peeked_col
-                    )
-                )
+_solid_start = re.compile(br'(?:^|\s)solid(?:[ \t]+([^\r\n]*))?\r?\n', re.I)
+_solid_end = re.compile(br'(?:^|\s)endsolid(?:[ \t]+([^\r\n]*))?(?:\r?\n|$)', re.I)
+# keywords are removed before numbers are decoded. Order matters.
+_keywords = (b'endfacet', b'endloop', b'facet', b'normal', b'outer', b'loop',
+             b'vertex')
 
-        return self.peeked
-
-    def get_token(self):
-        token = self.peek_token()
-        self.peeked = None
-        return token
-
-    def require_token(self, token_type, required_value=None):
-        token = self.get_token()
-        if isinstance(token, token_type):
-            if required_value is None or token == required_value:
-                return token
-            else:
-                got_token_type = _token_type_name(type(token))
-                expected_token_type = _token_type_name(token_type)
-                raise SyntaxError(
-                    "Expected %s %r but got %s %r at line %i, column %i" % (
-                        expected_token_type,
-                        required_value,
-                        got_token_type,
-                        token,
-                        self.token_start_row,
-                        self.token_start_col,
-                    )
-                )
-        else:
-            got_token_type = _token_type_name(type(token))
-            expected_token_type = _token_type_name(token_type)
-            raise SyntaxError(
-                "Expected %s but got %s at line %i, column %i" % (
-                    expected_token_type,
-                    got_token_type,
-                    self.token_start_row,
-                    self.token_start_col,
-                )
-            )
 
-    def _read_keyword(self):
-        ret_bytes = []
-        start_row = self.peeked_row
-        start_col = self.peeked_col
-        while True:
-            b = self.peek_byte()
-            if b.isalpha() or b == '_' or b.isdigit():
-                ret_bytes.append(self.get_byte())
-            else:
-                break
+def parse(file):
+    """Parse the first solid in an ascii STL file to :py:class:`stl.ArraySolid`."""
+    for solid in iter_solids(file):
+        return solid
+    raise SyntaxError("Failed to find a solid in the file")
 
-        ret = KeywordToken(''.join(ret_bytes))
 
-        ret.start_row = start_row
-        ret.start_col = start_col
+def parse_all(file):
+    """Parse all the solids in an ascii STL file."""
+    return tuple(iter_solids(file))
 
-        return ret
 
-    def _read_number(self):
-        ret_bytes = []
-        start_row = self.peeked_row
-        start_col = self.peeked_col
-        while True:
-            b = self.peek_byte()
-            if b.isdigit() or b in ('.', '+', '-', 'e', 'E'):
-                ret_bytes.append(self.get_byte())
-            else:
-                break
-
-        try:
-            ret = NumberToken(''.join(ret_bytes))
-        except ValueError:
-            raise SyntaxError(
-                "Invalid float number at line %i, column %i" % (
-                    start_row, start_col,
-                )
-            )
+def iter_solids(file, chunk_size=1 << 24):
+    """Yield :py:class:`stl.ArraySolid` objects from an ascii STL file.
 
-        ret.start_row = start_row
-        ret.start_col = start_col
+    The file is read in chunks of ``chunk_size`` bytes. Each chunk is cut after
+    the last complete facet and decoded with a single ``numpy.fromstring``
+    call.
+    """
+    import numpy as np
 
-        return ret
+    def read():
+        data = file.read(chunk_size)
+        if not isinstance(data, bytes):
+            data = data.encode('utf-8')
+        return data
 
+    buf = read()
+    eof = not buf
+    while True:
+        # find the start of the next solid
+        match = _solid_start.search(buf)
+        while not match and not eof:
+            data = read()
+            eof = not data
+            buf += data
+            match = _solid_start.search(buf)
+        if not match:
+            if buf.strip():
+                raise SyntaxError(
+                    "Expected solid but got %r" % buf.strip()[:20])
+            return
 
-class SyntaxError(ValueError):
-    pass
-
-
-def parse(file):
-    scanner = Scanner(file)
-
-    scanner.require_token(KeywordToken, "solid")
-    name = str(scanner.require_token(KeywordToken))
-
-    ret = Solid(name=name)
-
-    def parse_facet():
-        scanner.require_token(KeywordToken, "facet")
-        scanner.require_token(KeywordToken, "normal")
-        normal_x = scanner.require_token(NumberToken)
-        normal_y = scanner.require_token(NumberToken)
-        normal_z = scanner.require_token(NumberToken)
-        normal = Vector3d(
-            x=normal_x,
-            y=normal_y,
-            z=normal_z,
-        )
-
-        scanner.require_token(KeywordToken, "outer")
-        scanner.require_token(KeywordToken, "loop")
-        vertices = []
-        for i in xrange(0, 3):
-            scanner.require_token(KeywordToken, "vertex")
-            vertex_x = scanner.require_token(NumberToken)
-            vertex_y = scanner.require_token(NumberToken)
-            vertex_z = scanner.require_token(NumberToken)
-            vertices.append(
-                Vector3d(
-                    x=vertex_x,
-                    y=vertex_y,
-                    z=vertex_z,
+        name = (match.group(1) or b'').decode('utf-8', 'replace').strip()
+        buf = buf[match.end():]
+        parts = []
+        while True:
+            end = _solid_end.search(buf)
+            if end and (end.group(0).endswith(b'\n') or eof):
+                parts.append(_decode_facets(buf[:end.start()]))
+                end_name = (end.group(1) or b'').decode('utf-8', 'replace').strip()
+                buf = buf[end.end():]
+                break
+            if eof:
+                raise SyntaxError("Solid %r is not closed with endsolid" % name)
+            # decode the complete facets and keep the rest for the next chunk
+            cut = buf.rfind(b'endfacet')
+            if cut != -1:
+                cut += 8
+                parts.append(_decode_facets(buf[:cut]))
+                buf = buf[cut:]
+            data = read()
+            eof = not data
+            buf += data
+
+        if name and end_name and name.split()[0] != end_name.split()[0]:
+            raise SyntaxError(
+                "Solid started named %r but ended named %r" % (
+                    name, end_name,
                 )
             )
 
-        ret = Facet(
-            normal=normal,
-            vertices=vertices,
+        values = np.concatenate(parts) if len(parts) > 1 else parts[0]
+        yield ArraySolid(
+            name=name.split()[0] if name else name,
+            triangles=values[:, 3:].reshape(-1, 3, 3),
+            normals=values[:, :3],
         )
 
-        scanner.require_token(KeywordToken, "endloop")
-        scanner.require_token(KeywordToken, "endfacet")
 
-        return ret
+def _decode_facets(text):
+    """Decode facets to a (n, 12) array of normal and vertices."""
+    import numpy as np
 
-    while True:
-        token = scanner.peek_token()
-        token_type = type(token)
-
-        if token_type is KeywordToken and token == 'endsolid':
-            break
-        elif token_type is KeywordToken and token == 'facet':
-            facet = parse_facet()
-            ret.facets.append(facet)
-        else:
-            got_token_type = _token_type_name(token_type)
-            # expected_token_type = _token_type_name(token_type)
-            raise SyntaxError(
-                "Unexpected %s %r at line %i, column %i" % (
-                    got_token_type,
-                    token,
-                    token.start_row,
-                    token.start_col,
-                )
-            )
-
-    scanner.require_token(KeywordToken, "endsolid")
-    end_name = str(scanner.require_token(KeywordToken))
-    if name != end_name:
+    text = text.lower()
+    count = text.count(b'endfacet')
+    for keyword in _keywords:
+        text = text.replace(keyword, b' ')
+    try:
+        values = np.fromstring(text, dtype=np.float64, sep=' ')
+    except ValueError:
+        raise SyntaxError("Invalid facet in %r" % text.strip()[:40])
+    if values.size != count * 12:
         raise SyntaxError(
-            "Solid started named %r but ended named %r" % (
-                name, end_name,
+            "Expected %d numbers for %d facets but found %d" % (
+                count * 12, count, values.size,
             )
         )
-
-    return ret
+    return values.reshape(count, 12)
 
 
 def write(solid, file):
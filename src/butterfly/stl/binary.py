@@ -1,5 +1,6 @@
+import re
 import struct
-from .types import Vector3d, Solid
+from .types import Vector3d, Solid, ArraySolid
 
 
 class Reader(object):
@@ -39,45 +40,94 @@ class Reader(object):
 
     def read_header(self):
         bytes = self.read_bytes(80)
-        return struct.unpack('80s', bytes)[0].strip('\0')
+        return struct.unpack('80s', bytes)[0].strip(b'\0')
 
 
 class FormatError(ValueError):
     pass
 
 
-def parse(file):
-    r = Reader(file)
+def facet_dtype():
+    """numpy structured dtype for a facet in a binary STL file (50 bytes)."""
+    import numpy as np
+    return np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)),
+                     ('attributes', '<u2')])
+
+
+def solid_name(header):
+    """Get a solid name from the 80 bytes header of a binary STL file.
+
+    The header is free text. Leading ``solid`` (or ``binary stl`` which
+    butterfly writes) is removed and characters other than letters, numbers
+    and underscore are replaced with underscore.
+    """
+    name = header.strip(b'\0').decode('ascii', 'replace').strip()
+    for prefix in ('solid', 'binary stl'):
+        if name.lower().startswith(prefix):
+            name = name[len(prefix):]
+            break
+    return re.sub(r'\W+', '_', name.strip()).strip('_')
+
 
-    name = r.read_header()[6:]
+def _read_facets(file):
+    """Read the header and the facets of a binary STL file.
 
-    ret = Solid(name=name)
+    Returns:
+        A tuple of (name, facets). facets is a numpy structured array.
+    """
+    import numpy as np
 
-    num_facets = r.read_uint32()
+    header = file.read(84)
+    if len(header) < 84:
+        raise FormatError(
+            "Unexpected end of file at offset %i" % len(header))
 
-    for i in xrange(0, num_facets):
-        normal = r.read_vector3d()
-        vertices = tuple(
-            r.read_vector3d() for j in xrange(0, 3)
-        )
+    num_facets = struct.unpack('<I', header[80:])[0]
+    dtype = facet_dtype()
+    data = file.read(num_facets * dtype.itemsize)
+    if len(data) < num_facets * dtype.itemsize:
+        raise FormatError(
+            "Unexpected end of file at offset %i" % (84 + len(data)))
 
-        attr_byte_count = r.read_uint16()
-        if attr_byte_count > 0:
-            # The attribute bytes are not standardized, but some software
-            # encodes additional information here. We return the raw bytes
-            # to allow the caller to potentially do something with them if
-            # the format for a particular file is known.
-            attr_bytes = r.read_bytes(attr_byte_count)
-        else:
-            attr_bytes = None
+    return solid_name(header[:80]), np.frombuffer(data, dtype, num_facets)
 
-        ret.add_facet(
-            normal=normal,
-            vertices=vertices,
-            attributes=attr_bytes,
-        )
 
-    return ret
+def _solid(name, facets):
+    import numpy as np
+
+    return ArraySolid(
+        name=name,
+        triangles=facets['vertices'].astype(np.float32),
+        normals=facets['normal'].astype(np.float32),
+        attributes=facets['attributes'].astype(np.uint16),
+    )
+
+
+def parse(file):
+    """Parse a binary STL file to a single :py:class:`stl.ArraySolid`.
+
+    The facets are decoded at once with ``numpy.frombuffer``.
+    """
+    return _solid(*_read_facets(file))
+
+
+def parse_all(file):
+    """Parse a binary STL file to one :py:class:`stl.ArraySolid` per region.
+
+    Binary STL files have no solid names. Like OpenFOAM the facets are
+    grouped by their attribute and the regions are named patch0, patch1, ...
+    after the attribute. A file with a single region is named after the
+    header.
+    """
+    import numpy as np
+
+    name, facets = _read_facets(file)
+    attributes, first = np.unique(facets['attributes'], return_index=True)
+    if len(attributes) < 2:
+        return (_solid(name, facets),)
+    return tuple(
+        _solid('patch%d' % attribute, facets[facets['attributes'] == attribute])
+        for attribute in attributes[np.argsort(first)])
 
 
 def write(solid, file):
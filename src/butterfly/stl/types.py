@@ -30,11 +30,7 @@ class Solid(object):
     @property
     def surface_area(self):
         """The sum of the areas of all facets in the object."""
-        return reduce(
-            lambda accum, facet: accum + facet.area,
-            self.facets,
-            0.0,
-        )
+        return sum(facet.area for facet in self.facets)
 
     @property
     def vertices(self):
@@ -47,7 +43,7 @@ class Solid(object):
         ``file`` must be a file-like object (supporting a ``write`` method),
         to which the data will be written.
         """
-        from stl.binary import write
+        from .binary import write
         write(self, file)
 
     def write_ascii(self, file):
@@ -56,7 +52,7 @@ class Solid(object):
         ``file`` must be a file-like object (supporting a ``write`` method),
         to which the data will be written.
         """
-        from stl.ascii import write
+        from .ascii import write
         write(self, file)
 
     def __eq__(self, other):
@@ -82,6 +78,173 @@ class Solid(object):
         )
 
 
+class ArraySolid(Solid):
+    """A solid object backed by numpy arrays.
+
+    This is what :py:mod:`stl.binary` and :py:mod:`stl.ascii` parsers return.
+    Facets are stored as arrays and :py:class:`stl.Facet` objects are only
+    created when :py:attr:`facets` is iterated.
+    """
+
+    def __init__(self, name=None, triangles=None, normals=None, attributes=None):
+        """Init ArraySolid.
+
+        Args:
+            name: Solid name.
+            triangles: A (n, 3, 3) array of vertices for each facet.
+            normals: A (n, 3) array of facet normals.
+            attributes: A (n,) uint16 array of attribute byte counts from binary
+                STL files. Some software encodes colors here.
+        """
+        import numpy as np
+
+        self.name = name
+        if triangles is None:
+            triangles = np.zeros((0, 3, 3))
+        self.triangles = np.asarray(triangles).reshape(-1, 3, 3)
+        if normals is None:
+            normals = np.zeros((len(self.triangles), 3), self.triangles.dtype)
+        self.facet_normals = np.asarray(normals).reshape(-1, 3)
+        if attributes is None:
+            attributes = np.zeros(len(self.triangles), np.uint16)
+        self.attributes = np.asarray(attributes)
+
+        assert len(self.facet_normals) == len(self.triangles) == \
+            len(self.attributes), 'Length of triangles and normals must match.'
+
+    @property
+    def facets(self):
+        """A lazy sequence of :py:class:`stl.Facet` objects."""
+        return _FacetSequence(self)
+
+    @facets.setter
+    def facets(self, value):
+        raise AttributeError(
+            'facets of ArraySolid are read-only. Use add_facet instead.')
+
+    def add_facet(self, normal, vertices, attributes=None):
+        """Append a new facet to the object.
+
+        Takes the same arguments as the :py:class:`stl.Facet` type and
+        attributes as the attribute byte count. This copies the arrays. Create
+        a new ArraySolid to add many facets.
+        """
+        import numpy as np
+
+        self.triangles = np.concatenate(
+            (self.triangles, np.array([vertices], self.triangles.dtype)))
+        self.facet_normals = np.concatenate(
+            (self.facet_normals, np.array([normal], self.facet_normals.dtype)))
+        self.attributes = np.append(self.attributes,
+                                    np.uint16(attributes or 0))
+
+    def __len__(self):
+        return len(self.triangles)
+
+    @property
+    def normals(self):
+        """Get facet normals."""
+        return tuple(Vector3d(*n) for n in self.facet_normals.tolist())
+
+    @property
+    def surface_area(self):
+        """The sum of the areas of all facets in the object."""
+        import numpy as np
+
+        t = self.triangles.astype(np.float64)
+        n = np.cross(t[:, 1] - t[:, 0], t[:, 2] - t[:, 0])
+        return float(0.5 * np.sqrt((n * n).sum(axis=1)).sum())
+
+    @property
+    def vertices(self):
+        """Unique vertices for all facets."""
+        return tuple(Vector3d(*v) for v in self.weld()[0].tolist())
+
+    def weld(self, tolerance=None):
+        """Merge duplicate vertices.
+
+        Args:
+            tolerance: Optional distance to snap vertices to before merging. By
+                default only identical vertices are merged.
+
+        Returns:
+            A tuple of (vertices, face_indices). vertices is a (m, 3) array of
+            unique vertices in the order of their first appearance and
+            face_indices is a (n, 3) int32 array of indices to vertices.
+        """
+        import numpy as np
+
+        points = self.triangles.reshape(-1, 3)
+        if tolerance:
+            keys = np.round(points / float(tolerance)).astype(np.int64)
+        else:
+            # + 0 turns -0.0 to 0.0 so they are merged
+            keys = points + points.dtype.type(0)
+
+        if not len(keys):
+            return points.copy(), np.zeros((0, 3), np.int32)
+
+        # sort vertices and mark the start of each group of equal vertices.
+        # lexsort is stable so the first item in a group is the first
+        # appearance of the vertex.
+        order = np.lexsort((keys[:, 2], keys[:, 1], keys[:, 0]))
+        sorted_keys = keys[order]
+        new = np.empty(len(keys), dtype=bool)
+        new[0] = True
+        np.any(sorted_keys[1:] != sorted_keys[:-1], axis=1, out=new[1:])
+        first = order[new]
+
+        # number unique vertices by their first appearance
+        rank = np.empty(len(first), dtype=np.int32)
+        rank[np.argsort(first)] = np.arange(len(first), dtype=np.int32)
+        inverse = np.empty(len(keys), dtype=np.int32)
+        inverse[order] = rank[np.cumsum(new) - 1]
+
+        vertices = points[np.sort(first)]
+        indices = inverse.reshape(-1, 3)
+        return vertices, indices
+
+    def __eq__(self, other):
+        if isinstance(other, ArraySolid):
+            import numpy as np
+            return self.name == other.name and \
+                np.array_equal(self.triangles, other.triangles) and \
+                np.array_equal(self.facet_normals, other.facet_normals)
+        return Solid.__eq__(self, other)
+
+    def __repr__(self):
+        return '<stl.types.ArraySolid name=%r, facets=%d>' % (
+            self.name,
+            len(self),
+        )
+
+
+class _FacetSequence(object):
+    """Read-only sequence of Facets which are created on demand."""
+
+    def __init__(self, solid):
+        self._solid = solid
+
+    def __len__(self):
+        return len(self._solid.triangles)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('facet index out of range')
+        return Facet(self._solid.facet_normals[index].tolist(),
+                     self._solid.triangles[index].tolist())
+
+    def __iter__(self):
+        solid = self._solid
+        for normal, vertices in zip(solid.facet_normals.tolist(),
+                                    solid.triangles.tolist()):
+            yield Facet(normal, vertices)
+
+
 class Facet(object):
     """A facet (triangle) from a :py:class:`stl.Solid`."""
 
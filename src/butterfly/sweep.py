@@ -0,0 +1,527 @@
+# coding=utf-8
+"""Run a Reynolds number sweep on copies of a meshed case.
+
+Each Reynolds number runs in its own copy of the case. Mesh files are reflinked
+or hard linked to the original case so the mesh is never copied. Copies run
+concurrently with a configurable number of cores for each run and the results
+are collected to forces_<turbulence>_<faces>/Re_<n>.dat and
+residuals_<turbulence>_<faces>/Re_<n>.dat.
+
+With warm_start a few runs start from the uniform fields in 0 and every other
+run starts from the latest solution of its nearest finished Reynolds number. Clones share the
+same mesh so the fields are copied directly and rescaled for the new inlet
+velocity.
+
+    Usage:
+
+        case = Case.from_folder('suzanne_simple_case')
+        case.working_dir = '.'
+        sweep = ReynoldsSweep(case, range(1000, 9000, 1000),
+                              hydraulic_diameter=4 * 0.02562 / 0.804201,
+                              cores_per_run=2)
+        results = sweep.run()
+"""
+import math
+import os
+import shutil
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .case import Case
+from .convergence import ConvergenceMonitor
+from .decomposeParDict import DecomposeParDict
+from .polymesh import mesh_size
+from .foamarray import read_file, read_header, read_list_size
+from .meshcache import clone_case_folder
+from .volfield import read_dimensions, scale_field
+
+InletConditions = namedtuple('InletConditions', 'U k epsilon omega')
+SweepResult = namedtuple(
+    'SweepResult', 'Re success error case forces residuals converged seed')
+
+
+def inlet_conditions(Re, hydraulic_diameter, nu=1e-05, intensity=0.05,
+                     length_scale=0.07, cmu=0.09):
+    """Calculate inlet velocity and turbulence values for a Reynolds number.
+
+    U = Re * nu / D
+    k = 1.5 * (U * I) ^ 2
+    epsilon = cmu ^ 0.75 * k ^ 1.5 / (length_scale * D)
+    omega = epsilon / (cmu * k)
+
+    Args:
+        Re: Reynolds number.
+        hydraulic_diameter: Hydraulic diameter (D) in meters.
+        nu: Kinematic viscosity (default: 1e-05).
+        intensity: Turbulence intensity (default: 0.05).
+        length_scale: Turbulent length scale as a ratio of hydraulic diameter
+            (default: 0.07).
+        cmu: Turbulence model constant (default: 0.09).
+
+    Returns:
+        A namedtuple of (U, k, epsilon, omega).
+    """
+    u = float(Re) * nu / hydraulic_diameter
+    k = 1.5 * (u * intensity) ** 2
+    epsilon = cmu ** 0.75 * k ** 1.5 / (length_scale * hydraulic_diameter)
+    omega = epsilon / (cmu * k) if k else 0.0
+    return InletConditions(u, k, epsilon, omega)
+
+
+def latest_time_folder(folder):
+    """Get the latest time folder of a case or None if there is no result."""
+    times = []
+    for name in os.listdir(folder):
+        try:
+            value = float(name)
+        except ValueError:
+            continue
+        if value > 0 and os.path.isdir(os.path.join(folder, name)):
+            times.append((value, name))
+    return os.path.join(folder, max(times)[1]) if times else None
+
+
+def seed_fields(source, destination, velocity_ratio):
+    """Copy the latest solution of a case to 0 folder of another case.
+
+    Both cases must have the same mesh. Fields are rescaled for the ratio of
+    inlet velocities. With a fixed length scale a quantity with dimensions
+    [length^a time^b] scales with velocity^-b (e.g. U, omega, nut and phi with
+    velocity, p and k with velocity^2 and epsilon with velocity^3).
+
+    Args:
+        source: Path to the case folder with the solution.
+        destination: Path to the case folder to seed.
+        velocity_ratio: New inlet velocity / inlet velocity of source.
+
+    Returns:
+        Path to the time folder which was copied or None if source has no
+        results.
+    """
+    folder = latest_time_folder(source)
+    if not folder:
+        return None
+
+    target = os.path.join(destination, '0')
+    for name in os.listdir(folder):
+        filepath = os.path.join(folder, name)
+        if not os.path.isfile(filepath):
+            # e.g. uniform folder with time information
+            continue
+        try:
+            exponent = -read_dimensions(filepath)[2]
+        except (ValueError, AssertionError):
+            # not a field
+            continue
+        field = name[:-3] if name.endswith('.gz') else name
+        for f in (field, field + '.gz'):
+            if os.path.isfile(os.path.join(target, f)):
+                os.remove(os.path.join(target, f))
+        scale_field(filepath, velocity_ratio ** exponent,
+                    os.path.join(target, field))
+    return folder
+
+
+def warm_start_order(reynolds_numbers, cold_starts=None):
+    """Order Reynolds numbers for a warm started sweep.
+
+    A few Reynolds numbers start from the uniform fields. They are spread
+    evenly over log(Re). Every other Reynolds number starts from its neighbour
+    towards the closest cold start so each run is seeded from the closest
+    possible solution.
+
+    Args:
+        reynolds_numbers: A list of Reynolds numbers larger than 0.
+        cold_starts: Number of runs to start from the uniform fields. By
+            default one for each decade of Reynolds numbers.
+
+    Returns:
+        A list of (Re, parent) in the order that the runs can start. parent is
+        None for cold starts.
+    """
+    values = sorted(set(reynolds_numbers))
+    if not values:
+        return []
+    logs = [math.log(float(Re)) for Re in values]
+    span = logs[-1] - logs[0]
+    if cold_starts is None:
+        cold_starts = int(math.ceil(span / math.log(10)))
+    count = min(max(1, cold_starts), len(values))
+
+    cold = []
+    for i in range(count):
+        target = logs[0] + (i + 0.5) * span / count
+        index = min(range(len(values)), key=lambda c: abs(logs[c] - target))
+        if index not in cold:
+            cold.append(index)
+
+    # distance to the closest cold start decreases towards the parent
+    depth, parents = {}, {}
+    for index in range(len(values)):
+        _, start = min((abs(logs[index] - logs[c]), c) for c in cold)
+        if start == index:
+            parents[index] = None
+        else:
+            parents[index] = index - 1 if start < index else index + 1
+        depth[index] = abs(start - index)
+
+    order = sorted(range(len(values)), key=lambda c: (depth[c], logs[c]))
+    return [(values[c], None if parents[c] is None else values[parents[c]])
+            for c in order]
+
+
+class ReynoldsSweep(object):
+    """Run a case for several Reynolds numbers concurrently.
+
+    Args:
+        case: A butterfly Case with a mesh in case.project_dir.
+        reynolds_numbers: A list of Reynolds numbers.
+        hydraulic_diameter: Hydraulic diameter in meters.
+        nu: Kinematic viscosity. By default the value is read from
+            transportProperties.
+        intensity: Turbulence intensity at inlet (default: 0.05).
+        inlet: Name of inlet patch (default: inlet).
+        flow_direction: Flow direction as (x, y, z). By default the direction
+            of the current inlet velocity is used.
+        cores_per_run: Number of cores for each run (default: 1).
+        max_runs: Maximum number of concurrent runs. By default as many runs
+            as available cores / cores_per_run.
+        sweep_folder: Folder for case clones (default: <project_dir>_sweep).
+        results_folder: Folder for collected results
+            (default: <project_dir>/Results).
+        forces_function: Name of forceCoeffs function (default: forces).
+        residuals_function: Name of residuals function (default: residuals).
+        convergence: Optional list of convergence criteria (e.g.
+            [convergence.ForceVariance('Cd', 100, 1e-3)]). Runs are stopped
+            with stopAt writeNow once all the criteria are met.
+        check_interval: Seconds between convergence checks (default: 5).
+        warm_start: Start each run from the latest solution of the nearest
+            finished Reynolds number (default: False). Only runs which
+            converged are used if convergence criteria are set.
+        cold_starts: Number of runs which start from the uniform fields with
+            warm_start. By default one for each decade of Reynolds numbers.
+            The other runs wait for a neighbouring solution even if there are
+            free cores.
+    """
+
+    def __init__(self, case, reynolds_numbers, hydraulic_diameter, nu=None,
+                 intensity=0.05, inlet='inlet', flow_direction=None,
+                 cores_per_run=1, max_runs=None, sweep_folder=None,
+                 results_folder=None, forces_function='forces',
+                 residuals_function='residuals', convergence=None,
+                 check_interval=5, warm_start=False,
+                 cold_starts=None):
+        """Init sweep."""
+        assert hasattr(case, 'isCase'), '{} is not a Butterfly.Case'.format(case)
+        assert os.path.isdir(case.polyMesh_folder), \
+            'Failed to find mesh in {}. Mesh the case first.'.format(
+                case.polyMesh_folder)
+        self.case = case
+        self.reynolds_numbers = tuple(reynolds_numbers)
+        self.hydraulic_diameter = float(hydraulic_diameter)
+        self.nu = float(nu) if nu is not None else self.__read_nu()
+        self.intensity = intensity
+        self.inlet = inlet
+        self.flow_direction = flow_direction or self.__read_flow_direction()
+        self.cores_per_run = max(1, int(cores_per_run))
+        self.max_runs = max_runs or \
+            max(1, (os.cpu_count() or 1) // self.cores_per_run)
+        self.sweep_folder = sweep_folder or case.project_dir + '_sweep'
+        self.results_folder = results_folder or \
+            os.path.join(case.project_dir, 'Results')
+        self.forces_function = forces_function
+        self.residuals_function = residuals_function
+        self.convergence = tuple(convergence or ())
+        self.check_interval = check_interval
+        self.warm_start = warm_start
+        self.cold_starts = cold_starts
+
+    @property
+    def turbulence(self):
+        """Turbulence name for results folders (e.g. laminar, kEpsilon)."""
+        values = self.case.turbulenceProperties.values
+        if values.get('simulationType', 'laminar') == 'laminar':
+            return 'laminar'
+        model = values.get('RAS', {}).get('RASModel') or \
+            values.get('RAS', {}).get('model', '')
+        if model == 'laminar':
+            return 'laminar'
+        for name in ('kEpsilon', 'kOmega'):
+            if name in model:
+                return name
+        return model
+
+    @property
+    def faces(self):
+        """Number of mesh faces for results folders."""
+        folder = self.case.polyMesh_folder
+        n_faces = mesh_size(os.path.join(folder, 'owner')).get('nFaces')
+        if n_faces is None:
+            buf = read_file(os.path.join(folder, 'faces'))
+            _, start = read_header(buf)
+            n_faces = read_list_size(buf, start)
+        return n_faces
+
+    @property
+    def forces_folder(self):
+        """Folder for collected forceCoeffs."""
+        return os.path.join(self.results_folder, 'forces_{}_{}'.format(
+            self.turbulence, self.faces))
+
+    @property
+    def residuals_folder(self):
+        """Folder for collected residuals."""
+        return os.path.join(self.results_folder, 'residuals_{}_{}'.format(
+            self.turbulence, self.faces))
+
+    def inlet_conditions(self, Re):
+        """Inlet U, k, epsilon and omega for a Reynolds number."""
+        return inlet_conditions(Re, self.hydraulic_diameter, self.nu,
+                                self.intensity)
+
+    def prepare(self, Re, seed=None):
+        """Clone the case and set the inlet conditions for a Reynolds number.
+
+        Args:
+            Re: Reynolds number.
+            seed: Optional Reynolds number of a finished run in sweep folder.
+                The latest solution of the run is used as initial fields.
+
+        Returns:
+            A butterfly Case for the clone.
+        """
+        folder = os.path.join(self.sweep_folder, 'Re_{}'.format(Re))
+        clone_case_folder(self.case.project_dir, folder)
+
+        case = Case.from_folder(folder)
+        case.working_dir = self.sweep_folder
+        values = self.inlet_conditions(Re)
+        velocity = tuple(values.U * d for d in self.flow_direction)
+
+        u = case.get_foam_file_by_name('U')
+        u.values['boundaryField'][self.inlet]['value'] = \
+            'uniform ({} {} {})'.format(*velocity)
+        changed = [u]
+        for name in ('k', 'epsilon', 'omega'):
+            ff = case.get_foam_file_by_name(name)
+            if ff is None:
+                continue
+            value = 'uniform {}'.format(getattr(values, name))
+            ff.values['internalField'] = value
+            for patch, bc in ff.values['boundaryField'].items():
+                if not isinstance(bc, dict):
+                    continue
+                # inlet and wall functions
+                if patch == self.inlet or 'value' in bc and \
+                        bc.get('type', '').endswith('WallFunction'):
+                    bc['value'] = value
+            changed.append(ff)
+
+        # reference velocity for force coefficients
+        functions = case.controlDict.values.get('functions') or {}
+        for func in functions.values():
+            if isinstance(func, dict) and 'magUInf' in func:
+                func['magUInf'] = str(values.U)
+                changed.append(case.controlDict)
+                break
+
+        if self.cores_per_run > 1:
+            case.decomposeParDict = DecomposeParDict.scotch(self.cores_per_run)
+            changed.append(case.decomposeParDict)
+
+        for ff in changed:
+            ff.save(case.project_dir)
+
+        if seed is not None:
+            source = os.path.join(self.sweep_folder, 'Re_{}'.format(seed))
+            seed_fields(source, folder, float(Re) / seed)
+
+        return case
+
+    def run_one(self, Re, seed=None):
+        """Run the case for a Reynolds number and collect the results.
+
+        Args:
+            Re: Reynolds number.
+            seed: Optional Reynolds number of a finished run to start from.
+        """
+        try:
+            case = self.prepare(Re, seed)
+        except Exception as e:
+            return SweepResult(Re, False, str(e), None, None, None, None, seed)
+
+        if self.cores_per_run > 1:
+            decomposeParDict = case.decomposeParDict
+            if self.max_runs > 1:
+                # let the operating system place concurrent mpi runs
+                case.runmanager.mpi_args = ('--bind-to', 'none')
+        else:
+            decomposeParDict = None
+
+        application = case.controlDict.application
+        converged = None
+        try:
+            if self.convergence:
+                log = case.command(application, None, decomposeParDict,
+                                   run=True, wait=False)
+                monitor = ConvergenceMonitor(
+                    case.project_dir, self.convergence,
+                    logfile=[f for f in log.logfiles
+                             if os.path.basename(f) == application + '.log'][0],
+                    forces_function=self.forces_function)
+                converged = monitor.watch(log.process, self.check_interval)
+                log = case.check_command(application, log)
+            else:
+                log = case.command(application, None, decomposeParDict,
+                                   run=True, wait=True)
+        except Exception as e:
+            return SweepResult(Re, False, str(e), case, None, None, converged,
+                               seed)
+
+        forces, residuals = self.collect(case, Re)
+        return SweepResult(Re, log.success, log.error, case, forces, residuals,
+                           converged, seed)
+
+    def run(self, reynolds_numbers=None):
+        """Run all the Reynolds numbers and collect the results.
+
+        Args:
+            reynolds_numbers: Optional list of Reynolds numbers to run instead
+                of self.reynolds_numbers.
+
+        Returns:
+            A list of SweepResult as (Re, success, error, case, forces,
+            residuals, converged, seed) in the same order as Reynolds
+            numbers. forces and residuals are the paths to collected files or
+            None. converged is the latest ConvergenceStatus if convergence
+            criteria are set. seed is the Reynolds number of the solution
+            which was used as the initial fields.
+        """
+        reynolds_numbers = reynolds_numbers or self.reynolds_numbers
+        if not os.path.isdir(self.sweep_folder):
+            os.makedirs(self.sweep_folder)
+
+        with ThreadPoolExecutor(max_workers=self.max_runs) as executor:
+            if not self.warm_start:
+                return list(executor.map(self.run_one, reynolds_numbers))
+            results = self.__run_warm(executor, reynolds_numbers)
+        return [results[Re] for Re in reynolds_numbers]
+
+    def __run_warm(self, executor, reynolds_numbers):
+        """Run the Reynolds numbers from the nearest finished solution.
+
+        A few runs start from the uniform fields (see warm_start_order). Every
+        other run waits for its neighbour towards the closest cold start even
+        if there are free cores and starts from the closest solved Reynolds
+        number once the neighbour is finished.
+        """
+        pending = warm_start_order(reynolds_numbers, self.cold_starts)
+        running = {}
+        results = {}
+        solved = []
+        while pending or running:
+            for Re, parent in list(pending):
+                if len(running) == self.max_runs:
+                    break
+                if parent is not None and parent not in results:
+                    continue
+                seed = None
+                if solved:
+                    # closest ratio of Reynolds numbers
+                    seed = min(solved,
+                               key=lambda s: abs(math.log(float(Re) / s)))
+                pending.remove((Re, parent))
+                running[executor.submit(self.run_one, Re, seed)] = Re
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                del running[future]
+                result = future.result()
+                results[result.Re] = result
+                converged = result.converged.converged \
+                    if result.converged else True
+                if result.success and converged:
+                    solved.append(result.Re)
+        return results
+
+    def collect(self, case, Re):
+        """Copy forceCoeffs and residuals of a run to results folders.
+
+        Returns:
+            A tuple of paths to (forces, residuals) files. The path is None if
+            the file is not available.
+        """
+        forces = self.__collect(
+            case, self.forces_function, ('forceCoeffs.dat', 'coefficient.dat'),
+            self.forces_folder, Re)
+        residuals = self.__collect(
+            case, self.residuals_function, ('residuals.dat',),
+            self.residuals_folder, Re)
+        return forces, residuals
+
+    @staticmethod
+    def __collect(case, function, filenames, folder, Re):
+        """Join function outputs for all start times to folder/Re_<n>.dat."""
+        base = os.path.join(case.postProcessing_folder, function)
+        if not os.path.isdir(base):
+            return None
+
+        def key(name):
+            try:
+                return float(name)
+            except ValueError:
+                return float('inf')
+
+        sources = []
+        for time in sorted(os.listdir(base), key=key):
+            for f in filenames:
+                fp = os.path.join(base, time, f)
+                if os.path.isfile(fp):
+                    sources.append(fp)
+                    break
+        if not sources:
+            return None
+
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        target = os.path.join(folder, 'Re_{}.dat'.format(Re))
+        with open(target, 'wb') as outf:
+            for count, fp in enumerate(sources):
+                with open(fp, 'rb') as inf:
+                    if count == 0:
+                        shutil.copyfileobj(inf, outf)
+                    else:
+                        # restarts. skip the header
+                        outf.writelines(l for l in inf if not l.startswith(b'#'))
+        return target
+
+    def __read_nu(self):
+        """Read nu from transportProperties."""
+        try:
+            nu = self.case.transportProperties.values['nu']
+        except (AttributeError, KeyError):
+            raise ValueError('Failed to find nu in transportProperties. '
+                             'Use nu input to set the value.')
+        return float(nu.split()[-1])
+
+    def __read_flow_direction(self):
+        """Read flow direction from inlet velocity."""
+        try:
+            value = self.case.U.values['boundaryField'][self.inlet]['value']
+            vector = [float(v) for v in
+                      value.replace('uniform', '').strip(' ()').split()]
+        except (AttributeError, KeyError, ValueError):
+            vector = (0, 0, 0)
+        length = sum(v ** 2 for v in vector) ** 0.5
+        assert length > 0, 'Failed to find flow direction from inlet ' \
+            'velocity. Use flow_direction input to set the direction.'
+        return tuple(v / length for v in vector)
+
+    def ToString(self):
+        """Overwrite .NET ToString method."""
+        return self.__repr__()
+
+    def __repr__(self):
+        """Sweep representation."""
+        return 'ReynoldsSweep::{}::{} runs'.format(
+            self.case.project_name, len(self.reynolds_numbers))
@@ -1,10 +1,14 @@
 # coding=utf-8
 """Collection of useful methods."""
 from __future__ import print_function
+import hashlib
 import os
 import sys
+import uuid
 import collections
 from collections import OrderedDict, namedtuple
+from contextlib import contextmanager
+from copy import copy, deepcopy
 from subprocess import Popen, PIPE
 import gzip
 
@@ -13,6 +17,7 @@ def list_files(folder, fullpath=False):
     """list files in a folder."""
     if not os.path.isdir(folder):
         yield None
+        return
 
     for f in os.listdir(folder):
         if os.path.isfile(os.path.join(folder, f)):
@@ -35,6 +40,104 @@ def load_case_files(folder, fullpath=False):
     return Files(*files)
 
 
+_immutable = (str, bytes, int, float, bool, type(None))
+
+
+def copy_values(values, memo=None):
+    """Copy nested dictionaries of values.
+
+    Dictionaries and lists are copied and strings, numbers and tuples of them
+    are shared which is much faster than deepcopy for parsed dictionaries.
+    Other values are deep copied.
+
+    Args:
+        values: Values to copy.
+        memo: Optional deepcopy memo dictionary. Use it from __deepcopy__ to
+            keep shared dictionaries shared in the copy.
+    """
+    if isinstance(values, _immutable):
+        return values
+    if memo is not None and id(values) in memo:
+        return memo[id(values)]
+    if isinstance(values, dict):
+        copied = values.copy() if type(values) in (dict, OrderedDict) \
+            else copy(values)
+        if memo is not None:
+            memo[id(values)] = copied
+        for key, value in copied.items():
+            if not isinstance(value, _immutable):
+                copied[key] = copy_values(value, memo)
+        return copied
+    if isinstance(values, list):
+        copied = []
+        if memo is not None:
+            memo[id(values)] = copied
+        copied.extend(copy_values(v, memo) for v in values)
+        return copied
+    if type(values) is tuple:
+        copied = tuple(copy_values(v, memo) for v in values)
+        return values if all(a is b for a, b in zip(copied, values)) \
+            else copied
+    return deepcopy(values, memo)
+
+
+def copy_object(obj, memo=None):
+    """Copy an object by copying its attributes with copy_values.
+
+    Use it to implement __deepcopy__ for classes which keep their data in
+    dictionaries and strings.
+    """
+    memo = {} if memo is None else memo
+    copied = obj.__class__.__new__(obj.__class__)
+    memo[id(obj)] = copied
+    copied.__dict__.update(copy_values(obj.__dict__, memo))
+    return copied
+
+
+def equal_values(a, b):
+    """Check if two nested dictionaries of values are equal.
+
+    numpy arrays are equal if they have the same shape and values.
+    """
+    if hasattr(a, 'ndim') or hasattr(b, 'ndim'):
+        return hasattr(a, 'ndim') and hasattr(b, 'ndim') and \
+            a.shape == b.shape and bool((a == b).all())
+    if isinstance(a, dict) and isinstance(b, dict):
+        return len(a) == len(b) and \
+            all(k in b and equal_values(v, b[k]) for k, v in a.items())
+    if isinstance(a, (list, tuple)) and isinstance(b, (list, tuple)):
+        return type(a) == type(b) and len(a) == len(b) and \
+            all(equal_values(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def fingerprint(values):
+    """A fingerprint of nested dictionaries of values to find changes.
+
+    Strings and numbers are shared and writable numpy arrays are replaced by
+    their dtype, shape and a hash of their data so the fingerprint doesn't
+    need a copy of the values. Read-only arrays (e.g. memory-mapped files)
+    can't change and are kept as they are. Compare fingerprints with
+    equal_values.
+    """
+    if isinstance(values, _immutable):
+        return values
+    if hasattr(values, 'ndim') and not values.dtype.hasobject:
+        if not values.flags.writeable:
+            return values
+        import numpy as np
+        return ('array', values.dtype.str, values.shape,
+                hashlib.sha1(np.ascontiguousarray(values).data).digest())
+    if isinstance(values, dict):
+        return ('dict',) + tuple((k, fingerprint(v)) for k, v in values.items())
+    if isinstance(values, (list, tuple)):
+        return (type(values).__name__,) + tuple(fingerprint(v) for v in values)
+    if hasattr(values, 'write_foam') and hasattr(values, 'kind'):
+        # fields.NonuniformList
+        return ('nonuniform', values.kind, fingerprint(values.values))
+    return deepcopy(values)
+
+
 def mkdir(directory, overwrite=True):
     """Make a directory.
 
@@ -63,6 +166,29 @@ def write_to_file(full_path, content):
     return full_path
 
 
+@contextmanager
+def atomic_write(full_path, mode='wb'):
+    """Open a temporary file and move it over full_path once it is written.
+
+    Readers (e.g. a running solver) never see a partially written file and a
+    hard linked file is replaced instead of being modified for all the links.
+
+    Usage:
+
+        with atomic_write(filepath, 'wt') as outf:
+            outf.write(content)
+    """
+    temp = '{}.{}.tmp'.format(full_path, uuid.uuid4().hex[:8])
+    try:
+        with open(temp, mode) as outf:
+            yield outf
+        os.replace(temp, full_path)
+    except BaseException:
+        if os.path.exists(temp):
+            os.remove(temp)
+        raise
+
+
 def run_batch_file(filepath, wait=True):
     """run an executable .bat file.
 
@@ -178,7 +304,7 @@ def update_dict(d, u):
 
 def get_snappyHexMesh_geometry_feild(project_name, bf_geometries,
                                      meshing_type='triSurfaceMesh',
-                                     stl_file=None):
+                                     stl_file=None, stl_format='ascii'):
     """Get data for Geometry as a dictionary.
 
     Args:
@@ -186,6 +312,7 @@ def get_snappyHexMesh_geometry_feild(project_name, bf_geometries,
         bf_geometries: List of Butterfly geometries.
         meshing_type: Meshing type. (Default: triSurfaceMesh)
         stl_file: Name of .stl file if it is different from project_name.stl
+        stl_format: Format of .stl file. ascii or binary (default: ascii).
 
     Returns:
         A dictionary of data that can be passed to snappyHexMeshDict.
@@ -194,14 +321,41 @@ def get_snappyHexMesh_geometry_feild(project_name, bf_geometries,
     _geo = {stl_file: OrderedDict()}
     _geo[stl_file]['type'] = meshing_type
     _geo[stl_file]['name'] = project_name
-    _geo[stl_file]['regions'] = {}
-    for bfgeo in bf_geometries:
-        if bfgeo.name not in _geo[stl_file]['regions']:
-            _geo[stl_file]['regions'][bfgeo.name] = {'name': bfgeo.name}
+    _geo[stl_file]['regions'] = get_stl_regions(bf_geometries, stl_format)
 
     return _geo
 
 
+def get_stl_region_ids(bf_geometries):
+    """Get region index for each unique geometry name in a multi-region stl.
+
+    Returns:
+        An OrderedDict of geometry name: region index.
+    """
+    ids = OrderedDict()
+    for bfgeo in bf_geometries:
+        if bfgeo.name not in ids:
+            ids[bfgeo.name] = len(ids)
+    return ids
+
+
+def get_stl_regions(bf_geometries, stl_format='ascii'):
+    """Get regions of a multi-region stl file for snappyHexMeshDict.
+
+    In ascii stl files regions are named after solids. Binary stl files have
+    no solid names and OpenFOAM names the regions patch0, patch1, ... by
+    facet attribute. In both cases the region is renamed to geometry name.
+
+    Returns:
+        A dictionary of region name: {'name': geometry name}.
+    """
+    regions = OrderedDict()
+    for name, index in get_stl_region_ids(bf_geometries).items():
+        region = name if stl_format == 'ascii' else 'patch{}'.format(index)
+        regions[region] = {'name': name}
+    return regions
+
+
 def get_snappyHexMesh_refinement_surfaces(
         project_name, bf_geometries, global_levels=None):
     """Get data for MeshRefinementSurfaces as a dictionary.
@@ -247,26 +401,46 @@ def get_snappyHexMesh_surface_layers(bf_geometries):
     return _ref
 
 
-def get_boundary_field_from_geometries(bf_geometries, field='U'):
-    """Get data for boundaryField as a dictionary.
+def get_boundary_conditions_from_geometries(bf_geometries):
+    """Get boundary conditions of geometries by geometry name.
+
+    Only the first geometry with each name is used. Bounding box geometries are
+    not included.
 
     Args:
         bf_geometries: List of Butterfly geometries.
-        parameter: One of the fileds as a string (U , p, k , epsilon, omega, nut)
 
     Returns:
-        A dictionary of data that can be passed to snappyHexMeshDict.
+        A dictionary of boundary conditions by geometry name.
     """
-    _bou = {}
+    _bcs = OrderedDict()
     for bfgeo in bf_geometries:
-        if bfgeo.name not in _bou:
-            if hasattr(bfgeo.boundary_condition, 'isBoundingBoxBoundaryCondition'):
+        name = bfgeo.name
+        if name not in _bcs:
+            _bc = bfgeo.boundary_condition
+            if hasattr(_bc, 'isBoundingBoxBoundaryCondition'):
                 # bounding box for meshing. should not be included in files
                 continue
-            _bc = getattr(bfgeo.boundary_condition, field)
-            _bou[bfgeo.name] = _bc.value_dict
+            _bcs[name] = _bc
+
+    return _bcs
+
+
+def get_boundary_field_from_geometries(bf_geometries, field='U'):
+    """Get data for boundaryField as a dictionary.
+
+    Args:
+        bf_geometries: List of Butterfly geometries or a dictionary of boundary
+            conditions from get_boundary_conditions_from_geometries.
+        parameter: One of the fileds as a string (U , p, k , epsilon, omega, nut)
 
-    return _bou
+    Returns:
+        A dictionary of data that can be passed to snappyHexMeshDict.
+    """
+    if not isinstance(bf_geometries, dict):
+        bf_geometries = get_boundary_conditions_from_geometries(bf_geometries)
+    return {name: getattr(_bc, field).value_dict
+            for name, _bc in bf_geometries.items()}
 
 
 def load_skipped_probes(log_file):
@@ -375,75 +549,40 @@ def load_probes_and_values_from_sample_file(fp):
 
 
 def load_of_points_file(path_to_file):
-    """Return points as a generator of tuples."""
-    assert os.path.isfile(path_to_file), \
-        'Failed to find points file at {}'.format(path_to_file)
+    """Return points as a generator of tuples.
 
-    if path_to_file.endswith('.gz'):
-        pfile = gzip.open(path_to_file, 'rb')
-    else:
-        pfile = open(path_to_file, 'rb')
+    Use butterfly.polymesh.load_points to get the points as a numpy array.
+    """
+    from .polymesh import load_points
 
-    try:
-        for l in pfile:
-            if l.strip().startswith('(') and l.strip().endswith(')'):
-                yield eval(','.join(l.split()))
-    finally:
-        pfile.close()
+    for pt in load_points(path_to_file).tolist():
+        yield tuple(pt)
 
 
 def load_of_faces_file(path_to_file, inner_mesh=True):
-    """Return faces indecies as a generator of tuples."""
-    assert os.path.isfile(path_to_file), \
-        'Failed to find faces file: {}'.format(path_to_file)
+    """Return faces indecies as a generator of tuples.
 
-    if path_to_file.endswith('.gz'):
-        ffile = gzip.open(path_to_file, 'rb')
-    else:
-        ffile = open(path_to_file, 'rb')
+    Use butterfly.polymesh.load_faces to get the faces as numpy arrays.
+    """
+    from .polymesh import load_faces
+
+    indices, offsets = load_faces(path_to_file)
+    indices, offsets = indices.tolist(), offsets.tolist()
 
     if not inner_mesh:
         p, f = os.path.split(path_to_file)
         fins = load_of_boundary_file(os.path.join(p, f.replace('faces', 'boundary')))
-        try:
-            fin = -1
-            for l in ffile:
-                tl = l.strip()
-                try:
-                    if tl[1] == '(' and tl.endswith(')'):
-                        fin += 1  # add to face number
-                        if fin in fins:
-                            yield eval(','.join(tl[1:].split()))
-                except IndexError:
-                    continue
-        finally:
-            ffile.close()
+        for fin in sorted(fins):
+            yield tuple(indices[offsets[fin]:offsets[fin + 1]])
     else:
-        try:
-            for l in ffile:
-                tl = l.strip()
-                try:
-                    if tl[1] == '(' and tl.endswith(')'):
-                        yield eval(','.join(tl[1:].split()))
-                except IndexError:
-                    continue
-        finally:
-            ffile.close()
+        for st, en in zip(offsets[:-1], offsets[1:]):
+            yield tuple(indices[st:en])
 
 
 def load_of_boundary_file(path_to_file):
     """Return Face indecies for boundary faces as a set."""
-    assert os.path.isfile(path_to_file), \
-        'Failed to find boundary file: {}'.format(path_to_file)
-
-    ind = []
-    with open(path_to_file, 'rb') as bf:
-        for line in bf:
-            line = line.strip()
-            if line.startswith('nFaces'):
-                count = int(line.split()[-1][:-1])
-                nl = next(bf)
-                st = int(nl.split()[-1][:-1])
-                ind.append(xrange(st, st + count))
-
-    return {i for rng in ind for i in rng}
+    from .polymesh import load_boundary
+
+    return {i for patch in load_boundary(path_to_file).values()
+            for i in range(patch['startFace'],
+                           patch['startFace'] + patch['nFaces'])}
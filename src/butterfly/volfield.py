@@ -0,0 +1,227 @@
+"""Read OpenFOAM volume fields (e.g. 0/U, 1000/p) to numpy arrays.
+
+Fields can be ascii or binary (writeFormat) and gzipped (writeCompression).
+For uncompressed binary files the arrays are read-only views over the
+memory-mapped file and no data is copied. scale_field multiplies all the
+values of a field file in its own format (e.g. to rescale a solution for a new
+inlet velocity).
+
+    Usage:
+
+        u = load_field('c:/ladybug/case/1000/U')
+        print(u.internal_field.shape)  # (n_cells, 3)
+        print(u.boundary_field['monkey']['value'])
+"""
+import io
+import os
+import re
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+
+from .foamarray import COMPONENTS, read_file, read_header, is_binary, dtypes, \
+    read_list, write_list
+from .fields import NonuniformList
+from .parser import CppDictParser
+
+FieldValues = namedtuple(
+    'FieldValues',
+    'name field_class dimensions internal_field boundary_field')
+
+_nonuniform = re.compile(br'nonuniform\s+List<(\w+)>')
+_placeholder = re.compile(r'nonuniform __list(\d+)__$')
+_uniform = re.compile(br'\buniform(\s+)(\([^()]*\)|[-+]?[0-9.]+(?:[eE][-+]?\d+)?)')
+_dimensions = re.compile(br'dimensions\s+\[([^\]]*)\]')
+_number = re.compile(br'[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+
+def read_values(filepath, copy=False):
+    """Read all the values of a field file.
+
+    Nonuniform lists are read to numpy arrays before the rest of the file is
+    parsed and are returned as fields.NonuniformList.
+
+    Args:
+        filepath: Path to field file (e.g. case/1000/U). filepath + '.gz' will
+            be used if filepath doesn't exist.
+        copy: Set to True to copy binary data to new arrays instead of
+            returning read-only views over the memory-mapped file
+            (default: False).
+
+    Returns:
+        Values as a dictionary. FoamFile header is under FoamFile.
+    """
+    buf = read_file(filepath)
+    header, start = read_header(buf)
+    binary = is_binary(header)
+    label, scalar = dtypes(header)
+
+    # read the lists first and replace them with placeholders. binary data may
+    # include any characters and can't be parsed as text.
+    pieces = []
+    arrays = []
+    pos = start
+    while True:
+        match = _nonuniform.search(buf, pos)
+        if not match:
+            break
+        kind = match.group(1).decode('ascii')
+        try:
+            width = COMPONENTS[kind]
+        except KeyError:
+            raise ValueError('Unsupported list type: List<{}>.'.format(kind))
+        values, end = read_list(buf, match.end(),
+                                label if kind == 'label' else scalar,
+                                width, binary, copy)
+        pieces.append(buf[pos:match.start()])
+        pieces.append('nonuniform __list{}__'.format(len(arrays)).encode())
+        arrays.append(NonuniformList(values, kind))
+        pos = end
+    pieces.append(buf[pos:])
+
+    text = b''.join(pieces).decode('utf-8', 'replace')
+    values = OrderedDict()
+    values['FoamFile'] = header
+    values.update(_replace_placeholders(CppDictParser(text).values, arrays))
+    return values
+
+
+def load_field(filepath, copy=False):
+    """Load an OpenFOAM volume field.
+
+    Args:
+        filepath: Path to field file (e.g. case/1000/U). filepath + '.gz' will
+            be used if filepath doesn't exist.
+        copy: Set to True to copy binary data to new arrays instead of
+            returning views over the memory-mapped file (default: False).
+
+    Returns:
+        A namedtuple of (name, field_class, dimensions, internal_field,
+        boundary_field). internal_field is a (n_cells,) array for scalars and
+        a (n_cells, n_components) array for vectors and tensors. Uniform values
+        are returned as a single value array (e.g. array([0., 0., 0.])).
+        boundary_field is an OrderedDict of patch name: patch values where
+        uniform and nonuniform values (e.g. value, gradient) are arrays.
+    """
+    values = read_values(filepath, copy)
+    header = values['FoamFile']
+
+    boundary_field = OrderedDict()
+    for name, patch in values.get('boundaryField', {}).items():
+        if isinstance(patch, dict):
+            patch = OrderedDict((k, _to_array(v)) for k, v in patch.items())
+        boundary_field[name] = patch
+
+    return FieldValues(
+        header.get('object', ''),
+        header.get('class', ''),
+        values.get('dimensions', ''),
+        _to_array(values.get('internalField', '')),
+        boundary_field)
+
+
+def load_internal_field(filepath, copy=False):
+    """Load internalField of an OpenFOAM volume field as a numpy array."""
+    return load_field(filepath, copy).internal_field
+
+
+def read_dimensions(filepath):
+    """Read dimensions of a field as a list of 7 exponents.
+
+    [mass, length, time, temperature, quantity, current, luminous intensity]
+    """
+    buf = read_file(filepath)
+    match = _dimensions.search(buf)
+    if not match:
+        raise ValueError('Failed to find dimensions in {}.'.format(filepath))
+    return [float(v) for v in match.group(1).split()]
+
+
+def scale_field(filepath, factor, destination=None):
+    """Multiply all uniform and nonuniform values of a field file.
+
+    internalField and all the patch values (e.g. value, inletValue) are
+    scaled. The file is written in the same format as the original file
+    (ascii or binary) but uncompressed.
+
+    Args:
+        filepath: Path to field file (e.g. case/1000/U).
+        factor: Scale factor.
+        destination: Path to the new file (default: filepath).
+    """
+    compressed = not os.path.isfile(filepath)
+    buf = read_file(filepath)
+    header, start = read_header(buf)
+    binary = is_binary(header)
+    label, scalar = dtypes(header)
+
+    def scale_uniform(match):
+        return b'uniform' + match.group(1) + _number.sub(
+            lambda m: repr(float(m.group(0)) * factor).encode(),
+            match.group(2))
+
+    pieces = [buf[:start]]
+    pos = start
+    while True:
+        match = _nonuniform.search(buf, pos)
+        end = match.end() if match else len(buf)
+        pieces.append(_uniform.sub(scale_uniform, buf[pos:end]))
+        if not match:
+            break
+        kind = match.group(1).decode('ascii')
+        width = COMPONENTS.get(kind)
+        if kind == 'label' or width is None:
+            pos = end
+            continue
+        values, pos = read_list(buf, end, scalar, width, binary, copy=True)
+        pieces.append(_list_bytes(values * factor, scalar, binary))
+
+    data = b''.join(pieces)
+    if hasattr(buf, 'close'):
+        # release the memory-mapped file before it's overwritten
+        buf.close()
+
+    destination = destination or filepath
+    with open(destination, 'wb') as f:
+        f.write(data)
+    if compressed and destination == filepath:
+        # the original file was read from filepath.gz
+        os.remove(filepath + '.gz')
+
+
+def _list_bytes(values, dtype, binary):
+    """Write values as an OpenFOAM list after List<type>."""
+    f = io.BytesIO()
+    write_list(f, values, dtype, binary)
+    return f.getvalue()
+
+
+def _replace_placeholders(values, arrays):
+    """Replace list placeholders in parsed values with the lists."""
+    for key, value in values.items():
+        if isinstance(value, dict):
+            _replace_placeholders(value, arrays)
+        elif isinstance(value, str):
+            match = _placeholder.match(value)
+            if match:
+                values[key] = arrays[int(match.group(1))]
+    return values
+
+
+def _to_array(value):
+    """Convert uniform and nonuniform values to numpy arrays.
+
+    Other values are returned as they are.
+    """
+    if isinstance(value, NonuniformList):
+        return value.values
+    if not isinstance(value, str):
+        return value
+    if value.startswith('uniform'):
+        try:
+            return np.array(value[7:].replace('(', ' ').replace(')', ' ')
+                            .split(), dtype=np.float64).squeeze()
+        except ValueError:
+            # uniform $internalField
+            return value
+    return value
@@ -376,17 +376,19 @@ class WindTunnel(object):
         """Return a BF case for this wind tunnel."""
         return Case.from_wind_tunnel(self, make2d_parameters)
 
-    def save(self, overwrite=False, minimum=True, make2d_parameters=None):
+    def save(self, overwrite=False, minimum=True, make2d_parameters=None,
+             stl_format='ascii'):
         """Save wind_tunnel to folder as an OpenFOAM case.
 
         Args:
             overwrite: If True all the current content will be overwritten
                 (default: False).
+            stl_format: Format of stl files. ascii or binary (default: ascii).
         Returns:
             A butterfly.Case.
         """
         _case = self.to_openfoam_case(make2d_parameters)
-        _case.save(overwrite, minimum)
+        _case.save(overwrite, minimum, stl_format)
         return _case
 
     def ToString(self):
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""Downsample line traces on the server before they are sent to the browser.
+
+A graph can't show more than a couple of points per pixel. Long runs are
+reduced to the visible x range and then to a fixed number of points with
+either min/max per bucket, which keeps every spike of a residual history, or
+largest triangle three buckets (LTTB), which keeps the visual shape of smooth
+curves with fewer points.
+
+    Usage:
+
+        x, y = downsample(run['Time'].values, run['Cd'].values, 900,
+                          x_range=(100, 500))
+"""
+import numpy as np
+
+METHODS = ('minmax', 'lttb')
+
+
+def visible(x, x_range):
+    """Get the slice of sorted x values inside x_range.
+
+    One point on each side of the range is included so lines run to the edges
+    of the graph.
+    """
+    if not x_range:
+        return slice(0, len(x))
+    start = max(np.searchsorted(x, min(x_range), side='left') - 1, 0)
+    stop = min(np.searchsorted(x, max(x_range), side='right') + 1, len(x))
+    return slice(start, stop)
+
+
+def minmax(x, y, n):
+    """Downsample to the minimum and maximum of n / 2 buckets.
+
+    Args:
+        x: Sorted x values.
+        y: y values.
+        n: Maximum number of points.
+
+    Returns:
+        Indices of the points to keep.
+    """
+    count = len(y)
+    if count <= n or n < 4:
+        return np.arange(count)
+
+    size = -(-count // (n // 2))  # ceil
+    buckets = -(-count // size)
+    padded = np.full(buckets * size, np.nan)
+    padded[:count] = y
+    padded = padded.reshape(buckets, size)
+    nan = np.isnan(padded)
+    low = np.where(nan, np.inf, padded).argmin(axis=1)
+    high = np.where(nan, -np.inf, padded).argmax(axis=1)
+
+    offset = np.arange(buckets) * size
+    indices = np.sort(np.stack((low + offset, high + offset), axis=1), axis=1)
+    indices = np.unique(np.concatenate(([0], indices.ravel(), [count - 1])))
+    return indices[indices < count]
+
+
+def lttb(x, y, n):
+    """Downsample with largest triangle three buckets.
+
+    Args:
+        x: Sorted x values.
+        y: y values without NaN.
+        n: Maximum number of points.
+
+    Returns:
+        Indices of the points to keep.
+    """
+    count = len(y)
+    if count <= n or n < 3:
+        return np.arange(count)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # first and last points are always kept and the rest is split into n - 2
+    # buckets
+    edges = np.linspace(1, count - 1, n - 1).astype(np.int64)
+    indices = np.empty(n, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = count - 1
+    a = 0
+    for i in range(n - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_start, next_stop = stop, edges[i + 2] if i + 2 < n - 1 else count
+        # average of the next bucket
+        cx = x[next_start:next_stop].mean()
+        cy = y[next_start:next_stop].mean()
+        area = np.abs((x[a] - cx) * (y[start:stop] - y[a]) -
+                      (x[a] - x[start:stop]) * (cy - y[a]))
+        a = start + int(area.argmax())
+        indices[i + 1] = a
+    return indices
+
+
+def downsample(x, y, n, x_range=None, method='minmax'):
+    """Downsample a line trace to at most about n points.
+
+    Args:
+        x: Sorted x values (e.g. Time).
+        y: y values.
+        n: Maximum number of points (e.g. two points per pixel of graph width).
+        x_range: Optional (x0, x1) visible range of the graph (e.g. from
+            relayoutData).
+        method: minmax or lttb (default: minmax).
+
+    Returns:
+        (x, y) as numpy arrays.
+    """
+    assert method in METHODS, \
+        'Invalid method: {}. Valid methods are {}.'.format(method, METHODS)
+    x = np.asarray(x)
+    y = np.asarray(y)
+    window = visible(x, x_range)
+    x, y = x[window], y[window]
+    indices = minmax(x, y, n) if method == 'minmax' else lttb(x, y, n)
+    return x[indices], y[indices]
+
+
+def relayout_range(relayoutData, axis='xaxis'):
+    """Get (x0, x1) from relayoutData of a graph.
+
+    Returns None if the graph is not zoomed in.
+    """
+    if not relayoutData or relayoutData.get(axis + '.autorange'):
+        return None
+    try:
+        return (float(relayoutData[axis + '.range[0]']),
+                float(relayoutData[axis + '.range[1]']))
+    except KeyError:
+        pass
+    try:
+        x0, x1 = relayoutData[axis + '.range']
+        return float(x0), float(x1)
+    except (KeyError, TypeError, ValueError):
+        return None
@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""Follow forces and residuals of running cases.
+
+Function objects of running solvers append rows to
+postProcessing/<function>/<startTime>/forceCoeffs.dat and residuals.dat.
+butterfly's FunctionObjectParser only reads the bytes which were appended
+since the last read and LiveRun collects the new rows of all start times (e.g.
+after a restart) of a case so the report can send them to the browser as
+extend-only updates.
+
+    Usage:
+
+        run = LiveRun('suzanne_simple_case/sweep/Re_2000')
+        run.poll()
+        print(run.forces.column('Cd'))
+"""
+import glob
+import os
+import threading
+
+import numpy as np
+
+from butterfly.parser import FunctionObjectParser
+from resultstore import column_name
+
+FILES = {
+    'forces': ('forceCoeffs.dat', 'coefficient.dat'),
+    'residuals': ('residuals.dat',)
+}
+
+
+class LiveTable(object):
+    """Growable table of the rows which are read from a running case.
+
+    reloads is the number of times that the table was cleared to read the
+    rows again.
+    """
+
+    def __init__(self):
+        """Init an empty table."""
+        self.columns = []
+        self.reloads = 0
+        self.__data = np.zeros((0, 0))
+        self.__size = 0
+
+    def extend(self, columns, rows):
+        """Append rows. Rows are matched to the table columns by name."""
+        if not len(rows):
+            return
+        if not self.columns:
+            self.columns = list(columns)
+            self.__data = np.empty((max(1024, 2 * len(rows)), len(columns)))
+
+        if list(columns) != self.columns:
+            mapped = np.full((len(rows), len(self.columns)), np.nan)
+            for count, name in enumerate(columns):
+                if name in self.columns:
+                    mapped[:, self.columns.index(name)] = rows[:, count]
+            rows = mapped
+
+        size = self.__size + len(rows)
+        if size > len(self.__data):
+            data = np.empty((max(size, 2 * len(self.__data)), len(self.columns)))
+            data[:self.__size] = self.__data[:self.__size]
+            self.__data = data
+        self.__data[self.__size:size] = rows
+        self.__size = size
+
+    def clear(self):
+        """Remove all rows."""
+        self.columns = []
+        self.reloads += 1
+        self.__data = np.zeros((0, 0))
+        self.__size = 0
+
+    def column(self, name, start=0, stop=None):
+        """Get a copy of a column from start to stop row."""
+        if name not in self.columns:
+            return np.zeros(0)
+        stop = self.__size if stop is None else min(stop, self.__size)
+        return self.__data[start:stop, self.columns.index(name)].copy()
+
+    def __len__(self):
+        """Number of rows."""
+        return self.__size
+
+
+class LiveRun(object):
+    """Forces and residuals of a running case.
+
+    Args:
+        case_folder: Path to case folder.
+        forces_function: Name of forces function object (default: forces).
+        residuals_function: Name of residuals function object (default:
+            residuals).
+    """
+
+    def __init__(self, case_folder, forces_function='forces',
+                 residuals_function='residuals'):
+        """Init live run."""
+        self.case_folder = case_folder
+        self.name = os.path.basename(os.path.normpath(case_folder))
+        self.functions = {'forces': forces_function,
+                          'residuals': residuals_function}
+        self.forces = LiveTable()
+        self.residuals = LiveTable()
+        self.__parsers = {}
+        self.__lock = threading.Lock()
+
+    def files(self, kind):
+        """Result files of forces or residuals sorted by start time."""
+        folder = os.path.join(self.case_folder, 'postProcessing',
+                              self.functions[kind])
+        files = [f for name in FILES[kind]
+                 for f in glob.glob(os.path.join(folder, '*', name))]
+
+        def start_time(filepath):
+            try:
+                return float(os.path.basename(os.path.dirname(filepath)))
+            except ValueError:
+                return float('inf')
+
+        return sorted(files, key=start_time)
+
+    def poll(self):
+        """Read new rows of forces and residuals.
+
+        If a file is truncated or recreated the table is read again from all
+        files and the number of new rows is negative if the table is shorter
+        than before.
+
+        Returns:
+            Number of new rows for (forces, residuals).
+        """
+        with self.__lock:
+            count = []
+            for kind in ('forces', 'residuals'):
+                table = getattr(self, kind)
+                size = len(table)
+                # [parser, number of rows in table, reloads]
+                parsers, reload = [], False
+                for filepath in self.files(kind):
+                    if filepath not in self.__parsers:
+                        self.__parsers[filepath] = \
+                            [FunctionObjectParser(filepath, parse=False), 0, 0]
+                    item = self.__parsers[filepath]
+                    item[0].parse()
+                    reload = reload or item[0].reloads != item[2]
+                    parsers.append(item)
+
+                if reload:
+                    table.clear()
+                for item in parsers:
+                    parser = item[0]
+                    columns = [column_name(c) for c in parser.columns]
+                    table.extend(columns, parser.values[0 if reload else item[1]:])
+                    item[1:] = len(parser), parser.reloads
+                count.append(len(table) - size)
+            return tuple(count)
+
+    def __repr__(self):
+        """Live run representation."""
+        return 'LiveRun::{} ({} iterations)'.format(self.name, len(self.forces))
@@ -0,0 +1,412 @@
+# -*- coding: utf-8 -*-
+"""Columnar store for forces and residuals of the Reynolds number studies.
+
+The text results in data/forces_<case>_<faces>/Re_<Re>.dat and
+data/residuals_<case>_<faces>/Re_<Re>.dat are ingested once into a store
+folder with one .npy file per column and a manifest.json:
+
+    store/
+        manifest.json
+        forces/Time.npy, forces/Cd.npy, ...
+        residuals/Time.npy, residuals/p.npy, ...
+
+Rows of each run are contiguous and sorted by (case, faces, Re, Time). The
+manifest keeps the row range, the final values and the mtime and size of
+every source file so only new or changed files are parsed again on the next
+update. Columns are memory mapped on first access.
+
+RunCache loads single runs on demand and keeps the recently used ones within
+a memory budget.
+
+    Usage:
+
+        store = ResultStore('data')
+        store.update()
+        forces = store.frame('forces')
+        print(forces.loc[('laminar', 4011438, 100), 'Cd'].tail(1))
+
+        cache = RunCache(store, max_bytes=64 * 1024 ** 2)
+        print(cache.get('residuals', 'laminar', 4011438, 100).tail(1))
+
+Run this file to ingest data/ without starting the app.
+"""
+import json
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+KINDS = ('forces', 'residuals')
+INDEX = ('case', 'faces', 'Re')
+
+_folder = re.compile(r'^(forces|residuals)_(\w+)_(\d+)$')
+_result_file = re.compile(r'^Re_(\d+)\.dat$')
+
+
+def column_name(name):
+    """Convert a column name in the file header to a column name in the store.
+
+    e.g. Cl(f) -> Cl_f
+    """
+    return re.sub(r'\W', '_', name).strip('_')
+
+
+def read_result_file(filepath):
+    """Read forces or residuals .dat file to a DataFrame.
+
+    Column names are taken from the last commented header line which starts
+    with Time (e.g. # Time Cm Cd Cl Cl(f) Cl(r)). Commented lines are skipped
+    so files with several headers from restarted runs are read as one table.
+    Rows are sorted by Time.
+    """
+    names = None
+    with open(filepath) as f:
+        for line in f:
+            if not line.startswith('#'):
+                break
+            fields = line[1:].split()
+            if fields and fields[0] == 'Time':
+                names = [column_name(n) for n in fields]
+
+    if not names:
+        raise ValueError('Failed to find column names in {}.'.format(filepath))
+
+    table = pd.read_csv(filepath, sep=r'\s+', comment='#', header=None,
+                        names=names, index_col=False, dtype=np.float64)
+    return table.sort_values('Time', kind='stable', ignore_index=True)
+
+
+def find_result_files(data_folder):
+    """Find forces and residuals files in data folder.
+
+    Returns:
+        A dictionary of relative path: (kind, case, faces, Re).
+    """
+    files = {}
+    for folder in os.listdir(data_folder):
+        match = _folder.match(folder)
+        if not match or not os.path.isdir(os.path.join(data_folder, folder)):
+            continue
+        kind, case, faces = match.group(1), match.group(2), int(match.group(3))
+        for name in os.listdir(os.path.join(data_folder, folder)):
+            result = _result_file.match(name)
+            if result:
+                files['{}/{}'.format(folder, name)] = \
+                    (kind, case, faces, int(result.group(1)))
+    return files
+
+
+class ResultStore(object):
+    """Columnar store of forces and residuals files.
+
+    Args:
+        data_folder: Folder with forces_* and residuals_* folders.
+        store_folder: Folder to save the store (default: store next to
+            data_folder).
+    """
+
+    version = 1
+
+    def __init__(self, data_folder='data', store_folder=None):
+        """Open the store. Call update to ingest new results."""
+        self.data_folder = os.path.abspath(data_folder)
+        self.store_folder = os.path.abspath(store_folder) if store_folder else \
+            os.path.join(os.path.dirname(self.data_folder), 'store')
+        self.__manifest = self.__load_manifest()
+        self.__columns = {}
+
+    @property
+    def manifest_file(self):
+        """Full path to manifest.json."""
+        return os.path.join(self.store_folder, 'manifest.json')
+
+    @property
+    def cases(self):
+        """Sorted list of case names (e.g. kEpsilon, laminar)."""
+        return sorted(set(run['case'] for kind in KINDS
+                          for run in self.__manifest[kind]['files'].values()))
+
+    def columns(self, kind):
+        """List of columns for forces or residuals (e.g. Time, Cm, Cd)."""
+        return list(self.__manifest[kind]['columns'])
+
+    def runs(self, kind='forces'):
+        """Sorted list of (case, faces, Re) in store."""
+        return [(r['case'], r['faces'], r['Re'])
+                for r in self.__runs(kind)]
+
+    def update(self):
+        """Ingest new and modified files in data folder.
+
+        Returns:
+            List of relative paths for files that were parsed.
+        """
+        found = find_result_files(self.data_folder)
+        ingested = []
+        for kind in KINDS:
+            files = dict((path, key) for path, key in found.items()
+                         if key[0] == kind)
+            ingested.extend(self.__update(kind, files))
+        if ingested or self.__manifest['version'] != self.version:
+            self.__manifest['version'] = self.version
+            self.__write_manifest()
+        return ingested
+
+    def column(self, kind, name):
+        """Memory mapped column for forces or residuals."""
+        key = (kind, name)
+        if key not in self.__columns:
+            filepath = os.path.join(self.store_folder, kind, name + '.npy')
+            self.__columns[key] = np.load(filepath, mmap_mode='r')
+        return self.__columns[key]
+
+    def result_file(self, kind, case, faces, Re):
+        """Full path to the .dat file of a run in data folder."""
+        return os.path.join(self.data_folder, self.__path(kind, case, faces, Re))
+
+    def stamp(self, kind, case, faces, Re):
+        """(mtime, size) of the .dat file when the run was ingested.
+
+        Returns None if the run is not in store.
+        """
+        run = self.__manifest[kind]['files'].get(self.__path(kind, case, faces, Re))
+        return (run['mtime'], run['size']) if run else None
+
+    def load(self, kind, case, faces, Re):
+        """Load results of a single run as a DataFrame.
+
+        Raises:
+            KeyError if the run is not in store.
+        """
+        run = self.__manifest[kind]['files'][self.__path(kind, case, faces, Re)]
+        start, stop = run['start'], run['stop']
+        return pd.DataFrame(
+            dict((name, np.array(self.column(kind, name)[start:stop]))
+                 for name in self.columns(kind)),
+            columns=self.columns(kind))
+
+    def final(self, kind='forces'):
+        """Final values of each run as a DataFrame indexed by (case, faces, Re)."""
+        runs = self.__runs(kind)
+        index = pd.MultiIndex.from_tuples(
+            [(r['case'], r['faces'], r['Re']) for r in runs], names=INDEX)
+        return pd.DataFrame([r['final'] for r in runs], index=index,
+                            columns=self.columns(kind))
+
+    def frame(self, kind='forces'):
+        """All results as a DataFrame indexed by (case, faces, Re, Time)."""
+        runs = self.__runs(kind)
+        sizes = [r['stop'] - r['start'] for r in runs]
+        names = self.columns(kind)
+        index = pd.MultiIndex.from_arrays(
+            [np.repeat([r['case'] for r in runs], sizes),
+             np.repeat([r['faces'] for r in runs], sizes),
+             np.repeat([r['Re'] for r in runs], sizes),
+             np.array(self.column(kind, 'Time')) if runs else []],
+            names=INDEX + ('Time',))
+        return pd.DataFrame(
+            dict((name, np.array(self.column(kind, name)))
+                 for name in names[1:]),
+            index=index, columns=names[1:])
+
+    def __runs(self, kind):
+        return sorted(self.__manifest[kind]['files'].values(),
+                      key=lambda r: r['start'])
+
+    @staticmethod
+    def __path(kind, case, faces, Re):
+        return '{0}_{1}_{2}/Re_{3}.dat'.format(kind, case, faces, Re)
+
+    def __load_manifest(self):
+        try:
+            with open(self.manifest_file) as f:
+                manifest = json.load(f)
+        except (IOError, ValueError):
+            manifest = {'version': None}
+
+        if manifest['version'] != self.version:
+            # start a new store
+            manifest = {'version': None}
+        for kind in KINDS:
+            manifest.setdefault(kind, {'columns': ['Time'], 'files': {}})
+        return manifest
+
+    def __update(self, kind, files):
+        """Rewrite the columns of a kind if any of the files has changed."""
+        old = self.__manifest[kind]['files']
+        stats = dict((path, os.stat(os.path.join(self.data_folder, path)))
+                     for path in files)
+        changed = sorted(
+            path for path, st in stats.items()
+            if path not in old or old[path]['mtime'] != st.st_mtime or
+            old[path]['size'] != st.st_size)
+
+        if not changed and set(old) == set(files):
+            return []
+
+        tables = {}
+        for path in changed:
+            tables[path] = read_result_file(os.path.join(self.data_folder, path))
+
+        columns = list(self.__manifest[kind]['columns'])
+        for table in tables.values():
+            columns.extend(c for c in table.columns if c not in columns)
+
+        # order runs by (case, faces, Re) and copy unchanged runs from the
+        # current store
+        order = sorted(files, key=lambda path: files[path][1:])
+        chunks = dict((name, []) for name in columns)
+        entries = {}
+        start = 0
+        for path in order:
+            if path in tables:
+                table = tables[path]
+                values = dict((name, table[name].values) for name in table)
+                size = len(table)
+            else:
+                run = old[path]
+                values = dict(
+                    (name, self.column(kind, name)[run['start']:run['stop']])
+                    for name in self.__manifest[kind]['columns'])
+                size = run['stop'] - run['start']
+
+            for name in columns:
+                chunks[name].append(
+                    values[name] if name in values else np.full(size, np.nan))
+
+            _, case, faces, Re = files[path]
+            entries[path] = {
+                'case': case, 'faces': faces, 'Re': Re,
+                'mtime': stats[path].st_mtime, 'size': stats[path].st_size,
+                'start': start, 'stop': start + size,
+                'final': [float(chunks[name][-1][-1]) if size else None
+                          for name in columns]}
+            start += size
+
+        folder = os.path.join(self.store_folder, kind)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        data = dict((name, np.concatenate(chunks[name]) if chunks[name] else
+                     np.zeros(0)) for name in columns)
+
+        # release memory maps before the files are replaced
+        del chunks, values
+        for name in columns:
+            self.__columns.pop((kind, name), None)
+
+        for name, array in data.items():
+            temp = os.path.join(folder, name + '.tmp.npy')
+            np.save(temp, array)
+            os.replace(temp, os.path.join(folder, name + '.npy'))
+
+        self.__manifest[kind] = {'columns': columns, 'files': entries}
+        return changed
+
+    def __write_manifest(self):
+        if not os.path.isdir(self.store_folder):
+            os.makedirs(self.store_folder)
+        temp = self.manifest_file + '.tmp'
+        with open(temp, 'w') as f:
+            json.dump(self.__manifest, f, indent=1)
+        os.replace(temp, self.manifest_file)
+
+    def __repr__(self):
+        """Result store representation."""
+        return 'ResultStore::{} ({} runs)'.format(
+            self.store_folder, len(self.__manifest['forces']['files']))
+
+
+class RunCache(object):
+    """Least recently used cache of single runs with a memory budget.
+
+    Runs are loaded on demand from the store. Runs which are modified after the
+    last update of the store are read from their .dat file. Cached runs are
+    invalidated when mtime or size of their .dat file changes.
+
+    Args:
+        store: A ResultStore.
+        max_bytes: Memory budget for cached DataFrames (default: 256 MB). The
+            latest run is always kept even if it is larger than the budget.
+    """
+
+    def __init__(self, store, max_bytes=256 * 1024 ** 2):
+        """Init cache."""
+        self.store = store
+        self.max_bytes = max_bytes
+        self.__runs = OrderedDict()
+        self.__nbytes = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        """Memory used by cached runs in bytes."""
+        return self.__nbytes
+
+    def get(self, kind, case, faces, Re):
+        """Get results of a run as a DataFrame.
+
+        Raises:
+            OSError if the .dat file of the run doesn't exist.
+        """
+        key = (kind, case, faces, Re)
+        filepath = self.store.result_file(*key)
+        st = os.stat(filepath)
+        stamp = (st.st_mtime, st.st_size)
+
+        with self.__lock:
+            cached = self.__runs.get(key)
+            if cached and cached[0] == stamp:
+                self.__runs.move_to_end(key)
+                return cached[1]
+
+        if self.store.stamp(*key) == stamp:
+            run = self.store.load(*key)
+        else:
+            run = read_result_file(filepath)
+        nbytes = int(run.memory_usage(index=True, deep=True).sum())
+
+        with self.__lock:
+            self.__discard(key)
+            self.__runs[key] = (stamp, run, nbytes)
+            self.__nbytes += nbytes
+            while self.__nbytes > self.max_bytes and len(self.__runs) > 1:
+                self.__discard(next(iter(self.__runs)))
+        return run
+
+    def clear(self):
+        """Remove all the runs from cache."""
+        with self.__lock:
+            self.__runs.clear()
+            self.__nbytes = 0
+
+    def __discard(self, key):
+        cached = self.__runs.pop(key, None)
+        if cached:
+            self.__nbytes -= cached[2]
+
+    def __len__(self):
+        """Number of cached runs."""
+        return len(self.__runs)
+
+    def __contains__(self, key):
+        """Check if (kind, case, faces, Re) is cached."""
+        return key in self.__runs
+
+    def __repr__(self):
+        """Run cache representation."""
+        return 'RunCache::{} runs ({:.1f} of {:.1f} MB)'.format(
+            len(self.__runs), self.__nbytes / 1024.0 ** 2,
+            self.max_bytes / 1024.0 ** 2)
+
+
+if __name__ == '__main__':
+    data_folder = sys.argv[1] if len(sys.argv) > 1 else \
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    store = ResultStore(data_folder)
+    for path in store.update():
+        print('ingested {}'.format(path))
+    print(store)
@@ -5,16 +5,23 @@ Created on Sun Jan 27 15:48:00 2019
 @author: fiedl
 """
 
+import argparse
 import dash
+import functools
+import glob
+import json
 import os
-import pandas as pd
 from dash import dcc
 import plotly.graph_objs as go
 from dash import html
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 from textwrap import dedent as d
 import numpy as np
 
+from downsample import downsample, relayout_range
+from resultstore import ResultStore, RunCache
+
 app = dash.Dash(__name__)
 
 styles = {
@@ -23,76 +30,33 @@ styles = {
     }
 }
 
-def loadResultFile(case,face,Re):
-    # Load residual and forces files from data folder using pandas
-    residuals = pd.read_csv('data/residuals_'+case+'_'+str(face)+'/Re_'+str(Re)+'.dat',
-                header=1, sep='\t+', engine='python')
-
-    forces = pd.read_csv('data/forces_'+case+'_'+str(face)+'/Re_'+str(Re)+'.dat',
-                header=8, sep='\t+', engine='python')
-
-    # Name columns of foces and residuals Dataframe
-    forces.columns = ['Time', 'Cm', 'Cd', 'Cl', 'Cl_f', 'Cl_r']
-
-    residuals.columns = ['Time', 'Ux', 'Uy', 'Uz', 'p']
-
-    return forces, residuals
-
-def updateResultDicts(selected_force):
-    cases = []
-    faces = []
-    # Get a list of all files in data folder and extract the different
-    # case names and mesh face numbers from the folder names
-    for item in os.listdir('data'):
-        cases.append(item.split('_')[1])
-        faces.append(int(item.split('_')[2]))
-    # Generate lists of unique case names and face numbers
-    cases = list(set(cases))
-    faces = list(set(faces))
-    for case in cases:
-        forces_dict[case] = {}
-        residuals_dict[case] = {}
-        final_residuals[case] = {}
-        final_forces[case] = {}
-        for face in faces:
-            forces_dict[case][face] = {}
-            residuals_dict[case][face] = {}
-            final_residuals[case][face] = {}
-            final_forces[case][face] = {}
-            try:
-                # For each case and face number extract each calculated Reynolds
-                # number from the file names and load Dataframes into the variables
-                # forces and residuals. Then save the Dataframes in dictionaries
-                # that allow easy access to the results by case name, face number
-                # and Reynolds number
-                for item in os.listdir('data/residuals_'+case+'_'+str(face)):
-                    Re = int(item.rpartition('_')[-1].rpartition('.')[0])
-                    forces, residuals = loadResultFile(case,face,Re)
-                    forces_dict[case][face][Re] = forces
-                    residuals_dict[case][face][Re] = residuals
-                    # Save the final results on the finest mesh in extra dictionaries
-                    # to display in the overview plot
-                    if face == max(faces):
-                        final_residuals[case][face][Re] = residuals.tail(1)
-                        final_forces[case][face][Re] = forces[selected_force].tail(1).tolist()[0]
-            except:
-                pass
-                #print('data/residuals_'+case+'_'+str(face)+' not found.')
+def updateResultSummary():
+    # Ingest new and modified result files in the data folder to the columnar
+    # store and read the final values of all runs from the store manifest. The
+    # convergence histories are only loaded on demand through the run cache.
+    # Only cases with force results are shown in the overview plot, so the
+    # curve number of a selected point is the index in cases.
+    global final_forces, cases
+    store.update()
+    final_forces = store.final('forces')
+    cases = list(final_forces.index.unique('case'))
+    getFigures.cache_clear()
+
+def getFinestMesh(case):
+    # Return the largest number of faces calculated for a case
+    return final_forces.loc[case].index.get_level_values('faces').max()
 
 def getFinalForcesTraces():
     data = []
     # Loop through all cases (laminar, kEpsilon etc.) that were calculated and
     # display them as individual lines in the overview plot
-    for forces_case in forces_dict:
-        # From the final_forces dictionary get the keys and values to display in
-        # the overview plot
-        x_values = final_forces[forces_case][max(final_forces[forces_case].keys())].keys()
-        y_values = final_forces[forces_case][max(final_forces[forces_case].keys())].values()
-        # Sort by x values (Reynolds number)
-        x_values, y_values = zip(*sorted(zip(x_values, y_values)))
+    for forces_case in cases:
+        # Get the final values on the finest mesh sorted by Reynolds number to
+        # display in the overview plot
+        final = final_forces.loc[(forces_case, getFinestMesh(forces_case))]
         trace = go.Scatter(
-        x = x_values,
-        y = y_values,
+        x = final.index,
+        y = final[selected_force],
         mode = 'lines+markers',
         name = forces_case,
         )
@@ -100,15 +64,35 @@ def getFinalForcesTraces():
         data.append(trace)
     return data
 
-def getConvergenceTraces(case,Re):
+def getSelection(selectedData):
+    # Return case name and Reynolds number of the selected point in the
+    # overview plot. Laminar Re = 100 is shown if nothing is selected.
+    if selectedData:
+        selected_Re = selectedData['points'][0]['x']
+        curve_number = selectedData['points'][0]['curveNumber']
+        return cases[curve_number], selected_Re
+    return 'laminar', 100
+
+def getZoomRange(relayoutData):
+    # Return the zoomed x range of a graph or None if the graph is zoomed out.
+    # Other layout changes (e.g. autosize) do not update the graph.
+    if not any(key.startswith('xaxis.') for key in relayoutData or {}):
+        raise PreventUpdate
+    return relayout_range(relayoutData)
+
+def getConvergenceTraces(case,Re,x_range=None):
     data = []
     # Loop through the different mesh face numbers and append them to the data
-    # array to display them as individual lines.
-    for face in forces_dict[case]:
-        if Re in forces_dict[case][face].keys():
+    # array to display them as individual lines. Only the visible range is sent
+    # to the browser with at most max_points points per line.
+    for face in final_forces.loc[case].index.unique('faces'):
+        if (case, face, Re) in final_forces.index:
+            run = cache.get('forces', case, face, Re)
+            x_values, y_values = downsample(run['Time'].values,
+                run[selected_force].values, max_points, x_range)
             trace = go.Scatter(
-                x = forces_dict[case][face][Re]['Time'],
-                y = forces_dict[case][face][Re][selected_force],
+                x = x_values,
+                y = y_values,
                 mode = 'lines',
                 name = str(face),
             )
@@ -121,10 +105,10 @@ def getMeshTraces(case,Re):
     # If multiple meshes were calculated, get the final value that corresponds
     # to each mesh face number and append it to the x_values and y_values arrays
     # to display a line with the caluclated final values on each mesh.
-    for face in forces_dict[case]:
-        if forces_dict[case][face]:
+    for face in final_forces.loc[case].index.unique('faces'):
+        if (case, face, Re) in final_forces.index:
             x_values.append(face)
-            y_values.append(forces_dict[case][face][Re][selected_force].tail(1).tolist()[0])
+            y_values.append(final_forces.loc[(case, face, Re), selected_force])
     trace = [go.Scatter(
         x = x_values,
         y = y_values,
@@ -132,47 +116,173 @@ def getMeshTraces(case,Re):
     )]
     return trace
 
-def getResidualTraces(case,Re):
-    # Return array with residual lines for p, Ux, Uy and Uz
-    trace0 = go.Scatter(
-        x = residuals_dict[case][max(list(final_forces[case].keys()))][Re]['Time'],
-        y = residuals_dict[case][max(final_forces[case].keys())][Re]['p'],
-        mode = 'lines',
-        name = 'p'
+def getResidualTraces(case,Re,x_range=None):
+    # Return array with residual lines for p, Ux, Uy and Uz on the finest mesh.
+    # Minimum and maximum of each bucket are kept so no spikes are lost.
+    run = cache.get('residuals', case, getFinestMesh(case), Re)
+    data = []
+    for field in ['p', 'Ux', 'Uy', 'Uz']:
+        x_values, y_values = downsample(run['Time'].values, run[field].values,
+            max_points, x_range)
+        trace = go.Scatter(
+            x = x_values,
+            y = y_values,
+            mode = 'lines',
+            name = field
+        )
+        data.append(trace)
+    return data
+
+def getConvergenceFigure(case,Re,x_range=None):
+    return go.Figure(
+        data=getConvergenceTraces(case,Re,x_range),
+        layout=dict(
+            title='Convergence of '+selected_force+' for Re = '+str(Re)+' ('+case+')',
+            uirevision=case+str(Re),
+            xaxis={'title': 'Iterations'},
+            yaxis={'title': selected_force},
+            hovermode='closest',
+            annotations=[
+                dict(
+                    x=1.4,
+                    y=1.1,
+                    xref='paper',
+                    yref='paper',
+                    text='<b>No. of faces</b>',
+                    showarrow=False
+                    )
+            ]
+        )
     )
-    trace1 = go.Scatter(
-        x = residuals_dict[case][max(final_forces[case].keys())][Re]['Time'],
-        y = residuals_dict[case][max(final_forces[case].keys())][Re]['Ux'],
-        mode = 'lines',
-        name = 'Ux'
+
+def getResidualFigure(case,Re,x_range=None):
+    return go.Figure(
+        data=getResidualTraces(case,Re,x_range),
+        layout=dict(
+            title='Residuals for Re = '+str(Re)+' ('+case+' on finest mesh)',
+            uirevision=case+str(Re),
+            xaxis={'title': 'Iterations'},
+            yaxis={'title': 'Residuals', 'type': 'log'},
+            hovermode='closest'
+        )
     )
-    trace2 = go.Scatter(
-        x = residuals_dict[case][max(final_forces[case].keys())][Re]['Time'],
-        y = residuals_dict[case][max(final_forces[case].keys())][Re]['Uy'],
-        mode = 'lines',
-        name = 'Uy'
+
+def getMeshFigure(case,Re):
+    return go.Figure(
+        data=getMeshTraces(case,Re),
+        layout=dict(
+            title='Mesh study for Re = '+str(Re)+' ('+case+')',
+            xaxis={'title': 'No. of faces'},
+            yaxis={'title': selected_force},
+            hovermode='closest'
+        )
     )
-    trace3 = go.Scatter(
-        x = residuals_dict[case][max(final_forces[case].keys())][Re]['Time'],
-        y = residuals_dict[case][max(final_forces[case].keys())][Re]['Uz'],
-        mode = 'lines',
-        name = 'Uz'
+
+def toJSON(figure):
+    # Serialise a figure once to plain lists and dictionaries so Dash doesn't
+    # have to convert the numpy arrays again for every response
+    return json.loads(figure.to_json())
+
+@functools.lru_cache(maxsize=64)
+def getFigures(case,Re):
+    # Return convergence, residuals and mesh figures for a selected run. The
+    # figures are memoised for each (case, Re). The cache is cleared when the
+    # results are updated.
+    return (toJSON(getConvergenceFigure(case,Re)),
+            toJSON(getResidualFigure(case,Re)),
+            toJSON(getMeshFigure(case,Re)))
+
+def getLiveFigure(kind):
+    # Return a figure with one line for each running case with the latest
+    # rows of the case. New rows are added by extendData in update_live.
+    field, title, yaxis = live_figures[kind]
+    data = []
+    for run in live_runs:
+        table = getattr(run, kind)
+        start = max(0, len(table) - live_points)
+        data.append(go.Scatter(x=table.column('Time', start),
+                               y=table.column(field, start),
+                               mode='lines', name=run.name))
+    return go.Figure(
+        data=data,
+        layout=dict(
+            title=title,
+            xaxis={'title': 'Iterations'},
+            yaxis=yaxis,
+            hovermode='closest')
     )
-    data = [trace0, trace1, trace2, trace3]
-    return data
 
-# Initialize empty dictionaries that will be filled by updateResultDicts
-forces_dict = {}
-residuals_dict = {}
+def getLiveUpdate(kind,sent):
+    # Return extendData with the rows of each running case that were not sent
+    # to this browser yet, a new figure if a table was read again since the
+    # last update (e.g. a restarted case) and the new [reloads, rows] of each
+    # table for the browser. Extending the old lines would keep stale rows.
+    field = live_figures[kind][0]
+    tables = [getattr(run, kind) for run in live_runs]
+    counts = [[table.reloads, len(table)] for table in tables]
+    # the initial figure is empty
+    sent = sent or [[reloads, 0] for reloads, _ in counts]
+    if any(s[0] != c[0] or s[1] > c[1] for s, c in zip(sent, counts)):
+        return dash.no_update, toJSON(getLiveFigure(kind)), counts
+    x_values, y_values, traces = [], [], []
+    for count, table in enumerate(tables):
+        start, size = sent[count][1], counts[count][1]
+        if size > start:
+            x_values.append(table.column('Time', start, size))
+            y_values.append(table.column(field, start, size))
+            traces.append(count)
+    if not traces:
+        return dash.no_update, dash.no_update, counts
+    return ([dict(x=x_values, y=y_values), traces, live_points],
+            dash.no_update, counts)
+
+# Columnar store of the result files in the data folder. Result files are only
+# parsed when they are new or modified since the last start.
+app_folder = os.path.dirname(os.path.abspath(__file__))
+store = ResultStore(os.path.join(app_folder, 'data'))
 
-final_residuals = {}
-final_forces = {}
+# Convergence histories of the recently selected runs are kept in memory up to
+# this budget
+cache = RunCache(store, max_bytes=256 * 1024 ** 2)
 
 # Choose which force coefficient should be displayed
 selected_force = 'Cd'
 
-# Fill dictionaries with results
-updateResultDicts(selected_force)
+# Width of the small graphs in pixels (see assets/style.css). Lines are
+# downsampled to two points per pixel.
+graph_width = 450
+max_points = 2 * graph_width
+
+# Running cases to follow in live mode, e.g.
+# python suzanne_report_dash.py --live ../suzanne_simple_case/sweep/Re_*
+parser = argparse.ArgumentParser(description='Suzanne report')
+parser.add_argument('--live', nargs='+', default=[], metavar='CASE',
+                    help='case folders or glob patterns of running cases')
+parser.add_argument('--interval', type=float, default=2,
+                    help='seconds between updates in live mode')
+args, _ = parser.parse_known_args()
+live_runs = []
+if args.live:
+    # livereader needs butterfly which is not needed for the report itself
+    from livereader import LiveRun
+    live_runs = [LiveRun(folder) for pattern in args.live
+                 for folder in sorted(glob.glob(pattern))
+                 if os.path.isdir(folder)]
+
+# Live lines keep the latest iterations up to this number of points
+live_points = 10000
+
+# Field, title and y axis of the live figures
+live_figures = {
+    'forces': (selected_force, 'Running cases: '+selected_force,
+               {'title': selected_force}),
+    'residuals': ('p', 'Running cases: p residual',
+                  {'title': 'Residuals', 'type': 'log'})
+}
+
+# Load final values from the store
+updateResultSummary()
+initial_figures = getFigures('laminar', 100)
 
 app.layout = html.Div([
     html.Div([
@@ -209,130 +319,90 @@ app.layout = html.Div([
     html.Div([
         dcc.Graph(
             id='iterations',
-            figure=go.Figure(
-                data=getConvergenceTraces('laminar',100),
-                layout=dict(
-                title='Convergence of '+selected_force+' for Re = 100 (laminar)',
-                xaxis={'title': 'Iterations'},
-                yaxis={'title': selected_force},
-                hovermode='closest',
-                annotations=[
-                    dict(
-                        x=1.4,
-                        y=1.1,
-                        xref='paper',
-                        yref='paper',
-                        text='<b>No. of faces</b>',
-                        showarrow=False
-                        )
-                ]
-                )
-            )
+            figure=initial_figures[0]
         )
     ],className='small-graphs-containers'),
     html.Div([
         dcc.Graph(
             id='residuals',
-            figure=go.Figure(
-                data= getResidualTraces('laminar',100),
-                layout=dict(
-                title='Residuals for Re = 100 (laminar on finest mesh)',
-                xaxis={'title': 'Iterations'},
-                yaxis={'title': 'Residuals', 'type': 'log'},
-                hovermode='closest')
-            )
+            figure=initial_figures[1]
         )
     ],className='small-graphs-containers'),
     html.Div([
         dcc.Graph(
             id='mesh',
-            figure=go.Figure(
-                data= getMeshTraces('laminar',100),
-                layout=dict(
-                title='Mesh study',
-                xaxis={'title': 'No. of faces'},
-                yaxis={'title': selected_force},
-                hovermode='closest')
-            )
+            figure=initial_figures[2]
         )
     ],className='small-graphs-containers')
 
-],className='center')
-
-# Use callback on data selection to update the three bottom plots when a point
-# is selected in the overview plot
-@app.callback(
-    Output('iterations', 'figure'),
-    [Input('overview', 'selectedData')])
-def update_figure(selectedData):
-    if selectedData:
-        selected_Re = selectedData['points'][0]['x']
-        curve_number = selectedData['points'][0]['curveNumber']
-    else:
-        selected_Re = 100
-        curve_number = 0               
-    trace_name = list(forces_dict.keys())[curve_number]
-    return {
-        'data': getConvergenceTraces(trace_name,selected_Re),
-        'layout': go.Layout(
-            title='Convergence of '+selected_force+' for Re = '+str(selected_Re)+' ('+trace_name+')',
-            xaxis={'title': 'Iterations'},
-            yaxis={'title': selected_force},
-            hovermode='closest',
-            annotations=[
-                dict(
-                    x=1.4,
-                    y=1.1,
-                    xref='paper',
-                    yref='paper',
-                    text='<b>No. of faces</b>',
-                    showarrow=False
-                    )
-            ]
+] + ([
+    # Live mode
+    html.Div([
+        dcc.Graph(
+            id='live-forces',
+            figure=getLiveFigure('forces')
         )
-    }
-
-@app.callback(
-    Output('residuals', 'figure'),
-    [Input('overview', 'selectedData')])
-def update_figure(selectedData):
-    if selectedData:
-        selected_Re = selectedData['points'][0]['x']
-        curve_number = selectedData['points'][0]['curveNumber']
-    else:
-        selected_Re = 100
-        curve_number = 0
-    trace_name = list(forces_dict.keys())[curve_number]
-    return {
-        'data': getResidualTraces(trace_name,selected_Re),
-        'layout': go.Layout(
-            title='Residuals for Re = '+str(selected_Re)+' ('+trace_name+' on finest mesh)',
-            xaxis={'title': 'Iterations'},
-            yaxis={'title': 'Residuals', 'type': 'log'},
-            hovermode='closest'
+    ],className='small-graphs-containers'),
+    html.Div([
+        dcc.Graph(
+            id='live-residuals',
+            figure=getLiveFigure('residuals')
         )
-    }
+    ],className='small-graphs-containers'),
+    dcc.Interval(id='live-interval', interval=args.interval * 1000),
+    dcc.Store(id='live-sent')
+] if live_runs else []),className='center')
 
+# Use a single callback on data selection to update the three bottom plots
+# when a point is selected in the overview plot. Zooming into the convergence
+# or residuals plot only updates that plot with the data of the visible range.
 @app.callback(
-    Output('mesh', 'figure'),
-    [Input('overview', 'selectedData')])
-def update_figure(selectedData):
-    if selectedData:
-        selected_Re = selectedData['points'][0]['x']
-        curve_number = selectedData['points'][0]['curveNumber']
-    else:
-        selected_Re = 100
-        curve_number = 0        
-    trace_name = list(forces_dict.keys())[curve_number]
-    return {
-        'data': getMeshTraces(trace_name,selected_Re),
-        'layout': go.Layout(
-            title='Mesh study for Re = '+str(selected_Re)+' ('+trace_name+')',
-            xaxis={'title': 'No. of faces'},
-            yaxis={'title': selected_force},
-            hovermode='closest'
-        )
-    }
+    [Output('iterations', 'figure'),
+     Output('residuals', 'figure'),
+     Output('mesh', 'figure')],
+    [Input('overview', 'selectedData'),
+     Input('iterations', 'relayoutData'),
+     Input('residuals', 'relayoutData')])
+def update_figures(selectedData, iterationsLayout, residualsLayout):
+    case, Re = getSelection(selectedData)
+    figures = getFigures(case, Re)
+    triggered = [t['prop_id'] for t in dash.callback_context.triggered]
+    if 'iterations.relayoutData' in triggered:
+        x_range = getZoomRange(iterationsLayout)
+        figure = toJSON(getConvergenceFigure(case, Re, x_range)) \
+            if x_range else figures[0]
+        return figure, dash.no_update, dash.no_update
+    if 'residuals.relayoutData' in triggered:
+        x_range = getZoomRange(residualsLayout)
+        figure = toJSON(getResidualFigure(case, Re, x_range)) \
+            if x_range else figures[1]
+        return dash.no_update, figure, dash.no_update
+    return figures
+
+# In live mode the interval polls the result files of the running cases and
+# only the rows which were appended since the last update are sent to the
+# browser. The number of rows sent to each browser is kept in live-sent. If a
+# result file was truncated or recreated the whole figure is replaced.
+if live_runs:
+    @app.callback(
+        [Output('live-forces', 'extendData'),
+         Output('live-forces', 'figure'),
+         Output('live-residuals', 'extendData'),
+         Output('live-residuals', 'figure'),
+         Output('live-sent', 'data')],
+        [Input('live-interval', 'n_intervals')],
+        [State('live-sent', 'data')])
+    def update_live(n_intervals, sent):
+        for run in live_runs:
+            run.poll()
+        sent = sent or {}
+        forces = getLiveUpdate('forces', sent.get('forces'))
+        residuals = getLiveUpdate('residuals', sent.get('residuals'))
+        if all(update is dash.no_update
+               for update in forces[:2] + residuals[:2]):
+            raise PreventUpdate
+        return forces[:2] + residuals[:2] + (
+            {'forces': forces[2], 'residuals': residuals[2]},)
 
 if __name__ == '__main__':
     app.run_server(debug=True)
@@ -0,0 +1,41 @@
+"""Run the Reynolds number study for Suzanne with butterfly.
+
+This replaces reynoldsStudy.sh. Each Reynolds number runs in its own copy of
+the meshed case and the runs are executed concurrently. Each run starts from
+the solution of the nearest converged Reynolds number. Results are written
+to suzanne_simple_app/data. The mesh is restored from the mesh cache if the
+meshing inputs haven't changed since the last run.
+"""
+import os
+
+from butterfly.case import Case
+from butterfly.convergence import ForceVariance, ResidualThreshold
+from butterfly.meshcache import MeshCache
+from butterfly.sweep import ReynoldsSweep
+
+case_dir = os.path.dirname(os.path.abspath(__file__))
+data_dir = os.path.join(os.path.dirname(case_dir), 'suzanne_simple_app', 'data')
+
+# hydraulic diameter = 4 * A / U
+d_hyd = 4 * 0.02562 / 0.804201
+cores_per_run = 2
+
+case = Case.from_folder(case_dir)
+case.working_dir = os.path.dirname(case_dir)
+
+key, cached = MeshCache().build(case)
+print('{} mesh {}'.format('Restored' if cached else 'Created', key[:12]))
+
+# stop each run once Cd is flat and the residuals are low
+convergence = (ForceVariance('Cd', window=100, tolerance=1e-3),
+               ResidualThreshold(1e-4))
+
+sweep = ReynoldsSweep(case, range(1000, 9000, 1000), d_hyd,
+                      cores_per_run=cores_per_run, results_folder=data_dir,
+                      convergence=convergence, warm_start=True)
+
+for result in sweep.run():
+    if result.success:
+        print('Re {}: {}'.format(result.Re, result.forces))
+    else:
+        print('Re {} failed:\n\t{}'.format(result.Re, result.error))
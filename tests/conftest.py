@@ -0,0 +1,7 @@
+"""Make butterfly and the report modules importable without installing them."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+sys.path.insert(1, os.path.join(ROOT, 'suzanne_simple_app'))
@@ -0,0 +1,71 @@
+"""Tests for downsampling line traces."""
+import numpy as np
+import pytest
+
+downsample = pytest.importorskip('downsample')
+
+
+def trace(count, seed=0):
+    rng = np.random.RandomState(seed)
+    x = np.arange(count, dtype=np.float64) + 1
+    y = np.exp(-x / count) + 0.01 * rng.randn(count)
+    return x, y
+
+
+@pytest.mark.parametrize('count', [1, 10, 999, 1000, 1001, 12345])
+@pytest.mark.parametrize('n', [4, 99, 100, 900])
+def test_minmax_indices(count, n):
+    x, y = trace(count)
+    y[count // 3] = 10  # a spike
+    indices = downsample.minmax(x, y, n)
+    if count <= n:
+        assert indices.tolist() == list(range(count))
+        return
+    assert len(indices) <= n + 2
+    assert (np.diff(indices) > 0).all()
+    assert indices[0] == 0 and indices[-1] == count - 1
+    # spikes are kept
+    assert y.argmax() in indices and y.argmin() in indices
+
+
+def test_minmax_nan():
+    x, y = trace(1000)
+    y[100:400] = np.nan
+    indices = downsample.minmax(x, y, 100)
+    assert (np.diff(indices) > 0).all() and indices[-1] == 999
+    assert np.nanargmax(y) in indices and np.nanargmin(y) in indices
+
+
+@pytest.mark.parametrize('count', [1, 10, 1000, 1001, 12345])
+@pytest.mark.parametrize('n', [3, 100, 900])
+def test_lttb_indices(count, n):
+    x, y = trace(count)
+    indices = downsample.lttb(x, y, n)
+    if count <= n:
+        assert indices.tolist() == list(range(count))
+        return
+    assert len(indices) == n
+    assert (np.diff(indices) > 0).all()
+    assert indices[0] == 0 and indices[-1] == count - 1
+
+
+def test_downsample_visible_range():
+    x, y = trace(10000)
+    dx, dy = downsample.downsample(x, y, 100, x_range=(2000.5, 3000.5))
+    # one point on each side of the range
+    assert dx[0] == 2000 and dx[-1] == 3001
+    assert len(dx) <= 102 and (dy == y[dx.astype(int) - 1]).all()
+
+    dx, dy = downsample.downsample(x, y, 100, method='lttb')
+    assert len(dx) == 100 and dx[0] == 1 and dx[-1] == 10000
+    with pytest.raises(AssertionError):
+        downsample.downsample(x, y, 100, method='mean')
+
+
+def test_relayout_range():
+    assert downsample.relayout_range(None) is None
+    assert downsample.relayout_range({'xaxis.autorange': True}) is None
+    assert downsample.relayout_range(
+        {'xaxis.range[0]': 1, 'xaxis.range[1]': '2.5'}) == (1, 2.5)
+    assert downsample.relayout_range({'xaxis.range': [3, 4]}) == (3, 4)
+    assert downsample.relayout_range({'yaxis.range': [3, 4]}) is None
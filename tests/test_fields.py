@@ -0,0 +1,70 @@
+"""Tests for nonuniform field values."""
+import io
+import os
+
+import numpy as np
+import pytest
+
+from butterfly.fields import FixedValue, NonuniformList, field_value
+from butterfly.foamfile import FoamFile
+from butterfly.p import P
+from butterfly.U import U
+
+
+def test_nonuniform_list_kind():
+    assert NonuniformList(np.zeros(4)).kind == 'scalar'
+    assert NonuniformList(np.zeros((4, 1))).values.shape == (4,)
+    assert NonuniformList(np.zeros((4, 3))).kind == 'vector'
+    assert NonuniformList(np.zeros((4, 9))).kind == 'tensor'
+    assert NonuniformList(np.arange(4), 'label').dtype == '<i4'
+    with pytest.raises(AssertionError):
+        NonuniformList(np.zeros((4, 2)))
+    assert field_value(np.array([1.0, 0, 0])) == 'uniform (1.0 0.0 0.0)'
+    assert field_value(np.zeros((2, 3)), False) == NonuniformList(np.zeros((2, 3)))
+
+
+def test_write_ascii_list():
+    f = io.StringIO()
+    NonuniformList(np.array([[0.5, 0, 1], [1, 2, 3]])).write_foam(f)
+    assert f.getvalue() == \
+        'nonuniform List<vector>\n2\n(\n(0.5 0.0 1.0)\n(1.0 2.0 3.0)\n)'
+
+
+@pytest.mark.parametrize('file_format', ['ascii', 'binary'])
+def test_round_trip(tmp_path, file_format):
+    os.mkdir(str(tmp_path / '0'))
+    cells = np.random.RandomState(0).rand(1000, 3)
+    inlet = np.linspace(0, 1, 20)
+
+    u = U()
+    u.format = file_format
+    u.internalField = cells
+    u.values['boundaryField']['inlet'] = \
+        FixedValue(np.stack((inlet, 0 * inlet, 0 * inlet), axis=1),
+                   is_unifrom=False).value_dict
+    u.save(str(tmp_path))
+    p = P()
+    p.format = file_format
+    p.internalField = cells[:, 0]
+    p.save(str(tmp_path))
+
+    filepath = str(tmp_path / '0' / 'U')
+    loaded = U.from_file(filepath)
+    internal = loaded.values['internalField']
+    assert isinstance(internal, NonuniformList) and internal.kind == 'vector'
+    # binary values are read back exactly and repr keeps ascii values exact
+    assert internal == NonuniformList(cells)
+    assert loaded.values['boundaryField']['inlet']['value'].values[:, 0] \
+        .tolist() == inlet.tolist()
+    assert loaded == u
+
+    pressure = FoamFile.from_file(str(tmp_path / '0' / 'p'))
+    assert pressure.format == file_format
+    assert pressure.values['internalField'].kind == 'scalar'
+    assert (pressure.values['internalField'].values == cells[:, 0]).all()
+
+    # saved values are not written again
+    loaded.mark_saved(filepath)
+    assert loaded.is_saved(filepath)
+    loaded.internalField = cells * 2
+    assert not loaded.is_saved(filepath)
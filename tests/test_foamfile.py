@@ -0,0 +1,73 @@
+"""Tests for change tracking of foamfiles."""
+import os
+import shutil
+import tracemalloc
+
+import numpy as np
+
+from butterfly.parser import ParseCache
+from butterfly.U import U
+
+
+def test_saved_state_does_not_copy_arrays(tmp_path):
+    os.mkdir(str(tmp_path / '0'))
+    filepath = str(tmp_path / '0' / 'U')
+    u = U()
+    u.internalField = np.random.rand(100000, 3)
+    u.save(str(tmp_path))
+    assert u.is_saved(filepath)
+
+    tracemalloc.start()
+    u.mark_saved(filepath)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < u.values['internalField'].values.nbytes / 10
+
+    # changes inside the array are found
+    u.values['internalField'].values[0, 0] += 1
+    assert not u.is_saved(filepath)
+
+
+def test_parse_cache_contains(tmp_path):
+    filepath = str(tmp_path / 'controlDict')
+    with open(filepath, 'w') as f:
+        f.write('application simpleFoam;\n')
+    cache = ParseCache()
+    assert filepath not in cache
+    assert cache.values(filepath) == {'application': 'simpleFoam'}
+    assert filepath in cache
+    with open(filepath, 'a') as f:
+        f.write('endTime 10;\n')
+    assert filepath not in cache
+
+
+def test_default_values_are_not_shared():
+    a = U()
+    b = U(values={'boundaryField': {'inlet': {'type': 'fixedValue'}},
+                  'internalField': 'uniform (1 0 0)'})
+    a.values['boundaryField']['wall'] = {'type': 'noSlip'}
+    assert U().values['boundaryField'] == {}
+    assert b.values['boundaryField'] == {'inlet': {'type': 'fixedValue'}}
+    assert b.values['internalField'] == 'uniform (1 0 0)'
+    assert list(b.values) == list(a.values)
+
+
+def test_from_folder_copies_imported_foamfiles(tmp_path):
+    from butterfly.case import Case
+    case = os.path.join(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))), 'suzanne_simple_case')
+    folder = str(tmp_path / 'suz')
+    for sub in ('0', 'constant', 'system'):
+        shutil.copytree(os.path.join(case, sub), os.path.join(folder, sub))
+
+    first = Case.from_folder(folder, verbose=False)
+    first.controlDict.values['endTime'] = '1'
+    second = Case.from_folder(folder, verbose=False)
+    assert second.controlDict.values['endTime'] != '1'
+    assert second.controlDict.is_saved(
+        os.path.join(folder, 'system', 'controlDict'))
+
+    # modified files are imported again
+    first.controlDict.save(folder)
+    assert Case.from_folder(folder, verbose=False) \
+        .controlDict.values['endTime'] == '1'
@@ -0,0 +1,92 @@
+"""Tests for streaming foamfiles to file handles."""
+import collections
+import io
+import json
+import os
+import random
+
+import pytest
+
+from butterfly.boundarycondition import IndoorWallBoundaryCondition
+from butterfly.case import Case
+from butterfly.foamwriter import write_values
+from butterfly.geometry import BFGeometry
+
+CASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'suzanne_simple_case')
+
+
+def legacy_body(values):
+    """The json based FoamFile.body before foamfiles were streamed."""
+    def remove_none(d):
+        if isinstance(d, (dict, collections.OrderedDict)):
+            return collections.OrderedDict(
+                (k, remove_none(v)) for k, v in d.items()
+                if v == {} or (v and remove_none(v)))
+        elif isinstance(d, (list, tuple)):
+            return [remove_none(v) for v in d if v and remove_none(v)]
+        else:
+            return d
+
+    of = json.dumps(remove_none(values), indent=4, separators=(";", "\t\t")) \
+        .replace('\\"', '@').replace('"\n', ";\n").replace('"', '') \
+        .replace('};', '}').replace('\t\t{', '{').replace('@', '"')
+
+    content = (line[4:] if not line.endswith('{') else
+               line[4:-1] + "\n" + (len(line) - len(line.strip()) - 4) * ' ' + '{'
+               for line in of.split("\n")[1:-1])
+    return "\n\n".join(content)
+
+
+def legacy_text(foamfile):
+    return '\n'.join((foamfile.header(), legacy_body(foamfile.values)))
+
+
+def foamfiles():
+    geometries = [
+        BFGeometry('patch_{}'.format(i),
+                   ((i, 0, 0), (i + 1, 0, 0), (i + 1, 1, 1), (i, 1, 1)),
+                   ((0, 1, 2), (0, 2, 3)),
+                   boundary_condition=IndoorWallBoundaryCondition())
+        for i in range(3)]
+    generated = Case.from_bf_geometries('suz', geometries)
+    bundled = Case.from_folder(CASE, verbose=False)
+    return [ff for case in (generated, bundled) for ff in case.foam_files
+            if not hasattr(ff, 'isBlockMeshDict')]
+
+
+@pytest.mark.parametrize('foamfile', foamfiles(), ids=lambda ff: ff.name)
+def test_same_text_as_legacy_body(foamfile):
+    assert foamfile.to_openfoam() == legacy_text(foamfile)
+
+    f = io.BytesIO()
+    foamfile.write(f)
+    assert f.getvalue().decode() == legacy_text(foamfile)
+
+
+def random_values(rng, depth=0):
+    values = collections.OrderedDict()
+    for count in range(rng.randint(0, 5)):
+        key = rng.choice(['a', 'b_c', '"(U|k)"', '#include', 'div(phi,U)',
+                          'x{}'.format(count)])
+        kind = rng.randint(0, 5 if depth < 3 else 3)
+        if kind == 0:
+            values[key] = None
+        elif kind == 1:
+            values[key] = rng.choice(['', '0', 'uniform (0 0 0)', 'on',
+                                      '"quoted text"', 'a\\b'])
+        elif kind == 2:
+            values[key] = [rng.choice(['1', '', None, '(0 1 2)'])
+                           for _ in range(rng.randint(0, 3))]
+        else:
+            values[key] = random_values(rng, depth + 1)
+    return values
+
+
+def test_random_values_as_legacy_body():
+    rng = random.Random(24)
+    for _ in range(500):
+        values = random_values(rng)
+        f = io.StringIO()
+        write_values(f, values)
+        assert f.getvalue() == legacy_body(values), values
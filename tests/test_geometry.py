@@ -0,0 +1,80 @@
+"""Tests for butterfly geometries stored as tuples and numpy arrays."""
+import numpy as np
+import pytest
+
+from butterfly.geometry import BFGeometry, bf_geometry_from_stl_block, \
+    bf_geometry_from_stl_file, stl_signature, write_stl_file
+
+VERTICES = ((0, 0, 0), (2, 0, 0), (0, 3, 0), (0, 0, 4))
+FACES = ((0, 2, 1), (0, 1, 3), (0, 3, 2), (1, 2, 3))
+
+
+def geometries(name='pyramid'):
+    return (BFGeometry(name, VERTICES, FACES),
+            BFGeometry(name, np.array(VERTICES), np.array(FACES)))
+
+
+def test_array_geometry_matches_tuples():
+    geo, array_geo = geometries()
+    assert not geo.is_array and array_geo.is_array
+    assert np.allclose(array_geo.normals, geo.normals)
+    assert np.allclose(np.linalg.norm(array_geo.normals, axis=1), 1)
+    assert (array_geo.min, array_geo.max) == (geo.min, geo.max) == \
+        ([0, 0, 0], [2, 3, 4])
+
+
+def test_zero_area_face():
+    with pytest.raises(ValueError):
+        BFGeometry('flat', np.array(VERTICES), np.array([(0, 1, 1)]))
+
+
+def test_binary_stl_matches_tuples():
+    geo, array_geo = geometries()
+    assert array_geo.to_binary_stl(0.5) == geo.to_binary_stl(0.5)
+
+
+def test_ascii_stl_round_trip():
+    geo, array_geo = geometries()
+    for g in (geo, array_geo):
+        read = bf_geometry_from_stl_block(g.to_stl(0.5))
+        assert read.name == 'pyramid'
+        assert np.allclose(np.array(read.vertices)[np.array(read.face_indices)],
+                           np.array(VERTICES)[np.array(FACES)] * 0.5)
+        assert np.allclose(read.normals, geo.normals)
+
+
+@pytest.mark.parametrize('stl_format', ['ascii', 'binary'])
+def test_write_and_read_arrays(tmp_path, stl_format):
+    geo, array_geo = geometries()
+    other = BFGeometry('box', np.array(VERTICES) + 10, np.array(FACES))
+    filepath = str(tmp_path / 'geometry.stl')
+    write_stl_file(filepath, (array_geo, other), 1, stl_format)
+
+    read = bf_geometry_from_stl_file(
+        filepath, as_arrays=True,
+        regions={'patch0': {'name': 'pyramid'}, 'patch1': {'name': 'box'}})
+    assert [g.name for g in read] == ['pyramid', 'box']
+    assert all(g.is_array for g in read)
+    for g, expected in zip(read, (array_geo, other)):
+        assert np.allclose(g.vertices[g.face_indices],
+                           expected.vertices[expected.face_indices])
+        assert np.allclose(g.normals, expected.normals, atol=1e-7)
+
+    # the same file is written for tuple and array geometries
+    tuple_file = str(tmp_path / 'tuples.stl')
+    write_stl_file(tuple_file, (geo,), 1, stl_format)
+    array_file = str(tmp_path / 'arrays.stl')
+    write_stl_file(array_file, (array_geo,), 1, stl_format)
+    with open(tuple_file, 'rb') as t, open(array_file, 'rb') as a:
+        tuple_bytes, array_bytes = t.read(), a.read()
+    if stl_format == 'binary':
+        assert array_bytes[80:] == tuple_bytes[80:]
+    else:
+        assert len(array_bytes.splitlines()) == len(tuple_bytes.splitlines())
+
+
+def test_signature():
+    geo, array_geo = geometries()
+    assert stl_signature((array_geo,)) == stl_signature(geometries()[1:])
+    assert stl_signature((array_geo,)) != stl_signature((array_geo,), 0.001)
+    assert stl_signature((geo,)) != stl_signature((geometries('other')[0],))
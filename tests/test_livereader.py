@@ -0,0 +1,65 @@
+"""Tests for following the result files of a running case."""
+import os
+
+import numpy as np
+import pytest
+
+livereader = pytest.importorskip('livereader')
+
+HEADER = b'# Forces\n# Time Cm Cd Cl Cl(f) Cl(r)\n'
+
+
+def row(time):
+    return '{0} 0.1 {1} 0.3 N/A 0.5\n'.format(time, time / 10.0).encode()
+
+
+@pytest.fixture
+def case(tmp_path):
+    folder = tmp_path / 'postProcessing' / 'forces' / '0'
+    folder.mkdir(parents=True)
+    return tmp_path, folder / 'forceCoeffs.dat'
+
+
+def test_append(case):
+    folder, dat = case
+    dat.write_bytes(HEADER + row(1) + b'2 0.1')
+    run = livereader.LiveRun(str(folder))
+    assert run.poll() == (1, 0)
+    assert run.forces.columns == ['Time', 'Cm', 'Cd', 'Cl', 'Cl_f', 'Cl_r']
+    assert np.isnan(run.forces.column('Cl_f')).all()
+
+    # the incomplete line is read once it is complete
+    with open(str(dat), 'ab') as f:
+        f.write(b' 0.2 0.3 N/A 0.5\n' + row(3))
+    assert run.poll() == (2, 0)
+    assert run.forces.column('Time').tolist() == [1, 2, 3]
+    assert run.poll() == (0, 0)
+
+
+def test_truncated(case):
+    folder, dat = case
+    dat.write_bytes(HEADER + row(1) + row(2) + row(3))
+    run = livereader.LiveRun(str(folder))
+    run.poll()
+    with open(str(dat), 'r+b') as f:
+        f.truncate(0)
+        f.write(HEADER + row(5))
+    assert run.poll() == (-2, 0)
+    assert run.forces.column('Time').tolist() == [5]
+    assert run.forces.reloads == 1
+
+
+def test_recreated(case):
+    folder, dat = case
+    dat.write_bytes(HEADER + row(1))
+    run = livereader.LiveRun(str(folder))
+    run.poll()
+    # a new file with a different header which is longer than the old file
+    new = str(dat) + '.new'
+    with open(new, 'wb') as f:
+        f.write(b'# Time Cd\n' + b''.join(b'%d 0.%d\n' % (t, t) for t in (7, 8)))
+    os.replace(new, str(dat))
+    assert run.poll() == (1, 0)
+    assert (run.forces.reloads, run.residuals.reloads) == (1, 0)
+    assert run.forces.columns == ['Time', 'Cd']
+    assert run.forces.column('Cd').tolist() == [0.7, 0.8]
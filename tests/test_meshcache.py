@@ -0,0 +1,35 @@
+"""Tests for cloning case folders."""
+import os
+
+from butterfly.meshcache import clone_case_folder
+
+FILES = (
+    '0/U', 'constant/transportProperties', 'constant/polyMesh/points',
+    'constant/triSurface/suzanne.stl', 'system/controlDict', 'system/fvSchemes',
+    'foam.foam', 'reynolds_sweep.py', 'buildMesh.sh',
+    '__pycache__/reynolds_sweep.cpython-311.pyc', '100/U', 'processor0/0/U',
+    'postProcessing/forces/0/forceCoeffs.dat', 'log/simpleFoam.log',
+    'sweep/Re_100/system/controlDict')
+
+
+def list_files(folder):
+    return sorted(os.path.relpath(os.path.join(root, f), folder).replace(os.sep, '/')
+                  for root, _, files in os.walk(folder) for f in files)
+
+
+def test_clone_case_folder(tmp_path):
+    source, destination = str(tmp_path / 'case'), str(tmp_path / 'clone')
+    for f in FILES:
+        filepath = os.path.join(source, f)
+        if not os.path.isdir(os.path.dirname(filepath)):
+            os.makedirs(os.path.dirname(filepath))
+        with open(filepath, 'w') as outf:
+            outf.write(f)
+
+    linked = clone_case_folder(source, destination, skip=('system/fvSchemes',))
+    assert list_files(destination) == [
+        '0/U', 'constant/polyMesh/points', 'constant/transportProperties',
+        'constant/triSurface/suzanne.stl', 'system/controlDict']
+    assert linked == 2
+    with open(os.path.join(destination, 'system', 'controlDict')) as f:
+        assert f.read() == 'system/controlDict'
@@ -0,0 +1,102 @@
+"""Tests for butterfly.parser."""
+import io
+import os
+
+import pytest
+
+from butterfly.foamwriter import write_values
+from butterfly.parser import CppDictParser, FunctionObjectParser
+
+CASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'suzanne_simple_case')
+
+
+def parse(text):
+    return CppDictParser(text).values
+
+
+def write(values):
+    f = io.StringIO()
+    write_values(f, values)
+    return f.getvalue()
+
+
+def test_repeated_include_func():
+    values = parse('functions\n{\n    #includeFunc residuals\n'
+                   '    #includeFunc forces;\n    #includeFunc probes\n}\n')
+    functions = values['functions']
+    assert list(functions.items()) == [
+        ('#includeFunc', 'residuals'), ('#includeFunc#2', 'forces'),
+        ('#includeFunc#3', 'probes')]
+
+    text = write(values)
+    assert 'includeFunc#' not in text
+    assert [l.split() for l in text.splitlines() if 'includeFunc' in l] == [
+        ['#includeFunc', 'residuals;'], ['#includeFunc', 'forces;'],
+        ['#includeFunc', 'probes;']]
+    assert parse(text) == values
+
+
+def test_repeated_include_keeps_position():
+    values = parse('#include "a"\nx 1;\n#include "b"\ny 2;\n')
+    assert list(values.items()) == [
+        ('#include', '"a"'), ('x', '1'), ('#include#2', '"b"'), ('y', '2')]
+    assert parse(write(values)) == values
+
+
+def test_include_in_place_of_value():
+    values = parse('#include "initialConditions"\n'
+                   'internalField uniform $pressure;\n'
+                   'a #calc "$b * 2";\n')
+    assert values == {'#include': '"initialConditions"',
+                      'internalField': 'uniform $pressure',
+                      'a': '#calc "$b * 2"'}
+
+
+def test_block_mesh_dict_boundary():
+    values = CppDictParser.from_file(
+        os.path.join(CASE, 'system', 'blockMeshDict'), cache=False).values
+    assert values['convertToMeters'] == '1'
+    assert values['boundary'].startswith('( inlet { type patch; faces ( (0 1 5 4) ); }')
+    assert values['boundary'].endswith(
+        'side { type patch; faces ( (4 5 6 7) (0 1 2 3) (0 3 4 7) (1 2 5 6) ); } )')
+    assert values['edges'] == '( )'
+
+
+def test_quoted_strings():
+    values = parse('a "x;y // not a comment"; // comment\n'
+                   '"(U|k)" { type zeroGradient; }\n'
+                   'b (1 "s;t" 2);\n'
+                   'c "{ }";')
+    assert values == {'a': '"x;y // not a comment"',
+                      '"(U|k)"': {'type': 'zeroGradient'},
+                      'b': '(1 "s;t" 2)',
+                      'c': '"{ }"'}
+    assert parse(write(values)) == values
+
+
+@pytest.mark.parametrize('text', ['a { b 1;', 'a 1; }', 'a (1 2;', 'a "b;'])
+def test_unbalanced(text):
+    with pytest.raises(ValueError):
+        parse(text)
+
+
+def test_function_object_parser(tmp_path):
+    dat = tmp_path / 'forceCoeffs.dat'
+    parser = FunctionObjectParser(str(dat))
+    assert len(parser) == 0 and parser.values.shape == (0, 0)
+
+    dat.write_bytes(b'# Time Cd Cl\n1 0.1 N/A\n2 0.2')
+    assert parser.parse() == 1
+    assert parser.columns == ('Time', 'Cd', 'Cl')
+    with open(str(dat), 'ab') as f:
+        f.write(b' 0.3\n')
+    assert parser.parse() == 1
+    assert parser.values.shape == (2, 3)
+    assert parser.get_values('Cd').tolist() == [0.1, 0.2]
+
+    # truncated files are parsed from the beginning
+    dat.write_bytes(b'# Time Cd\n5 0.5\n')
+    assert parser.parse() == 1
+    assert (parser.columns, parser.reloads) == (('Time', 'Cd'), 1)
+    assert parser.times.tolist() == [5]
@@ -0,0 +1,195 @@
+"""Tests for reading OpenFOAM lists and polyMesh folders."""
+import gzip
+import io
+import os
+
+import numpy as np
+import pytest
+
+from butterfly.foamarray import dtypes, read_face_list, read_header, \
+    read_list, write_list
+from butterfly.polymesh import PolyMesh, load_polyMesh
+
+HEADER = '''FoamFile
+{{
+    version     2.0;
+    format      {format};
+    class       {cls};
+    arch        "LSB;label=32;scalar=64";
+    note        "nPoints:12 nCells:2 nFaces:11 nInternalFaces:1";
+    location    "constant/polyMesh";
+    object      {name};
+}}
+'''
+
+# two unit cubes side by side in x. point i + 3 * j + 6 * k is at (i, j, k)
+POINTS = np.array([(i, j, k) for k in range(2) for j in range(2)
+                   for i in range(3)], dtype=np.float64)
+FACES = [
+    (1, 4, 10, 7),  # internal
+    (0, 6, 9, 3),  # inlet
+    (2, 5, 11, 8),  # outlet
+    (0, 3, 4, 1), (1, 4, 5, 2), (6, 7, 10, 9), (7, 8, 11, 10),  # walls
+    (0, 1, 7, 6), (1, 2, 8, 7), (3, 9, 10, 4), (4, 10, 11, 5)]
+OWNER = [0, 0, 1, 0, 1, 0, 1, 0, 1, 0, 1]
+NEIGHBOUR = [1]
+BOUNDARY = '''3
+(
+    inlet
+    {
+        type            patch;
+        nFaces          1;
+        startFace       1;
+    }
+    outlet
+    {
+        type            patch;
+        nFaces          1;
+        startFace       2;
+    }
+    walls
+    {
+        type            wall;
+        inGroups        List<word> 1(wall);
+        nFaces          8;
+        startFace       3;
+    }
+)
+'''
+
+
+def write_mesh(folder, binary=False):
+    """Write the two cells mesh to folder in ascii or binary format."""
+    fmt = 'binary' if binary else 'ascii'
+    os.makedirs(folder)
+
+    def write(name, cls, *lists):
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(HEADER.format(format=fmt, cls=cls, name=name).encode())
+            for values in lists:
+                write_list(f, values, binary=binary)
+            f.write(b'\n')
+
+    write('points', 'vectorField', POINTS)
+    write('owner', 'labelList', np.array(OWNER, np.int32))
+    write('neighbour', 'labelList', np.array(NEIGHBOUR, np.int32))
+    if binary:
+        offsets = np.cumsum([0] + [len(f) for f in FACES]).astype(np.int32)
+        write('faces', 'faceCompactList', offsets,
+              np.array(FACES, np.int32).ravel())
+    else:
+        with open(os.path.join(folder, 'faces'), 'w') as f:
+            f.write(HEADER.format(format=fmt, cls='faceList', name='faces'))
+            f.write('\n{}\n(\n{}\n)\n'.format(
+                len(FACES), '\n'.join(
+                    '4({})'.format(' '.join(str(v) for v in face))
+                    for face in FACES)))
+    with open(os.path.join(folder, 'boundary'), 'w') as f:
+        f.write(HEADER.format(format='ascii', cls='polyBoundaryMesh',
+                              name='boundary'))
+        f.write(BOUNDARY)
+
+
+def test_read_list_ascii():
+    buf = b'// comment\n3\n(\n(0 0 0)\n(1 2 3)\n(4.5 -6 7e-3)\n)\n2(1 2) 3{0.5}'
+    values, end = read_list(buf, 0, np.float64, 3)
+    assert values.tolist() == [[0, 0, 0], [1, 2, 3], [4.5, -6, 7e-3]]
+    labels, end = read_list(buf, end, np.int32)
+    assert labels.dtype == np.int32 and labels.tolist() == [1, 2]
+    uniform, end = read_list(buf, end, np.float64)
+    assert uniform.tolist() == [0.5] * 3 and end == len(buf)
+
+
+def test_read_list_binary():
+    values = np.arange(12, dtype='>f8').reshape(4, 3)
+    f = io.BytesIO()
+    write_list(f, values, binary=True)
+    buf = f.getvalue()
+    read, end = read_list(buf, 0, values.dtype, 3, binary=True)
+    assert read.dtype.isnative and (read == values).all()
+    assert end == len(buf)
+
+    view, _ = read_list(buf, 0, values.dtype, 3, binary=True, copy=False)
+    assert not view.flags.writeable and (view == values).all()
+
+
+def test_read_face_list():
+    text = b'3\n(\n3(0 1 2)\n4(2 3 4 5)\n1(6)\n)\n'
+    indices, offsets, end = read_face_list(text, 0, np.int32)
+    assert indices.tolist() == [0, 1, 2, 2, 3, 4, 5, 6]
+    assert offsets.tolist() == [0, 3, 7, 8] and end == len(text) - 1
+
+    compact = b'4(0 3 7 8) 8(0 1 2 2 3 4 5 6)'
+    indices, offsets, _ = read_face_list(compact, 0, np.int32, compact=True)
+    assert indices.tolist() == [0, 1, 2, 2, 3, 4, 5, 6]
+    assert offsets.tolist() == [0, 3, 7, 8]
+
+    assert [a.tolist() for a in read_face_list(b'0()', 0, np.int32)[:2]] == \
+        [[], [0]]
+
+
+def test_dtypes():
+    header, _ = read_header(b'FoamFile { format binary; '
+                            b'arch "MSB;label=64;scalar=32"; }')
+    assert dtypes(header) == (np.dtype('>i8'), np.dtype('>f4'))
+    assert dtypes({}) == (np.dtype('<i4'), np.dtype('<f8'))
+
+
+@pytest.mark.parametrize('binary', [False, True])
+def test_load_polyMesh(tmp_path, binary):
+    folder = str(tmp_path / 'polyMesh')
+    write_mesh(folder, binary)
+    mesh = load_polyMesh(folder)
+    assert (mesh.points == POINTS).all()
+    assert [mesh.faces[mesh.face_offsets[i]:mesh.face_offsets[i + 1]].tolist()
+            for i in range(len(FACES))] == [list(f) for f in FACES]
+    assert mesh.faces.dtype == np.int32
+    assert mesh.owner.tolist() == OWNER
+    assert mesh.neighbour.tolist() == NEIGHBOUR
+    assert mesh.n_cells == 2
+    assert list(mesh.boundary) == ['inlet', 'outlet', 'walls']
+    assert mesh.boundary['walls']['startFace'] == 3
+    assert mesh.boundary['walls']['nFaces'] == 8
+
+
+def test_load_gzipped_points(tmp_path):
+    folder = str(tmp_path / 'polyMesh')
+    write_mesh(folder)
+    filepath = os.path.join(folder, 'points')
+    with open(filepath, 'rb') as inf, gzip.open(filepath + '.gz', 'wb') as outf:
+        outf.write(inf.read())
+    os.remove(filepath)
+    assert (load_polyMesh(folder).points == POINTS).all()
+
+
+def test_polymesh_geometry(tmp_path):
+    folder = str(tmp_path / 'polyMesh')
+    write_mesh(folder)
+    mesh = PolyMesh(folder)
+    assert (mesh.n_points, mesh.n_faces, mesh.n_internal_faces,
+            mesh.n_cells) == (12, 11, 1, 2)
+    assert mesh.face_sizes.tolist() == [4] * 11
+
+    assert np.allclose(mesh.face_areas, 1)
+    # face normals point out of the owner cell
+    assert np.allclose(mesh.face_area_vectors[:3],
+                       [(1, 0, 0), (-1, 0, 0), (1, 0, 0)])
+    assert np.allclose(mesh.face_centres[:3],
+                       [(1, 0.5, 0.5), (0, 0.5, 0.5), (2, 0.5, 0.5)])
+    assert np.allclose(mesh.cell_volumes, [1, 1])
+    assert np.allclose(mesh.cell_centres, [(0.5, 0.5, 0.5), (1.5, 0.5, 0.5)])
+
+    walls = mesh.patch_slice('walls')
+    assert (walls.start, walls.stop) == (3, 11)
+    # the walls close both cells
+    assert np.allclose(mesh.face_area_vectors[walls].sum(axis=0), 0)
+    with pytest.raises(ValueError):
+        mesh.patch_slice('sides')
+
+
+def test_polymesh_from_arrays(tmp_path):
+    folder = str(tmp_path / 'polyMesh')
+    write_mesh(folder, binary=True)
+    mesh = PolyMesh.from_arrays(load_polyMesh(folder))
+    assert mesh.folder is None
+    assert np.isclose(mesh.cell_volumes.sum(), 2)
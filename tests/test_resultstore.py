@@ -0,0 +1,44 @@
+"""Tests for the columnar result store of the report."""
+import os
+
+import pytest
+
+resultstore = pytest.importorskip('resultstore')
+
+FORCES = '# Time Cm Cd Cl\n1 0 0.1 0\n3 0 0.3 0\n2 0 0.2 0\n'
+
+
+@pytest.fixture
+def store(tmp_path):
+    folder = tmp_path / 'data' / 'forces_laminar_100'
+    folder.mkdir(parents=True)
+    (folder / 'Re_10.dat').write_text(FORCES)
+    store = resultstore.ResultStore(str(tmp_path / 'data'))
+    store.update()
+    return store
+
+
+def test_read_result_file_is_sorted(store):
+    table = resultstore.read_result_file(
+        store.result_file('forces', 'laminar', 100, 10))
+    assert table['Time'].tolist() == [1, 2, 3]
+    assert table['Cd'].tolist() == [0.1, 0.2, 0.3]
+    assert table.index.tolist() == [0, 1, 2]
+
+
+def test_run_cache_matches_store(store):
+    cache = resultstore.RunCache(store)
+    loaded = store.load('forces', 'laminar', 100, 10)
+    assert cache.get('forces', 'laminar', 100, 10).equals(loaded)
+
+    # files which are modified after the update are read from the .dat file
+    filepath = store.result_file('forces', 'laminar', 100, 10)
+    with open(filepath, 'a') as f:
+        f.write('0 0 0.0 0\n')
+    st = os.stat(filepath)
+    os.utime(filepath, (st.st_atime, st.st_mtime + 1))
+    run = cache.get('forces', 'laminar', 100, 10)
+    assert run['Time'].tolist() == [0, 1, 2, 3]
+
+    store.update()
+    assert store.load('forces', 'laminar', 100, 10).equals(run)
@@ -0,0 +1,165 @@
+"""RunManagerPosix against stub OpenFOAM executables on PATH."""
+import os
+import signal
+import stat
+import threading
+import time
+from collections import namedtuple
+
+import pytest
+
+pytestmark = pytest.mark.skipif(os.name != 'posix', reason='POSIX only')
+
+from butterfly.runmanager_posix import RunManagerPosix, \
+    _ProcessChain  # noqa: E402
+
+STUBS = {
+    'blockMesh': '#!/bin/sh\necho "blockMesh $@"\necho "warning" >&2\n',
+    'simpleFoam': '#!/bin/sh\necho "Time = 1"\nsleep "${STUB_SLEEP:-0}"\n'
+                  'echo End\n',
+    'failFoam': '#!/bin/sh\necho "FOAM FATAL ERROR" >&2\nexit 3\n',
+    'decomposePar': '#!/bin/sh\nmkdir -p processor0 processor1\n',
+    # mpirun starts a child like a solver rank and waits for it
+    'mpirun': '#!/bin/sh\nsleep 30 &\necho $! > rank.pid\nwait\n',
+    'reconstructPar': '#!/bin/sh\necho reconstructed\n',
+}
+
+DecomposeParDict = namedtuple('DecomposeParDict', 'numberOfSubdomains')
+
+
+@pytest.fixture
+def runmanager(tmp_path, monkeypatch):
+    """Run manager for an empty case with the stubs on PATH."""
+    bin_folder = tmp_path / 'bin'
+    bin_folder.mkdir()
+    for name, script in STUBS.items():
+        filepath = bin_folder / name
+        filepath.write_text(script)
+        filepath.chmod(filepath.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv('PATH', '{}{}{}'.format(bin_folder, os.pathsep,
+                                               os.environ.get('PATH', '')))
+    # use the current environment instead of sourcing OpenFOAM bashrc
+    monkeypatch.setenv('WM_PROJECT_DIR', str(tmp_path))
+    case = tmp_path / 'case'
+    case.mkdir()
+    return RunManagerPosix('case', str(case))
+
+
+def read(runmanager, filepath):
+    with open(os.path.join(runmanager.project_folder, filepath)) as f:
+        return f.read()
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    # zombies of the stub are not running
+    try:
+        with open('/proc/{}/stat'.format(pid)) as f:
+            return f.read().split(')')[-1].split()[0] != 'Z'
+    except IOError:
+        return True
+
+
+def test_log_and_err_files(runmanager):
+    log = runmanager.run('blockMesh', ('-dict system/blockMeshDict',))
+    assert log.process.returncode == 0
+    assert log.logfiles == ('log/blockMesh.log',)
+    assert read(runmanager, 'log/blockMesh.log').strip() == \
+        'blockMesh -dict system/blockMeshDict'
+    assert read(runmanager, 'log/blockMesh.err').strip() == 'warning'
+
+
+def test_returncode_of_failed_command(runmanager):
+    log = runmanager.run('failFoam')
+    assert log.process.returncode == 3
+    assert 'FOAM FATAL ERROR' in read(runmanager, log.errorfiles[0])
+
+
+def test_missing_executable(runmanager):
+    with pytest.raises(OSError):
+        runmanager.run('noSuchFoam')
+    assert 'Failed to run noSuchFoam' in read(runmanager, 'log/noSuchFoam.err')
+
+
+def test_poll_without_wait(runmanager, monkeypatch):
+    monkeypatch.setenv('STUB_SLEEP', '0.5')
+    log = runmanager.run('simpleFoam', wait=False)
+    assert log.process.poll() is None
+    assert log.process.wait(timeout=10) == 0
+    assert read(runmanager, 'log/simpleFoam.log').split() == \
+        ['Time', '=', '1', 'End']
+
+
+def test_terminate(runmanager, monkeypatch):
+    monkeypatch.setenv('STUB_SLEEP', '30')
+    log = runmanager.run('simpleFoam', wait=False)
+    runmanager.terminate()
+    assert log.process.wait(timeout=10) != 0
+    assert 'End' not in read(runmanager, 'log/simpleFoam.log')
+
+
+def test_parallel_chain(runmanager, monkeypatch):
+    monkeypatch.setenv('STUB_SLEEP', '0')
+    log = runmanager.run('simpleFoam', decomposeParDict=DecomposeParDict(2),
+                         wait=False)
+    pid_file = os.path.join(runmanager.project_folder, 'rank.pid')
+    for _ in range(100):
+        if os.path.isfile(pid_file) and read(runmanager, 'rank.pid').strip():
+            break
+        time.sleep(0.05)
+    rank = int(read(runmanager, 'rank.pid'))
+    assert log.process.poll() is None
+    assert log.logfiles == ('log/decomposePar.log', 'log/simpleFoam.log',
+                            'log/reconstructPar.log')
+
+    log.process.terminate()
+    assert log.process.wait(timeout=10) != 0
+    # the rank is in the process group of mpirun and is terminated too
+    for _ in range(100):
+        if not is_running(rank):
+            break
+        time.sleep(0.05)
+    assert not is_running(rank)
+    # the chain stops and reconstructPar is never started
+    assert not os.path.isfile(os.path.join(runmanager.project_folder,
+                                           'log/reconstructPar.log'))
+
+
+def test_terminate_while_starting(runmanager, monkeypatch):
+    monkeypatch.setenv('STUB_SLEEP', '30')
+    starting = threading.Event()
+    start = runmanager._start
+
+    def slow_start(*args):
+        starting.set()
+        time.sleep(0.2)
+        return start(*args)
+
+    monkeypatch.setattr(runmanager, '_start', slow_start)
+    os.makedirs(os.path.join(runmanager.project_folder, 'log'))
+    chain = _ProcessChain(runmanager, (('simpleFoam',), ('blockMesh',)),
+                          ('log/simpleFoam.log', 'log/blockMesh.log'),
+                          ('log/simpleFoam.err', 'log/blockMesh.err'),
+                          runmanager.env)
+    assert starting.wait(10)
+    # the command which is being started is terminated too
+    chain.terminate()
+    assert chain.wait(timeout=10) == -signal.SIGTERM
+    assert not os.path.isfile(os.path.join(runmanager.project_folder,
+                                           'log/blockMesh.log'))
+
+
+def test_duplicate_running(runmanager, monkeypatch):
+    monkeypatch.setenv('STUB_SLEEP', '30')
+    log = runmanager.run('simpleFoam', wait=False)
+    try:
+        copy = runmanager.duplicate()
+        assert copy._process is None
+        assert copy.project_folder == runmanager.project_folder
+        assert runmanager._process is log.process
+    finally:
+        runmanager.terminate()
+        log.process.wait(timeout=10)
@@ -0,0 +1,82 @@
+"""Tests for stl regions in snappyHexMeshDict."""
+import os
+import shutil
+from collections import namedtuple
+
+import pytest
+
+from butterfly.case import Case
+from butterfly.snappyHexMeshDict import SnappyHexMeshDict
+
+CASE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                    'suzanne_simple_case')
+
+Geometry = namedtuple('Geometry', 'name')
+
+STL = '''solid monkey
+facet normal 0 0 1
+outer loop
+vertex 0 0 0
+vertex 0.1 0 0
+vertex 0 0.1 0
+endloop
+endfacet
+endsolid monkey
+'''
+
+
+@pytest.fixture
+def shmd():
+    shmd = SnappyHexMeshDict.from_file(os.path.join(CASE, 'system',
+                                                    'snappyHexMeshDict'))
+    shmd.values['geometry']['suzanne_wt.stl']['regions'] = {
+        'monkey': {'name': 'suzanne'}, 'ears': {'name': 'ears'}}
+    return shmd
+
+
+def regions(shmd):
+    return shmd.values['geometry']['suzanne_wt.stl']['regions']
+
+
+def test_missing_geometry_is_ignored(shmd):
+    assert not shmd.set_stl_regions('suz', [Geometry('monkey')], 'binary')
+    assert 'suz.stl' not in shmd.values['geometry']
+
+
+def test_ascii_regions_are_kept(shmd):
+    geometries = [Geometry('monkey'), Geometry('ears'), Geometry('eyes')]
+    assert not shmd.set_stl_regions('suzanne_wt', geometries, 'ascii')
+    assert regions(shmd) == {'monkey': {'name': 'suzanne'},
+                             'ears': {'name': 'ears'}}
+
+
+def test_binary_regions_are_merged(shmd):
+    geometries = [Geometry('monkey'), Geometry('eyes'), Geometry('monkey')]
+    assert shmd.set_stl_regions('suzanne_wt', geometries, 'binary')
+    assert list(regions(shmd).items()) == [
+        ('patch0', {'name': 'suzanne'}), ('ears', {'name': 'ears'}),
+        ('patch1', {'name': 'eyes'})]
+
+    # back to ascii renames the regions which were added for binary
+    assert shmd.set_stl_regions('suzanne_wt', geometries, 'ascii')
+    assert list(regions(shmd).items()) == [
+        ('monkey', {'name': 'suzanne'}), ('ears', {'name': 'ears'}),
+        ('eyes', {'name': 'eyes'})]
+
+
+@pytest.mark.parametrize('stl_format', ['ascii', 'binary'])
+def test_save_case_with_different_stl_name(tmp_path, stl_format):
+    folder = str(tmp_path / 'suz')
+    shutil.copytree(os.path.join(CASE, 'system'), os.path.join(folder, 'system'))
+    shutil.copytree(os.path.join(CASE, 'constant'),
+                    os.path.join(folder, 'constant'))
+    os.makedirs(os.path.join(folder, 'constant', 'triSurface'))
+    with open(os.path.join(folder, 'constant', 'triSurface', 'suzanne_wt.stl'),
+              'w') as f:
+        f.write(STL)
+
+    case = Case.from_folder(folder, import_geometry=True, verbose=False)
+    case.working_dir = str(tmp_path / 'out')
+    case.save(overwrite=True, stl_format=stl_format)
+    assert case.snappyHexMeshDict.values['geometry'] == {
+        'suzanne_wt.stl': {'type': 'triSurfaceMesh', 'name': 'monkey'}}
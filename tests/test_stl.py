@@ -0,0 +1,107 @@
+"""Tests for reading and writing stl files."""
+import io
+import struct
+
+import numpy as np
+
+from butterfly import stl
+from butterfly.stl import binary
+
+TRIANGLES = np.array([[[0, 0, 0], [1, 0, 0], [0, 1, 0]],
+                      [[0, 0, 1], [1, 0, 1], [0, 1, 1]],
+                      [[0, 0, 2], [1, 0, 2], [0, 1, 2]]], np.float32)
+NORMALS = np.array([[0, 0, 1]] * 3, np.float32)
+
+
+def binary_file(header, attributes):
+    facets = np.zeros(len(attributes), binary.facet_dtype())
+    facets['vertices'] = TRIANGLES[:len(attributes)]
+    facets['normal'] = NORMALS[:len(attributes)]
+    facets['attributes'] = attributes
+    return io.BytesIO(header.ljust(80, b'\0') +
+                      struct.pack('<I', len(attributes)) + facets.tobytes())
+
+
+def test_ascii_round_trip():
+    solid = stl.ArraySolid('monkey', TRIANGLES, NORMALS)
+    f = io.BytesIO()
+    solid.write_ascii(f)
+    f.seek(0)
+    assert stl.ascii.parse_all(f) == (solid,)
+
+
+def test_binary_round_trip():
+    solid = stl.ArraySolid('monkey', TRIANGLES, NORMALS)
+    f = io.BytesIO()
+    solid.write_binary(f)
+    f.seek(0)
+    read = binary.parse(f)
+    assert np.array_equal(read.triangles, TRIANGLES)
+    assert np.array_equal(read.facet_normals, NORMALS)
+
+
+def test_binary_regions():
+    f = binary_file(b'binary stl suz', [1, 0, 1])
+    solids = binary.parse_all(f)
+    assert [s.name for s in solids] == ['patch1', 'patch0']
+    assert np.array_equal(solids[0].triangles, TRIANGLES[[0, 2]])
+    assert solids[0].attributes.tolist() == [1, 1]
+    assert np.array_equal(solids[1].triangles, TRIANGLES[[1]])
+
+
+def test_binary_name():
+    assert binary.parse_all(binary_file(b'binary stl suz', [0, 0]))[0].name \
+        == 'suz'
+    assert binary.parse(binary_file(b'solid My part-1 (v2)', [0])).name \
+        == 'My_part_1_v2'
+    assert binary.parse(binary_file(b'', [0])).name == ''
+
+
+def test_add_facet_attributes():
+    solid = stl.ArraySolid('a')
+    solid.add_facet((0, 0, 1), TRIANGLES[0], 3)
+    solid.add_facet((0, 0, 1), TRIANGLES[1])
+    assert solid.attributes.tolist() == [3, 0]
+
+
+def square(name, z):
+    from butterfly.geometry import BFGeometry
+    return BFGeometry(name, ((0, 0, z), (1, 0, z), (1, 1, z), (0, 1, z)),
+                      ((0, 1, 2), (0, 2, 3)))
+
+
+def test_binary_geometries_round_trip(tmp_path):
+    from butterfly.geometry import bf_geometry_from_stl_file, write_stl_file
+    filepath = str(tmp_path / 'suz.stl')
+    geometries = [square('wall', 0), square('floor', 1), square('wall', 2)]
+    write_stl_file(filepath, geometries, stl_format='binary')
+
+    # without regions binary regions are named like OpenFOAM does
+    assert [g.name for g in bf_geometry_from_stl_file(filepath)] == \
+        ['patch0', 'patch1']
+    regions = {'patch0': {'name': 'wall'}, 'patch1': {'name': 'floor'}}
+    read = bf_geometry_from_stl_file(filepath, regions=regions)
+    assert [(g.name, len(g.face_indices)) for g in read] == \
+        [('wall', 4), ('floor', 2)]
+
+
+def test_binary_case_round_trip(tmp_path):
+    from butterfly.case import Case
+    from butterfly.refinementRegion import Inside, RefinementRegion
+
+    geometries = [square('wall', 0), square('floor', 1)]
+    case = Case.from_bf_geometries('suz', geometries)
+    box = square('box', 0.5)
+    case.add_refinementRegion(RefinementRegion(
+        'box', box.vertices, box.face_indices, box.normals,
+        Inside(2)))
+    case.working_dir = str(tmp_path)
+    case.save(overwrite=True, stl_format='binary')
+
+    loaded = Case.from_folder(case.project_dir, import_geometry=True,
+                              verbose=False)
+    names = sorted(g.name for g in loaded.geometries
+                   if not hasattr(g.boundary_condition,
+                                  'isBoundingBoxBoundaryCondition'))
+    assert names == ['floor', 'wall']
+    assert [r.name for r in loaded.refinementRegions] == ['box']
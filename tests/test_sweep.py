@@ -0,0 +1,143 @@
+"""Tests for Reynolds sweeps."""
+import gzip
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from butterfly.sweep import ReynoldsSweep, SweepResult, inlet_conditions, \
+    latest_time_folder, seed_fields, warm_start_order
+from butterfly.volfield import load_field
+
+FIELD = '''FoamFile
+{{
+    version     2.0;
+    format      ascii;
+    class       volScalarField;
+    object      {name};
+}}
+
+dimensions      [0 {dimensions} 0 0 0 0];
+
+internalField   nonuniform List<scalar> 3(1 2 4);
+
+boundaryField
+{{
+    inlet
+    {{
+        type            fixedValue;
+        value           uniform 2;
+    }}
+}}
+'''
+
+
+def write_field(folder, name, dimensions, compressed=False):
+    if not os.path.isdir(folder):
+        os.makedirs(folder)
+    text = FIELD.format(name=name, dimensions=dimensions).encode()
+    if compressed:
+        with gzip.open(os.path.join(folder, name + '.gz'), 'wb') as f:
+            f.write(text)
+    else:
+        with open(os.path.join(folder, name), 'wb') as f:
+            f.write(text)
+
+
+def test_inlet_conditions():
+    values = inlet_conditions(2000, 0.1, nu=1e-5, intensity=0.05,
+                              length_scale=0.07, cmu=0.09)
+    assert values.U == pytest.approx(0.2)
+    assert values.k == pytest.approx(1.5 * 0.01 ** 2)
+    assert values.epsilon == pytest.approx(
+        0.09 ** 0.75 * values.k ** 1.5 / 0.007)
+    assert values.omega == pytest.approx(values.epsilon / (0.09 * values.k))
+    assert inlet_conditions(0, 0.1) == (0, 0, 0, 0)
+
+
+def test_latest_time_folder(tmp_path):
+    folder = str(tmp_path)
+    assert latest_time_folder(folder) is None
+    for name in ('0', '100', '20', '1e3', 'constant', 'processor0'):
+        os.makedirs(os.path.join(folder, name))
+    # files are not time folders
+    open(os.path.join(folder, '5000'), 'w').close()
+    assert latest_time_folder(folder) == os.path.join(folder, '1e3')
+
+    os.rmdir(os.path.join(folder, '1e3'))
+    assert latest_time_folder(folder) == os.path.join(folder, '100')
+
+
+def test_seed_fields(tmp_path):
+    source = str(tmp_path / 'Re_1000')
+    destination = str(tmp_path / 'Re_2000')
+    os.makedirs(source)
+    assert seed_fields(source, destination, 2) is None
+
+    write_field(os.path.join(source, '50'), 'U', '1 -1')
+    latest = os.path.join(source, '100')
+    write_field(latest, 'U', '1 -1')
+    write_field(latest, 'p', '2 -2', compressed=True)
+    write_field(latest, 'epsilon', '2 -3')
+    os.makedirs(os.path.join(latest, 'uniform'))
+    with open(os.path.join(latest, 'README'), 'w') as f:
+        f.write('not a field')
+    # uniform initial fields in destination
+    write_field(os.path.join(destination, '0'), 'U', '1 -1')
+    write_field(os.path.join(destination, '0'), 'p', '2 -2', compressed=True)
+
+    assert seed_fields(source, destination, 2) == latest
+    target = os.path.join(destination, '0')
+    assert sorted(os.listdir(target)) == ['U', 'epsilon', 'p']
+    for name, factor in (('U', 2), ('p', 4), ('epsilon', 8)):
+        field = load_field(os.path.join(target, name))
+        assert np.allclose(field.internal_field, np.array([1, 2, 4]) * factor)
+        assert np.allclose(field.boundary_field['inlet']['value'], 2 * factor)
+
+
+def test_warm_start_order():
+    order = warm_start_order([8000, 1000, 2000, 3000, 4000, 5000, 6000, 7000])
+    assert order == [(3000, None), (2000, 3000), (4000, 3000), (1000, 2000),
+                     (5000, 4000), (6000, 5000), (7000, 6000), (8000, 7000)]
+
+    # one cold start for each decade spread over log(Re)
+    order = warm_start_order([10, 30, 100, 300, 1000, 3000])
+    assert [Re for Re, parent in order if parent is None] == [30, 100, 1000]
+
+    order = warm_start_order([10, 30, 100, 300, 1000, 3000], cold_starts=2)
+    assert dict(order) == {30: None, 10: 30, 100: 30, 1000: None, 300: 1000,
+                           3000: 1000}
+
+    assert warm_start_order([100, 200], cold_starts=5) == \
+        [(100, None), (200, None)]
+    assert warm_start_order([]) == []
+
+
+def test_warm_start_waits_for_neighbour(tmp_path):
+    sweep = ReynoldsSweep.__new__(ReynoldsSweep)
+    sweep.reynolds_numbers = (1000, 2000, 3000, 4000, 5000, 6000)
+    sweep.sweep_folder = str(tmp_path)
+    sweep.max_runs = 8
+    sweep.warm_start = True
+    sweep.cold_starts = None
+
+    started = []
+    lock = threading.Lock()
+
+    def run_one(Re, seed=None):
+        with lock:
+            started.append((Re, seed))
+        return SweepResult(Re, True, None, None, None, None, None, seed)
+
+    sweep.run_one = run_one
+    results = sweep.run()
+    assert [r.Re for r in results] == list(sweep.reynolds_numbers)
+    # only one cold start even though there are more cores than runs
+    assert [Re for Re, seed in started if seed is None] == [2000]
+    seeds = dict(started)
+    assert all(abs(Re - seed) == 1000 for Re, seed in started if seed)
+    for Re, seed in started:
+        if seed:
+            assert started.index((seed, seeds[seed])) < \
+                started.index((Re, seed))
@@ -0,0 +1,104 @@
+"""Tests for reading OpenFOAM volume fields."""
+import gzip
+import io
+import os
+
+import numpy as np
+import pytest
+
+from butterfly.foamarray import is_binary, read_file, read_header, write_list
+from butterfly.volfield import load_field, load_internal_field, \
+    read_dimensions, scale_field
+
+HEADER = '''FoamFile
+{{
+    version     2.0;
+    format      {};
+    arch        "LSB;label=32;scalar=64";
+    class       volVectorField;
+    location    "100";
+    object      U;
+}}
+
+dimensions      [0 1 -1 0 0 0 0];
+'''
+
+U = np.array([(1.5, 0, 0), (2, -0.25, 1e-3), (0, 0, 3)])
+INLET = np.array([(1.0, 0, 0), (2.0, 0, 0)])
+
+
+def field_bytes(binary=False):
+    """U field with a nonuniform internalField and inlet value."""
+    f = io.BytesIO()
+    f.write(HEADER.format('binary' if binary else 'ascii').encode())
+    f.write(b'\ninternalField   nonuniform List<vector> ')
+    write_list(f, U, binary=binary)
+    f.write(b';\n\nboundaryField\n{\n    inlet\n    {\n'
+            b'        type            fixedValue;\n'
+            b'        value           nonuniform List<vector> ')
+    write_list(f, INLET, binary=binary)
+    f.write(b';\n    }\n    outlet\n    {\n'
+            b'        type            inletOutlet;\n'
+            b'        inletValue      uniform (0 0 0);\n'
+            b'        value           uniform (1 2 3);\n    }\n'
+            b'    monkey\n    {\n        type            noSlip;\n    }\n}\n')
+    return f.getvalue()
+
+
+@pytest.fixture(params=['ascii', 'binary', 'gzip'])
+def field(request, tmp_path):
+    filepath = str(tmp_path / 'U')
+    data = field_bytes(request.param == 'binary')
+    if request.param == 'gzip':
+        with gzip.open(filepath + '.gz', 'wb') as f:
+            f.write(data)
+    else:
+        with open(filepath, 'wb') as f:
+            f.write(data)
+    return filepath
+
+
+def test_load_field(field):
+    u = load_field(field)
+    assert (u.name, u.field_class) == ('U', 'volVectorField')
+    assert u.dimensions == '[0 1 -1 0 0 0 0]'
+    assert u.internal_field.shape == (3, 3)
+    assert (u.internal_field == U).all()
+    assert list(u.boundary_field) == ['inlet', 'outlet', 'monkey']
+    inlet = u.boundary_field['inlet']
+    assert inlet['type'] == 'fixedValue' and (inlet['value'] == INLET).all()
+    assert u.boundary_field['outlet']['inletValue'].tolist() == [0, 0, 0]
+    assert u.boundary_field['outlet']['value'].tolist() == [1, 2, 3]
+    assert u.boundary_field['monkey'] == {'type': 'noSlip'}
+
+
+def test_binary_field_is_not_copied(tmp_path):
+    filepath = str(tmp_path / 'U')
+    with open(filepath, 'wb') as f:
+        f.write(field_bytes(binary=True))
+    internal = load_internal_field(filepath)
+    assert not internal.flags.writeable
+    copied = load_internal_field(filepath, copy=True)
+    assert copied.flags.writeable and (copied == U).all()
+
+
+def is_binary_file(filepath):
+    return is_binary(read_header(read_file(filepath))[0])
+
+
+def test_scale_field(field):
+    binary = is_binary_file(field)
+    destination = field + '.scaled'
+    scale_field(field, 2, destination)
+    scaled = load_field(destination)
+    assert is_binary_file(destination) == binary
+    assert np.allclose(scaled.internal_field, 2 * U)
+    assert np.allclose(scaled.boundary_field['inlet']['value'], 2 * INLET)
+    assert scaled.boundary_field['outlet']['value'].tolist() == [2, 4, 6]
+    assert read_dimensions(destination) == [0, 1, -1, 0, 0, 0, 0]
+
+    # in place. gzipped files are replaced by uncompressed files
+    scale_field(field, 0.5)
+    assert os.path.isfile(field) and not os.path.isfile(field + '.gz')
+    assert is_binary_file(field) == binary
+    assert np.allclose(load_internal_field(field), 0.5 * U)